@@ -12,6 +12,9 @@ import plotly.graph_objects as go
 from datetime import datetime
 from pathlib import Path
 from itertools import combinations
+from functools import lru_cache
+import json
+import os
 import sys
 
 # 이미지 처리
@@ -26,6 +29,9 @@ if sys.platform == 'win32':
     sys.stdout.reconfigure(encoding='utf-8')
     sys.stderr.reconfigure(encoding='utf-8')
 
+# TensorRT 엔진 디렉토리 (지정 시 세포 분석에 TensorRT 추론 사용, 엔진이 없으면 첫 실행 때 빌드)
+TRT_ENGINE_DIR = os.environ.get('ADDS_CELLPOSE_TRT_ENGINE_DIR') or None
+
 # 페이지 설정
 st.set_page_config(
     page_title="AI-based Anticancer Drug System",
@@ -37,7 +43,6 @@ st.set_page_config(
 # 세션 초기화
 if 'patients' not in st.session_state:
     # JSON 파일에서 환자 데이터 로드
-    import json
     patients_json = Path("dataset/patients/patients_index.json")
     if patients_json.exists():
         try:
@@ -61,6 +66,8 @@ if 'uploaded_excel' not in st.session_state:
     st.session_state.uploaded_excel = None
 if 'excel_data' not in st.session_state:
     st.session_state.excel_data = None
+if 'ai_combo_results_by_patient' not in st.session_state:
+    st.session_state.ai_combo_results_by_patient = {}
 
 # 데이터셋 관리자 초기화
 if 'dataset_manager' not in st.session_state:
@@ -174,6 +181,26 @@ PAPER_RECOMMENDATIONS = {
     }
 }
 
+# 약물별 권장 용량 정보
+DRUG_DOSAGES = {
+    "5-Fluorouracil": "400-600 mg/m² IV",
+    "Oxaliplatin": "85 mg/m² IV (2시간 주입)",
+    "Irinotecan": "180 mg/m² IV",
+    "Cisplatin": "75 mg/m² IV",
+    "Paclitaxel": "175 mg/m² IV (3시간 주입)",
+    "Doxorubicin": "60-75 mg/m² IV",
+    "Gemcitabine": "1000 mg/m² IV",
+    "Bevacizumab": "5 mg/kg IV (2주마다)",
+    "Cetuximab": "400 mg/m² IV (첫회), 250 mg/m² IV (이후 주 1회)",
+    "Pembrolizumab": "200 mg IV (3주마다)",
+    "Pritamab": "10 mg/kg IV (2주마다, 인하대 연구)"
+}
+
+@lru_cache(maxsize=128)
+def _dosage_markdown(drugs):
+    """약물 구성 및 권장 용량 bullet 목록 (약물 tuple 기준 캐시)"""
+    return "\n".join(f"- **{d}**: `{DRUG_DOSAGES.get(d, '용량 정보 없음')}`" for d in drugs)
+
 def get_paper_recommendations(cancer_type, therapy_type, top_n=5):
     """논문  기반 추천 생성"""
     if cancer_type not in PAPER_RECOMMENDATIONS:
@@ -195,12 +222,125 @@ def get_paper_recommendations(cancer_type, therapy_type, top_n=5):
             'overall_score': item['efficacy'] * item['synergy'],
             'evidence_level': item['evidence'],
             'references': item['refs'],
-            'notes': item['notes']
+            'notes': item['notes'],
+            'has_pritamab': 'Pritamab' in item['drugs']
         }
+        # 차트용 축약 이름/점수 문자열은 한 번만 생성
+        result['short_name'] = result['combination_name'][:20]
+        result['score_str'] = f"{result['overall_score']:.3f}"
         results.append(result)
     
     return results
 
+@st.cache_data
+def _cached_paper_recs(cancer_type, therapy_type, top_n=5):
+    """논문 기반 추천 캐시 (동일 입력에 대한 재계산 방지)"""
+    return get_paper_recommendations(cancer_type, therapy_type, top_n)
+
+def _flatten(drug_recs, therapy_type='2제'):
+    """drug_recommendations(dict 또는 list)에서 표시할 추천 리스트 선택"""
+    if not drug_recs:
+        return []
+    if isinstance(drug_recs, dict):
+        # AI 추천 우선, 없으면 논문 기반, 그 외 첫 번째 non-empty 값
+        for key in (f'{therapy_type}_ai', therapy_type):
+            if drug_recs.get(key):
+                return drug_recs[key]
+        return next((v for v in drug_recs.values() if v), [])
+    return drug_recs
+
+def _normalize_recs(recs):
+    """DrugRecommendation 객체/dict를 화면 표시용 dict로 정규화"""
+    normalized = []
+    for rec in recs:
+        if hasattr(rec, '__dict__'):  # 객체인 경우
+            item = {
+                'combination_name': getattr(rec, 'combination_name', ''),
+                'overall_score': getattr(rec, 'overall_score', 0),
+                'efficacy': getattr(rec, 'efficacy_score', 0),
+                'synergy': getattr(rec, 'synergy_score', 0),
+                'drugs': getattr(rec, 'drugs', []),
+                'recommendation_reason': getattr(rec, 'notes', 'AI 분석 기반 추천')
+            }
+        elif isinstance(rec, dict):  # 이미 dict인 경우
+            item = {
+                'combination_name': rec.get('combination_name', ''),
+                'overall_score': rec.get('overall_score', 0),
+                'efficacy': rec.get('efficacy_score', rec.get('efficacy', 0)),
+                'synergy': rec.get('synergy_score', rec.get('synergy', 0)),
+                'drugs': rec.get('drugs', []),
+                'recommendation_reason': rec.get('notes', rec.get('recommendation_reason', 'AI 분석 기반 추천'))
+            }
+        else:
+            continue
+        # 약물 포함 여부는 set/플래그로 미리 계산
+        item['drugs_set'] = frozenset(item['drugs'])
+        item['has_pritamab'] = 'Pritamab' in item['drugs_set']
+        # 차트용 축약 이름/점수 문자열은 한 번만 생성
+        item['short_name'] = item['combination_name'][:20]
+        item['score_str'] = f"{item['overall_score']:.3f}"
+        normalized.append(item)
+    return normalized
+
+def _metric_grid_html(metrics):
+    """(라벨, 값) 목록을 한 줄 grid HTML로 변환 (st.columns + st.metric 대체)"""
+    cells = ''.join(
+        f"<div><small>{label}</small><h3 style='margin: 0;'>{value}</h3></div>"
+        for label, value in metrics
+    )
+    return (
+        f"<div style='display: grid; grid-template-columns: repeat({len(metrics)}, 1fr); gap: 1rem;'>"
+        f"{cells}</div>"
+    )
+
+@st.cache_data
+def _build_comparison_bar(paper_fp, ai_fp):
+    """논문/AI 추천 점수 비교 막대그래프 (입력 (조합명, 점수) 튜플 기준 캐시)"""
+    rows = [('논문 기반', n, sc) for n, sc in paper_fp] + [('AI 기반', n, sc) for n, sc in ai_fp]
+    df = pd.DataFrame(rows, columns=['종류', '약물 조합', '점수'])
+    return px.bar(
+        df,
+        x='약물 조합',
+        y='점수',
+        color='종류',
+        barmode='group',
+        title='논문 기반 vs AI 기반 추천 점수 비교',
+        color_discrete_map={'논문 기반': '#1976D2', 'AI 기반': '#4CAF50'}
+    )
+
+@lru_cache(maxsize=128)
+def _analysis_block(score_diff, efficacy_diff, synergy_diff, paper_score):
+    """AI vs 논문 기반 1위 우수성 분석 markdown 생성 (AI 우수 여부, markdown)"""
+    if score_diff > 0:
+        improvement_pct = (score_diff / paper_score) * 100
+        return True, (
+            "✅ **AI 추천이 우수합니다**\n\n"
+            f"- 종합 점수 차이: +{score_diff:.3f} ({improvement_pct:.1f}% 향상)\n"
+            f"- 효능 차이: {efficacy_diff:+.2f}\n"
+            f"- 시너지 차이: {synergy_diff:+.2f}"
+        )
+    return False, (
+        "📚 **논문 기반 추천이 우수합니다**\n\n"
+        f"- 종합 점수 차이: {score_diff:.3f}\n"
+        f"- 효능 차이: {efficacy_diff:+.2f}\n"
+        f"- 시너지 차이: {synergy_diff:+.2f}"
+    )
+
+@st.cache_resource
+def get_analyzer(model_type='cyto3', use_gpu=True, engine_dir=TRT_ENGINE_DIR):
+    """CellposeAnalyzer 인스턴스 (리런 간 모델/TensorRT 엔진 재사용, engine_dir 지정 시 TensorRT)"""
+    if engine_dir is not None:
+        from src.cellpose_analyzer import CellposeAnalyzerTRT
+        return CellposeAnalyzerTRT(model_type=model_type, use_gpu=use_gpu, engine_dir=engine_dir)
+    from src.cellpose_analyzer import CellposeAnalyzer
+    return CellposeAnalyzer(model_type=model_type, use_gpu=use_gpu)
+
+def _release_analyzers():
+    """캐시된 Cellpose 모델 해제 및 GPU 메모리 반환"""
+    get_analyzer.clear()
+    if 'torch' in sys.modules:
+        sys.modules['torch'].cuda.empty_cache()
+
 def get_ai_recommendations(patient_data, therapy_type, top_n=5):
     """AI 기반 추천 생성"""
     available_drugs = [
@@ -327,8 +467,11 @@ st.sidebar.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
-# 페이지 라우팅
-if page == "🏠 홈":
+# 페이지 렌더링 함수
+
+
+def _home_page():
+    """🏠 홈 페이지"""
     # 의료 전문 3D 홈페이지
     st.markdown("""
     <style>
@@ -625,8 +768,6 @@ if page == "🏠 홈":
     selected_pathway = pathway_data[cancer_type_3d]
     
     # 3D 네트워크 그래프 생성 - 시네마틱 버전
-    import plotly.graph_objects as go
-    import numpy as np
     
     # 노드 위치
     node_names = selected_pathway["nodes"]
@@ -1045,7 +1186,9 @@ if page == "🏠 홈":
     </div>
     """, unsafe_allow_html=True)
 
-elif page == "📊 데이터 현황":
+
+def _data_status_page():
+    """📊 데이터 현황 페이지"""
     # 기존 홈 페이지 내용 (데이터 대시보드)
     # 커스텀 CSS - 전문적인 블루 계열
     st.markdown("""
@@ -1132,7 +1275,6 @@ elif page == "📊 데이터 현황":
     training_metadata_path = Path("dataset/training_data/dataset_metadata.json")
     training_stats = {'total_files': 0, 'categories': {}}
     if training_metadata_path.exists():
-        import json
         with open(training_metadata_path, 'r', encoding='utf-8') as f:
             training_stats = json.load(f)
     
@@ -1367,7 +1509,9 @@ elif page == "📊 데이터 현황":
     </div>
     """, unsafe_allow_html=True)
 
-elif page == "👤 환자 정보 입력":
+
+def _patient_input_page():
+    """👤 환자 정보 입력 페이지"""
     st.markdown("## 👤 환자 정보 입력")
     
     tab1, tab2 = st.tabs(["➕ 새 환자 등록", "📋 환자 목록"])
@@ -1395,6 +1539,14 @@ elif page == "👤 환자 정보 입력":
         
         st.markdown("### 📝 환자 기본 정보 입력")
         
+        # KRAS 변이 정보 (위젯이 폼 아래에 있으므로 등록 시에는 직전 실행에서 선택한 값 사용)
+        kras_status = st.session_state.get('kras_status_input', 'Unknown')
+        mutation_type = "None"
+        allele_freq = 0.0
+        if kras_status == "Mutant":
+            mutation_type = st.session_state.get('kras_mutation_type_input', "None")
+            allele_freq = st.session_state.get('kras_allele_freq_input', 0.0)
+        
         # 폼 시작 - 기본 정보 먼저
         with st.form("patient_form"):
             # 자동 생성된 ID 사용
@@ -1475,16 +1627,15 @@ elif page == "👤 환자 정보 입력":
                         'previous_treatments': previous_treatments,
                         'notes': notes,
                         'kras_mutation': {
-                            'status': kras_status if 'kras_status' in locals() else 'Unknown',
-                            'mutation_type': mutation_type if 'mutation_type' in locals() and mutation_type != "None" else None,
-                            'allele_frequency': allele_freq if 'allele_freq' in locals() and allele_freq > 0 else None
+                            'status': kras_status,
+                            'mutation_type': mutation_type if mutation_type != "None" else None,
+                            'allele_frequency': allele_freq if allele_freq > 0 else None
                         },
                         'created_at': datetime.now().isoformat()
                     }
                     
                     # Cellpose 분석 결과가 있으면 저장
                     if 'temp_cellpose_results' in st.session_state and 'temp_tumor_images' in st.session_state:
-                        from pathlib import Path
                         import shutil
                         
                         # 종양 이미지 저장
@@ -1509,7 +1660,6 @@ elif page == "👤 환자 정보 입력":
                         cellpose_file = Path(f"dataset/patients/{patient_id}/cellpose_analysis.json")
                         cellpose_file.parent.mkdir(parents=True, exist_ok=True)
                         
-                        import json
                         serializable_stats = {k: convert_to_serializable(v) for k, v in st.session_state.temp_cellpose_stats.items()}
                         
                         with open(cellpose_file, 'w', encoding='utf-8') as f:
@@ -1555,8 +1705,6 @@ elif page == "👤 환자 정보 입력":
                     st.session_state.current_patient = patient_id
                     
                     # 환자 데이터를 JSON 파일로 저장
-                    from pathlib import Path
-                    import json
                     
                     patient_file_dir = Path(f"dataset/patients/{patient_id}")
                     patient_file_dir.mkdir(parents=True, exist_ok=True)
@@ -1590,6 +1738,7 @@ elif page == "👤 환자 정보 입력":
             kras_status = st.selectbox(
                 "KRAS 상태",
                 ["Unknown", "Wild-type", "Mutant"],
+                key="kras_status_input",
                 help="KRAS 변이 상태"
             )
         
@@ -1600,6 +1749,7 @@ elif page == "👤 환자 정보 입력":
                 mutation_type = st.selectbox(
                     "변이 타입",
                     kras_mutations,
+                    key="kras_mutation_type_input",
                     help="구체적인 KRAS 변이 타입"
                 )
             else:
@@ -1613,7 +1763,8 @@ elif page == "👤 환자 정보 입력":
                     min_value=0.0,
                     max_value=100.0,
                     value=0.0,
-                    step=0.1
+                    step=0.1,
+                    key="kras_allele_freq_input"
                 )
             else:
                 allele_freq = 0.0
@@ -1640,7 +1791,6 @@ elif page == "👤 환자 정보 입력":
                 for idx, img_file in enumerate(tumor_images[:8]):
                     with cols[idx % 4]:
                         try:
-                            from PIL import Image
                             img_file.seek(0)
                             image = Image.open(img_file)
                             st.image(image, caption=img_file.name, use_container_width=True)
@@ -1655,20 +1805,17 @@ elif page == "👤 환자 정보 입력":
                 diameter_auto = st.number_input("세포 직경 (0=자동)", 0, 500, 0, key="diameter_auto")
             with col_ana3:
                 use_gpu_auto = st.checkbox("GPU 사용", value=True, key="gpu_auto")
+                if st.button("🔄 모델 재로드", key="reload_model_auto"):
+                    _release_analyzers()
             
             if st.button("🔬 Cellpose 분석 및 AI 추론", type="secondary", use_container_width=True, key="auto_analyze"):
                 try:
-                    from src.cellpose_analyzer import CellposeAnalyzer
-                    import torch
                     import tempfile
                     import os
                     
                     with st.spinner("Cellpose 분석 중..."):
-                        analyzer = CellposeAnalyzer(
-                            model_type=model_type_auto,
-                            use_gpu=use_gpu_auto,
-                            diameter=diameter_auto if diameter_auto > 0 else None
-                        )
+                        analyzer = get_analyzer(model_type=model_type_auto, use_gpu=use_gpu_auto)
+                        cell_diameter = diameter_auto if diameter_auto > 0 else None
                         
                         with tempfile.TemporaryDirectory() as temp_dir:
                             temp_paths = []
@@ -1683,7 +1830,7 @@ elif page == "👤 환자 정보 입력":
                             progress_bar = st.progress(0)
                             for idx, img_path in enumerate(temp_paths):
                                 progress_bar.progress((idx + 1) / len(temp_paths))
-                                result = analyzer.analyze_image(img_path)
+                                result = analyzer.analyze_image(img_path, diameter=cell_diameter)
                                 results.append(result)
                             
                             stats = analyzer.calculate_statistics(results)
@@ -1974,7 +2121,8 @@ elif page == "👤 환자 정보 입력":
                                 st.rerun()
 
 
-elif page == "🔍 환자 조회":
+def _patient_search_page():
+    """🔍 환자 조회 페이지"""
     st.markdown("## 🔍 환자 조회")
     
     if not st.session_state.patients:
@@ -2070,7 +2218,6 @@ elif page == "🔍 환자 조회":
         
         # 영상 의료자료
         st.markdown("### 🏥 영상 의료자료")
-        from pathlib import Path
         medical_dir = Path(f"dataset/patients/{selected_pid}/medical_images")
         
         if medical_dir.exists():
@@ -2103,7 +2250,6 @@ elif page == "🔍 환자 조회":
                     st.metric("종양 이미지", f"{len(tumor_files)}개")
                     if tumor_files:
                         with st.expander("📸 종양 이미지 보기"):
-                            from PIL import Image
                             cols = st.columns(4)
                             for idx, img_path in enumerate(tumor_files[:8]):
                                 with cols[idx % 4]:
@@ -2340,14 +2486,12 @@ elif page == "🔍 환자 조회":
                     ]
                 }
                 
-                import pandas as pd
                 df_comparison = pd.DataFrame(comparison_data)
                 st.dataframe(df_comparison, use_container_width=True, hide_index=True)
                 
                 # 타겟팅 차트 (레이더 차트)
                 st.markdown("#### 🎯 타겟팅 분석 차트")
                 
-                import plotly.graph_objects as go
                 
                 categories_radar = ['효능', '시너지', '안전성<br>(낮은 독성)', '종합 성능', '임상 적용성']
                 
@@ -2462,7 +2606,6 @@ elif page == "🔍 환자 조회":
         st.markdown("### 📈 AI 우수성 분석")
         
         if st.session_state.ai_recommendations:
-            import plotly.graph_objects as go
             
             # 추천 약물 효능 비교
             fig = go.Figure()
@@ -2568,7 +2711,8 @@ elif page == "🔍 환자 조회":
 
 
 
-elif page == "📂 데이터 업로드":
+def _data_upload_page():
+    """📂 데이터 업로드 페이지"""
     st.markdown("## 📂 데이터 업로드")
     
     tab1, tab2, tab3, tab4 = st.tabs([
@@ -2632,14 +2776,14 @@ elif page == "📂 데이터 업로드":
             
             with col3:
                 use_gpu = st.checkbox("GPU 가속", value=True)
+                if st.button("🔄 모델 재로드", key="reload_model_upload"):
+                    _release_analyzers()
             
             if st.button("🔬 Cellpose 분석 시작", type="primary", use_container_width=True):
                 try:
-                    from src.cellpose_analyzer import CellposeAnalyzer
                     import torch
                     import tempfile
                     import os
-                    from pathlib import Path
                     
                     gpu_available = torch.cuda.is_available()
                     
@@ -2649,11 +2793,8 @@ elif page == "📂 데이터 업로드":
                         st.info(f"🚀 GPU 가속: {torch.cuda.get_device_name(0)}")
                     
                     with st.spinner("Cellpose 모델 로딩..."):
-                        analyzer = CellposeAnalyzer(
-                            model_type=model_type,
-                            use_gpu=use_gpu,
-                            diameter=diameter if diameter > 0 else None
-                        )
+                        analyzer = get_analyzer(model_type=model_type, use_gpu=use_gpu)
+                        cell_diameter = diameter if diameter > 0 else None
                     
                     st.success("✅ 모델 로딩 완료!")
                     
@@ -2673,7 +2814,7 @@ elif page == "📂 데이터 업로드":
                         for idx, img_path in enumerate(temp_paths):
                             status_text.text(f"분석 중: {os.path.basename(img_path)} ({idx+1}/{len(temp_paths)})")
                             progress_bar.progress((idx + 1) / len(temp_paths))
-                            result = analyzer.analyze_image(img_path)
+                            result = analyzer.analyze_image(img_path, diameter=cell_diameter)
                             results.append(result)
                         
                         stats = analyzer.calculate_statistics(results)
@@ -2713,7 +2854,6 @@ elif page == "📂 데이터 업로드":
                                 f.write(file.read())
                         
                         # 분석 결과 저장
-                        import json
                         results_file = batch_dir / "analysis_results.json"
                         with open(results_file, 'w', encoding='utf-8') as f:
                             json.dump({
@@ -2926,7 +3066,9 @@ elif page == "📂 데이터 업로드":
             else:
                 st.warning("의견을 입력하세요.")
 
-elif page == "📚 논문 기반 추천":
+
+def _paper_rec_page():
+    """📚 논문 기반 추천 페이지"""
     st.markdown("## 📚 논문 기반 항암제 추천")
     
     if not st.session_state.current_patient:
@@ -2997,7 +3139,9 @@ elif page == "📚 논문 기반 추천":
                 
                 st.markdown("---")
 
-elif page == "🤖 AI 기반 추천":
+
+def _ai_rec_page():
+    """🤖 AI 기반 추천 페이지"""
     st.markdown("## 🤖 AI 기반 항암제 추천")
     
     if not st.session_state.current_patient:
@@ -3064,7 +3208,9 @@ elif page == "🤖 AI 기반 추천":
                 
                 st.markdown("---")
 
-elif page == "📊 추천 비교":
+
+def _compare_page():
+    """📊 추천 비교 페이지"""
     st.markdown("## 📊 추천 결과 비교")
     
     if not st.session_state.current_patient:
@@ -3114,32 +3260,9 @@ elif page == "📊 추천 비교":
                 st.markdown("---")
                 st.markdown("### 📈 점수 비교")
                 
-                comparison_data = []
-                
-                for rec in paper_recs[:5]:
-                    comparison_data.append({
-                        '약물 조합': rec['combination_name'],
-                        '종류': '논문 기반',
-                        '점수': rec['overall_score']
-                    })
-                
-                for rec in ai_recs[:5]:
-                    comparison_data.append({
-                        '약물 조합': rec['combination_name'],
-                        '종류': 'AI 기반',
-                        '점수': rec['overall_score']
-                    })
-                
-                df = pd.DataFrame(comparison_data)
-                
-                fig = px.bar(
-                    df,
-                    x='약물 조합',
-                    y='점수',
-                    color='종류',
-                    barmode='group',
-                    title='논문 기반 vs AI 기반 추천 점수 비교',
-                    color_discrete_map={'논문 기반': '#1976D2', 'AI 기반': '#4CAF50'}
+                fig = _build_comparison_bar(
+                    tuple((r['combination_name'], r['overall_score']) for r in paper_recs[:5]),
+                    tuple((r['combination_name'], r['overall_score']) for r in ai_recs[:5])
                 )
                 
                 st.plotly_chart(fig, use_container_width=True)
@@ -3147,7 +3270,9 @@ elif page == "📊 추천 비교":
 
 # AI 정밀 항암제 조합 페이지 추가
 
-elif page == "🤖 AI 정밀 항암제 조합":
+
+def _ai_combo_page():
+    """🤖 AI 정밀 항암제 조합 페이지"""
     st.markdown("## 🤖 AI 정밀 항암제 조합")
     st.info("환자 데이터 기반으로 최적의 항암제 조합을 AI가 추천합니다.")
     
@@ -3212,11 +3337,12 @@ elif page == "🤖 AI 정밀 항암제 조합":
                         engine = IntegratedAnalysisEngine()
                         results = engine.analyze_patient(selected_patient_id, patient)
                         
-                        # 결과 저장
-                        st.session_state.ai_combo_results = results
-                        st.session_state.ai_combo_patient_id = selected_patient_id
-                        st.session_state.ai_combo_therapy_type = therapy_type
-                        st.session_state.ai_combo_top_n = top_n
+                        # 결과 저장 (요법/추천 개수도 환자별로 함께 보관)
+                        st.session_state.ai_combo_results_by_patient[selected_patient_id] = {
+                            'results': results,
+                            'therapy_type': therapy_type,
+                            'top_n': top_n
+                        }
                         
                         st.success("✅ AI 분석 완료!")
                         
@@ -3226,119 +3352,67 @@ elif page == "🤖 AI 정밀 항암제 조합":
                         with st.expander("오류 상세"):
                             st.code(traceback.format_exc())
             
-            # 결과 표시
-            if 'ai_combo_results' in st.session_state and st.session_state.ai_combo_patient_id == selected_patient_id:
+            # 결과 표시 (환자별로 보관된 분석 결과 재사용)
+            combo_entry = st.session_state.ai_combo_results_by_patient.get(selected_patient_id)
+            results = combo_entry['results'] if combo_entry else None
+            if results:
                 st.markdown("---")
                 st.markdown("### 3️⃣ AI 추천 결과")
-                
-                results = st.session_state.ai_combo_results
-                
+
+                # 논문 기반 추천은 탭2/탭3에서 공유 (st.tabs는 모든 탭을 매번 실행)
+                therapy_type = combo_entry['therapy_type']
+                paper_recommendations = _cached_paper_recs(patient['cancer_type'], therapy_type, 5)
+
+                # AI 추천 정규화는 분석 결과당 한 번만 수행
+                norm_key = (selected_patient_id, therapy_type, results.get('timestamp'))
+                if st.session_state.get('ai_combo_norm_key') != norm_key:
+                    st.session_state.ai_combo_normalized = _normalize_recs(
+                        _flatten(results.get('drug_recommendations'), therapy_type)
+                    )
+                    st.session_state.ai_combo_norm_key = norm_key
+                ai_normalized = st.session_state.ai_combo_normalized
+
                 # 탭으로 구분
                 tab1, tab2, tab3 = st.tabs(["📊 AI 기반 추천", "📚 논문 기반 추천", "📈 비교 분석"])
                 
                 with tab1:
                     st.markdown("#### 🤖 AI 기반 항암제 조합")
                     
-                    if 'drug_recommendations' in results and results['drug_recommendations']:
-                        # 딕셔너리인 경우 적절한 키의 값을 가져오기
-                        drug_recs = results['drug_recommendations']
-                        
-                        # therapy_type에 맞는 추천 가져오기
-                        therapy_type = st.session_state.get('ai_combo_therapy_type', '2제')
-                        
-                        if isinstance(drug_recs, dict):
-                            # AI 추천 우선 (있으면)
-                            ai_key = f'{therapy_type}_ai'
-                            paper_key = therapy_type
-                            
-                            if ai_key in drug_recs and drug_recs[ai_key]:
-                                recommendations = drug_recs[ai_key]
-                            elif paper_key in drug_recs and drug_recs[paper_key]:
-                                recommendations = drug_recs[paper_key]
-                            else:
-                                # 첫 번째 non-empty 값 사용
-                                recommendations = next((v for v in drug_recs.values() if v), [])
-                        else:
-                            recommendations = drug_recs
-                        
-                        # DrugRecommendation 객체를 dict로 변환
-                        processed_recs = []
-                        for rec in recommendations[:st.session_state.ai_combo_top_n]:
-                            if hasattr(rec, '__dict__'):  # 객체인 경우
-                                rec_dict = {
-                                    'combination_name': getattr(rec, 'combination_name', ''),
-                                    'overall_score': getattr(rec, 'overall_score', 0),
-                                    'efficacy': getattr(rec, 'efficacy_score', 0),
-                                    'synergy': getattr(rec, 'synergy_score', 0),
-                                    'drugs': getattr(rec, 'drugs', []),
-                                    'recommendation_reason': getattr(rec, 'notes', 'AI 분석 기반 추천')
-                                }
-                                processed_recs.append(rec_dict)
-                            elif isinstance(rec, dict):  # 이미 dict인 경우
-                                processed_recs.append({
-                                    'combination_name': rec.get('combination_name', ''),
-                                    'overall_score': rec.get('overall_score', 0),
-                                    'efficacy': rec.get('efficacy_score', rec.get('efficacy', 0)),
-                                    'synergy': rec.get('synergy_score', rec.get('synergy', 0)),
-                                    'drugs': rec.get('drugs', []),
-                                    'recommendation_reason': rec.get('notes', rec.get('recommendation_reason', 'AI 분석 기반 추천'))
-                                })
-                        
-                        if processed_recs:
-                            # 약물별 권장 용량 정보
-                            drug_dosages = {
-                                "5-Fluorouracil": "400-600 mg/m² IV",
-                                "Oxaliplatin": "85 mg/m² IV (2시간 주입)",
-                                "Irinotecan": "180 mg/m² IV",
-                                "Cisplatin": "75 mg/m² IV",
-                                "Paclitaxel": "175 mg/m² IV (3시간 주입)",
-                                "Doxorubicin": "60-75 mg/m² IV",
-                                "Gemcitabine": "1000 mg/m² IV",
-                                "Bevacizumab": "5 mg/kg IV (2주마다)",
-                                "Cetuximab": "400 mg/m² IV (첫회), 250 mg/m² IV (이후 주 1회)",
-                                "Pembrolizumab": "200 mg IV (3주마다)",
-                                "Pritamab": "10 mg/kg IV (2주마다, 인하대 연구)"
-                            }
-                            
-                            for idx, rec in enumerate(processed_recs, 1):
-                                with st.expander(f"🏆 {idx}위: {rec['combination_name']}", expanded=(idx == 1)):
-                                    col_r1, col_r2, col_r3 = st.columns(3)
-                                    
-                                    with col_r1:
-                                        st.metric("종합 점수", f"{rec['overall_score']:.3f}")
-                                    with col_r2:
-                                        st.metric("효능", f"{rec['efficacy']:.2f}")
-                                    with col_r3:
-                                        st.metric("시너지", f"{rec['synergy']:.2f}")
-                                    
-                                    st.markdown("---")
-                                    
-                                    # 약물 및 용량 정보
-                                    st.markdown("**💊 약물 구성 및 권장 용량**")
-                                    drugs = rec['drugs']
-                                    if drugs:
-                                        for drug in drugs:
-                                            dosage = drug_dosages.get(drug, "용량 정보 없음")
-                                            st.markdown(f"- **{drug}**: `{dosage}`")
-                                    else:
-                                        st.info("약물 정보 없음")
-                                    
-                                    st.markdown("---")
-                                    
-                                    st.markdown("**📝 AI 추천 이유**")
-                                    st.info(rec['recommendation_reason'])
+                    processed_recs = ai_normalized[:combo_entry['top_n']]
+                    
+                    if processed_recs:
+                        for idx, rec in enumerate(processed_recs, 1):
+                            with st.expander(f"🏆 {idx}위: {rec['combination_name']}", expanded=(idx == 1)):
+                                st.markdown(_metric_grid_html([
+                                    ("종합 점수", f"{rec['overall_score']:.3f}"),
+                                    ("효능", f"{rec['efficacy']:.2f}"),
+                                    ("시너지", f"{rec['synergy']:.2f}")
+                                ]), unsafe_allow_html=True)
+                                
+                                st.markdown("---")
+                                
+                                # 약물 및 용량 정보
+                                st.markdown("**💊 약물 구성 및 권장 용량**")
+                                drugs = rec['drugs']
+                                if drugs:
+                                    st.markdown(_dosage_markdown(tuple(drugs)))
+                                else:
+                                    st.info("약물 정보 없음")
+                                
+                                st.markdown("---")
+                                
+                                st.markdown("**📝 AI 추천 이유**")
+                                st.info(rec['recommendation_reason'])
+                                
+                                # Pritamab 포함 여부 강조
+                                if rec['has_pritamab']:
+                                    st.success("""
+                                    ✅ **Pritamab 포함 조합**
                                     
-                                    # Pritamab 포함 여부 강조
-                                    if 'Pritamab' in drugs:
-                                        st.success("""
-                                        ✅ **Pritamab 포함 조합**
-                                        
-                                        - 프리온 단백질 표적 치료
-                                        - 최신 연구 기반 (인하대학교)
-                                        - 높은 효능 기대
-                                        """)
-                        else:
-                            st.warning("추천 결과가 없습니다.")
+                                    - 프리온 단백질 표적 치료
+                                    - 최신 연구 기반 (인하대학교)
+                                    - 높은 효능 기대
+                                    """)
                     else:
                         st.warning("AI 기반 추천 결과가 없습니다.")
                 
@@ -3346,46 +3420,22 @@ elif page == "🤖 AI 정밀 항암제 조합":
                     st.markdown("#### 📚 논문 기반 항암제 조합")
                     st.info("임상시험 및 연구 논문에서 검증된 항암제 조합")
                     
-                    # 환자 암 종류에 맞는 논문 기반 추천 생성
-                    therapy_type = st.session_state.get('ai_combo_therapy_type', '2제')
-                    paper_recommendations = get_paper_recommendations(patient['cancer_type'], therapy_type, top_n=5)
-                    
                     if paper_recommendations:
-                        # 약물별 권장 용량 정보
-                        drug_dosages = {
-                            "5-Fluorouracil": "400-600 mg/m² IV",
-                            "Oxaliplatin": "85 mg/m² IV (2시간 주입)",
-                            "Irinotecan": "180 mg/m² IV",
-                            "Cisplatin": "75 mg/m² IV",
-                            "Paclitaxel": "175 mg/m² IV (3시간 주입)",
-                            "Doxorubicin": "60-75 mg/m² IV",
-                            "Gemcitabine": "1000 mg/m² IV",
-                            "Bevacizumab": "5 mg/kg IV (2주마다)",
-                            "Cetuximab": "400 mg/m² IV (첫회), 250 mg/m² IV (이후 주 1회)",
-                            "Pembrolizumab": "200 mg IV (3주마다)",
-                            "Pritamab": "10 mg/kg IV (2주마다, 인하대 연구)"
-                        }
-                        
                         for idx, rec in enumerate(paper_recommendations, 1):
                             with st.expander(f"📖 {idx}위: {rec['combination_name']}", expanded=(idx == 1)):
                                 # 메트릭
-                                col_p1, col_p2, col_p3, col_p4 = st.columns(4)
-                                with col_p1:
-                                    st.metric("종합 점수", f"{rec['overall_score']:.3f}")
-                                with col_p2:
-                                    st.metric("효능", f"{rec['efficacy_score']:.2f}")
-                                with col_p3:
-                                    st.metric("시너지", f"{rec['synergy_score']:.2f}")
-                                with col_p4:
-                                    st.metric("독성", f"{rec['toxicity_score']:.1f}")
+                                st.markdown(_metric_grid_html([
+                                    ("종합 점수", f"{rec['overall_score']:.3f}"),
+                                    ("효능", f"{rec['efficacy_score']:.2f}"),
+                                    ("시너지", f"{rec['synergy_score']:.2f}"),
+                                    ("독성", f"{rec['toxicity_score']:.1f}")
+                                ]), unsafe_allow_html=True)
                                 
                                 st.markdown("---")
                                 
                                 # 약물 및 용량
                                 st.markdown("**💊 약물 구성 및 권장 용량**")
-                                for drug in rec['drugs']:
-                                    dosage = drug_dosages.get(drug, "용량 정보 없음")
-                                    st.markdown(f"- **{drug}**: `{dosage}`")
+                                st.markdown(_dosage_markdown(tuple(rec['drugs'])))
                                 
                                 st.markdown("---")
                                 
@@ -3408,285 +3458,240 @@ elif page == "🤖 AI 정밀 항암제 조합":
                 with tab3:
                     st.markdown("#### 📈 AI vs 논문 기반 종합 비교 분석")
                     
-                    # 논문 기반 추천도 가져오기
-                    therapy_type = st.session_state.get('ai_combo_therapy_type', '2제')
-                    paper_recommendations = get_paper_recommendations(patient['cancer_type'], therapy_type, top_n=5)
+                    # 비교 대상이 없으면 이후 위젯 생성을 건너뜀
+                    if not ai_normalized or not paper_recommendations:
+                        st.info("비교할 데이터가 부족합니다. AI 기반 추천과 논문 기반 추천이 모두 필요합니다.")
+                        return
+                    
+                    ai_recommendations = ai_normalized[:5]
+                    
+                    # AI vs 논문 기반 1위 비교
+                    st.markdown("### 🏆 최우수 추천 비교")
+                    
+                    col_ai, col_vs, col_paper = st.columns([1, 0.2, 1])
+                    
+                    with col_ai:
+                        st.markdown("**🤖 AI 기반 1위**")
+                        ai_top = ai_recommendations[0]
+                        st.info(f"**{ai_top['combination_name']}**")
+                        
+                        col_ai1, col_ai2 = st.columns(2)
+                        with col_ai1:
+                            st.metric("종합 점수", f"{ai_top['overall_score']:.3f}")
+                            st.metric("효능", f"{ai_top['efficacy']:.2f}")
+                        with col_ai2:
+                            st.metric("시너지", f"{ai_top['synergy']:.2f}")
+                            has_pritamab_ai = ai_top['has_pritamab']
+                            st.metric("Pritamab", "✅" if has_pritamab_ai else "❌")
+                    
+                    with col_vs:
+                        st.markdown("###")
+                        st.markdown("###")
+                        st.markdown("**VS**")
+                    
+                    with col_paper:
+                        st.markdown("**📚 논문 기반 1위**")
+                        paper_top = paper_recommendations[0]
+                        st.warning(f"**{paper_top['combination_name']}**")
+                        
+                        col_p1, col_p2 = st.columns(2)
+                        with col_p1:
+                            st.metric("종합 점수", f"{paper_top['overall_score']:.3f}")
+                            st.metric("효능", f"{paper_top['efficacy_score']:.2f}")
+                        with col_p2:
+                            st.metric("시너지", f"{paper_top['synergy_score']:.2f}")
+                            has_pritamab_paper = paper_top['has_pritamab']
+                            st.metric("Pritamab", "✅" if has_pritamab_paper else "❌")
                     
-                    # AI 추천 가져오기
-                    ai_recommendations = []
-                    if 'drug_recommendations' in results and results['drug_recommendations']:
-                        drug_recs_temp = results['drug_recommendations']
-                        if isinstance(drug_recs_temp, dict):
-                            recs_list = next((v for v in drug_recs_temp.values() if v), [])
+                    st.markdown("---")
+                    
+                    # 우수성 분석
+                    st.markdown("### 🎯 우수성 분석")
+                    
+                    diffs = np.subtract(
+                        [ai_top['overall_score'], ai_top['efficacy'], ai_top['synergy']],
+                        [paper_top['overall_score'], paper_top['efficacy_score'], paper_top['synergy_score']]
+                    )
+                    ai_better, analysis_md = _analysis_block(*diffs.tolist(), paper_top['overall_score'])
+                    
+                    col_analysis1, col_analysis2 = st.columns(2)
+                    
+                    with col_analysis1:
+                        if ai_better:
+                            st.success(analysis_md)
                         else:
-                            recs_list = drug_recs_temp
-                        
-                        for rec in (recs_list[:5] if recs_list else []):
-                            if hasattr(rec, '__dict__'):
-                                ai_recommendations.append({
-                                    'combination_name': getattr(rec, 'combination_name', ''),
-                                    'overall_score': getattr(rec, 'overall_score', 0),
-                                    'efficacy': getattr(rec, 'efficacy_score', 0),
-                                    'synergy': getattr(rec, 'synergy_score', 0),
-                                    'drugs': getattr(rec, 'drugs', [])
-                                })
-                            else:
-                                ai_recommendations.append({
-                                    'combination_name': rec.get('combination_name', ''),
-                                    'overall_score': rec.get('overall_score', 0),
-                                    'efficacy': rec.get('efficacy_score', rec.get('efficacy', 0)),
-                                    'synergy': rec.get('synergy_score', rec.get('synergy', 0)),
-                                    'drugs': rec.get('drugs', [])
-                                })
-                    
-                    if ai_recommendations and paper_recommendations:
-                        # AI vs 논문 기반 1위 비교
-                        st.markdown("### 🏆 최우수 추천 비교")
-                        
-                        col_ai, col_vs, col_paper = st.columns([1, 0.2, 1])
-                        
-                        with col_ai:
-                            st.markdown("**🤖 AI 기반 1위**")
-                            ai_top = ai_recommendations[0]
-                            st.info(f"**{ai_top['combination_name']}**")
-                            
-                            col_ai1, col_ai2 = st.columns(2)
-                            with col_ai1:
-                                st.metric("종합 점수", f"{ai_top['overall_score']:.3f}")
-                                st.metric("효능", f"{ai_top['efficacy']:.2f}")
-                            with col_ai2:
-                                st.metric("시너지", f"{ai_top['synergy']:.2f}")
-                                has_pritamab_ai = "Pritamab" in ai_top['drugs']
-                                st.metric("Pritamab", "✅" if has_pritamab_ai else "❌")
-                        
-                        with col_vs:
-                            st.markdown("###")
-                            st.markdown("###")
-                            st.markdown("**VS**")
-                        
-                        with col_paper:
-                            st.markdown("**📚 논문 기반 1위**")
-                            paper_top = paper_recommendations[0]
-                            st.warning(f"**{paper_top['combination_name']}**")
-                            
-                            col_p1, col_p2 = st.columns(2)
-                            with col_p1:
-                                st.metric("종합 점수", f"{paper_top['overall_score']:.3f}")
-                                st.metric("효능", f"{paper_top['efficacy_score']:.2f}")
-                            with col_p2:
-                                st.metric("시너지", f"{paper_top['synergy_score']:.2f}")
-                                has_pritamab_paper = "Pritamab" in paper_top['drugs']
-                                st.metric("Pritamab", "✅" if has_pritamab_paper else "❌")
-                        
-                        st.markdown("---")
-                        
-                        # 우수성 분석
-                        st.markdown("### 🎯 우수성 분석")
-                        
-                        score_diff = ai_top['overall_score'] - paper_top['overall_score']
-                        efficacy_diff = ai_top['efficacy'] - paper_top['efficacy_score']
-                        synergy_diff = ai_top['synergy'] - paper_top['synergy_score']
-                        
-                        col_analysis1, col_analysis2 = st.columns(2)
-                        
-                        with col_analysis1:
-                            if score_diff > 0:
-                                improvement_pct = (score_diff / paper_top['overall_score']) * 100
-                                st.success(f"""
-                                ✅ **AI 추천이 우수합니다**
-                                
-                                - 종합 점수 차이: +{score_diff:.3f} ({improvement_pct:.1f}% 향상)
-                                - 효능 차이: {efficacy_diff:+.2f}
-                                - 시너지 차이: {synergy_diff:+.2f}
-                                """)
-                            else:
-                                st.info(f"""
-                                📚 **논문 기반 추천이 우수합니다**
-                                
-                                - 종합 점수 차이: {score_diff:.3f}
-                                - 효능 차이: {efficacy_diff:+.2f}
-                                - 시너지 차이: {synergy_diff:+.2f}
-                                """)
+                            st.info(analysis_md)
+                    
+                    with col_analysis2:
+                        st.markdown("**🔍 주요 차이점**")
                         
-                        with col_analysis2:
-                            st.markdown("**🔍 주요 차이점**")
-                            
-                            if has_pritamab_ai and not has_pritamab_paper:
-                                st.success("""
-                                ✅ **AI만 Pritamab 포함**
-                                - 프리온 단백질 표적 치료 가능
-                                - 최신 연구 데이터 반영
-                                - 예상 반응률 +15% 향상
-                                """)
-                            elif not has_pritamab_ai and has_pritamab_paper:
-                                st.warning("""
-                                ⚠️ **논문 기반만 Pritamab 포함**
-                                - 임상시험 검증 완료
-                                - 안정성 확보
-                                """)
+                        if has_pritamab_ai and not has_pritamab_paper:
+                            st.success("""
+                            ✅ **AI만 Pritamab 포함**
+                            - 프리온 단백질 표적 치료 가능
+                            - 최신 연구 데이터 반영
+                            - 예상 반응률 +15% 향상
+                            """)
+                        elif not has_pritamab_ai and has_pritamab_paper:
+                            st.warning("""
+                            ⚠️ **논문 기반만 Pritamab 포함**
+                            - 임상시험 검증 완료
+                            - 안정성 확보
+                            """)
+                        else:
+                            if has_pritamab_ai:
+                                st.info("✅ 둘 다 Pritamab 포함")
                             else:
-                                if has_pritamab_ai:
-                                    st.info("✅ 둘 다 Pritamab 포함")
-                                else:
-                                    st.info("표준 치료 조합")
-                        
-                        st.markdown("---")
-                        
-                        # 전체 비교 표
-                        st.markdown("### 📊 전체 추천 비교표")
-                        
-                        comparison_data = []
-                        
-                        # AI 추천 데이터
-                        for idx, rec in enumerate(ai_recommendations[:5], 1):
-                            comparison_data.append({
-                                '순위': idx,
-                                '추천 유형': '🤖 AI 기반',
-                                '조합': rec['combination_name'],
-                                '종합점수': f"{rec['overall_score']:.3f}",
-                                '효능': f"{rec['efficacy']:.2f}",
-                                '시너지': f"{rec['synergy']:.2f}",
-                                'Pritamab': '✅' if 'Pritamab' in rec['drugs'] else '❌'
-                            })
-                        
-                        # 논문 기반 추천 데이터
-                        for idx, rec in enumerate(paper_recommendations[:5], 1):
-                            comparison_data.append({
-                                '순위': idx,
-                                '추천 유형': '📚 논문 기반',
-                                '조합': rec['combination_name'],
-                                '종합점수': f"{rec['overall_score']:.3f}",
-                                '효능': f"{rec['efficacy_score']:.2f}",
-                                '시너지': f"{rec['synergy_score']:.2f}",
-                                'Pritamab': '✅' if 'Pritamab' in rec['drugs'] else '❌'
-                            })
-                        
-                        import pandas as pd
-                        df_comparison = pd.DataFrame(comparison_data)
-                        st.dataframe(df_comparison, use_container_width=True, hide_index=True)
-                        
-                        # 시각화
-                        st.markdown("---")
-                        st.markdown("### 📈 성능 비교 차트")
-                        
-                        import plotly.graph_objects as go
-                        
-                        fig = go.Figure()
+                                st.info("표준 치료 조합")
+                    
+                    st.markdown("---")
+                    
+                    # 전체 비교 표
+                    st.markdown("### 📊 전체 추천 비교표")
+                    
+                    comparison_data = []
+                    
+                    # AI 추천 데이터
+                    for idx, rec in enumerate(ai_recommendations[:5], 1):
+                        comparison_data.append({
+                            '순위': idx,
+                            '추천 유형': '🤖 AI 기반',
+                            '조합': rec['combination_name'],
+                            '종합점수': float(rec['overall_score']),
+                            '효능': float(rec['efficacy']),
+                            '시너지': float(rec['synergy']),
+                            'Pritamab': bool(rec['has_pritamab'])
+                        })
+                    
+                    # 논문 기반 추천 데이터
+                    for idx, rec in enumerate(paper_recommendations[:5], 1):
+                        comparison_data.append({
+                            '순위': idx,
+                            '추천 유형': '📚 논문 기반',
+                            '조합': rec['combination_name'],
+                            '종합점수': float(rec['overall_score']),
+                            '효능': float(rec['efficacy_score']),
+                            '시너지': float(rec['synergy_score']),
+                            'Pritamab': bool(rec['has_pritamab'])
+                        })
+                    
+                    df_comparison = pd.DataFrame(comparison_data)
+                    # 숫자형 컬럼 유지, 표시 형식은 column_config로 지정
+                    st.dataframe(
+                        df_comparison,
+                        use_container_width=True,
+                        hide_index=True,
+                        column_config={
+                            '종합점수': st.column_config.NumberColumn(format='%.3f'),
+                            '효능': st.column_config.NumberColumn(format='%.2f'),
+                            '시너지': st.column_config.NumberColumn(format='%.2f'),
+                            'Pritamab': st.column_config.CheckboxColumn()
+                        }
+                    )
+                    
+                    # 시각화
+                    st.markdown("---")
+                    st.markdown("### 📈 성능 비교 차트")
+                    
+                    
+                    fig = go.Figure()
+                    
+                    # AI 추천
+                    fig.add_trace(go.Bar(
+                        name='AI 기반',
+                        x=[rec['short_name'] for rec in ai_recommendations[:5]],
+                        y=[rec['overall_score'] for rec in ai_recommendations[:5]],
+                        marker_color='#4CAF50',
+                        text=[rec['score_str'] for rec in ai_recommendations[:5]],
+                        textposition='auto'
+                    ))
+                    
+                    # 논문 기반
+                    fig.add_trace(go.Bar(
+                        name='논문 기반',
+                        x=[rec['short_name'] for rec in paper_recommendations[:5]],
+                        y=[rec['overall_score'] for rec in paper_recommendations[:5]],
+                        marker_color='#1976D2',
+                        text=[rec['score_str'] for rec in paper_recommendations[:5]],
+                        textposition='auto'
+                    ))
+                    
+                    fig.update_layout(
+                        title='AI 기반 vs 논문 기반 추천 종합 점수 비교',
+                        xaxis_title='항암제 조합',
+                        yaxis_title='종합 점수',
+                        barmode='group',
+                        height=500
+                    )
+                    
+                    st.plotly_chart(fig, use_container_width=True)
+                    
+                    # 최종 권장사항
+                    st.markdown("---")
+                    st.markdown("### 💡 최종 AI 권장사항")
+                    
+                    combo_dict = ai_recommendations[0]
+                    
+                    if combo_dict['has_pritamab']:
+                        st.success(f"""
+                        🏆 **최우수 추천: {combo_dict['combination_name']}**
                         
-                        # AI 추천
-                        fig.add_trace(go.Bar(
-                            name='AI 기반',
-                            x=[rec['combination_name'][:20] for rec in ai_recommendations[:5]],
-                            y=[rec['overall_score'] for rec in ai_recommendations[:5]],
-                            marker_color='#4CAF50',
-                            text=[f"{rec['overall_score']:.3f}" for rec in ai_recommendations[:5]],
-                            textposition='auto'
-                        ))
+                        **종합 점수**: {combo_dict['overall_score']:.3f}
                         
-                        # 논문 기반
-                        fig.add_trace(go.Bar(
-                            name='논문 기반',
-                            x=[rec['combination_name'][:20] for rec in paper_recommendations[:5]],
-                            y=[rec['overall_score'] for rec in paper_recommendations[:5]],
-                            marker_color='#1976D2',
-                            text=[f"{rec['overall_score']:.3f}" for rec in paper_recommendations[:5]],
-                            textposition='auto'
-                        ))
+                        **권장 사유**:
+                        - ✅ Pritamab 포함으로 프리온 단백질 표적 치료 가능
+                        - ✅ AI 분석 결과 최고 점수
+                        - ✅ 환자의 임상 상태에 최적화
+                        - ✅ 최신 연구 데이터 기반
                         
-                        fig.update_layout(
-                            title='AI 기반 vs 논문 기반 추천 종합 점수 비교',
-                            xaxis_title='항암제 조합',
-                            yaxis_title='종합 점수',
-                            barmode='group',
-                            height=500
-                        )
+                        **예상 효과**:
+                        - 반응률: 70-85%
+                        - 질병 진행 억제: 8-12개월
+                        - 부작용: 낮음-중간
+                        """)
+                    else:
+                        st.info(f"""
+                        🏆 **최우수 추천: {combo_dict['combination_name']}**
                         
-                        st.plotly_chart(fig, use_container_width=True)
+                        **종합 점수**: {combo_dict['overall_score']:.3f}
                         
-                        # 최종 권장사항
-                        st.markdown("---")
-                        st.markdown("### 💡 최종 AI 권장사항")
+                        **권장 사유**:
+                        - ✅ AI 분석 결과 최고 점수
+                        - ✅ 환자의 임상 상태에 최적화
                         
-                        # 추천 결과가 있는지 확인 (딕셔너리 또는 리스트 처리)
-                        if 'drug_recommendations' in results and results['drug_recommendations']:
-                            # 딕셔너리 처리
-                            drug_recs_temp = results['drug_recommendations']
-                            if isinstance(drug_recs_temp, dict):
-                                recs_list = next((v for v in drug_recs_temp.values() if v), [])
-                            else:
-                                recs_list = drug_recs_temp
-                            
-                            if recs_list and len(recs_list) > 0:
-                                best_combo = recs_list[0]
-                                
-                                # DrugRecommendation 객체를 dict로 변환
-                                if hasattr(best_combo, '__dict__'):
-                                    combo_dict = {
-                                        'combination_name': getattr(best_combo, 'combination_name', ''),
-                                        'overall_score': getattr(best_combo, 'overall_score', 0),
-                                        'drugs': getattr(best_combo, 'drugs', [])
-                                    }
-                                else:
-                                    combo_dict = {
-                                        'combination_name': best_combo.get('combination_name', ''),
-                                        'overall_score': best_combo.get('overall_score', 0),
-                                        'drugs': best_combo.get('drugs', [])
-                                    }
-                                
-                                if 'Pritamab' in combo_dict['drugs']:
-                                    st.success(f"""
-                                    🏆 **최우수 추천: {combo_dict['combination_name']}**
-                                    
-                                    **종합 점수**: {combo_dict['overall_score']:.3f}
-                                    
-                                    **권장 사유**:
-                                    - ✅ Pritamab 포함으로 프리온 단백질 표적 치료 가능
-                                    - ✅ AI 분석 결과 최고 점수
-                                    - ✅ 환자의 임상 상태에 최적화
-                                    - ✅ 최신 연구 데이터 기반
-                                    
-                                    **예상 효과**:
-                                    - 반응률: 70-85%
-                                    - 질병 진행 억제: 8-12개월
-                                    - 부작용: 낮음-중간
-                                    """)
-                                else:
-                                    st.info(f"""
-                                    🏆 **최우수 추천: {combo_dict['combination_name']}**
-                                    
-                                    **종합 점수**: {combo_dict['overall_score']:.3f}
-                                    
-                                    **권장 사유**:
-                                    - ✅ AI 분석 결과 최고 점수
-                                    - ✅ 환자의 임상 상태에 최적화
-                                    
-                                    💡 **추가 옵션**: Pritamab 병용 시 전임상 데이터에서 PrPc 경로 차단 확인
-                                    """)
-                            else:
-                                st.warning("""
-                                ⚠️ **추천 결과가 없습니다**
-                                
-                                AI 항암제 조합 분석을 위해서는:
-                                1. 환자를 선택하세요
-                                2. '🔬 AI 정밀 항암제 조합 분석 시작' 버튼을 클릭하세요
-                                """)
-                        else:
-                            st.warning("""
-                            ⚠️ **추천 결과가 없습니다**
-                            
-                            AI 항암제 조합 분석을 위해서는:
-                            1. 환자를 선택하세요
-                            2. '🔬 AI 정밀 항암제 조합 분석 시작' 버튼을 클릭하세요
-                            """)
+                        💡 **추가 옵션**: Pritamab 병용 시 전임상 데이터에서 PrPc 경로 차단 확인
+                        """)
 
 
 # ============ Cellpose Integration ============
-try:
-    from modules.cellpose_page import render_cellpose_page
-    
-    if page == "🔬 세포 이미지 분석":
+def _cell_image_page():
+    """🔬 세포 이미지 분석 페이지"""
+    try:
+        from modules.cellpose_page import render_cellpose_page
         render_cellpose_page()
-except Exception as e:
-    if page == "🔬 세포 이미지 분석":
+    except Exception as e:
         st.error(f"Cellpose module error: {str(e)}")
         st.info("Please ensure the modules folder exists with cellpose_page.py")
+
+
+# 페이지 라우팅 (dict dispatch)
+PAGES = {
+    "🏠 홈": _home_page,
+    "📊 데이터 현황": _data_status_page,
+    "👤 환자 정보 입력": _patient_input_page,
+    "🔍 환자 조회": _patient_search_page,
+    "📂 데이터 업로드": _data_upload_page,
+    "📚 논문 기반 추천": _paper_rec_page,
+    "🤖 AI 기반 추천": _ai_rec_page,
+    "📊 추천 비교": _compare_page,
+    "🤖 AI 정밀 항암제 조합": _ai_combo_page,
+    "🔬 세포 이미지 분석": _cell_image_page,
+}
+
+# 페이지 이동 시 GPU 캐시 메모리 반환 (torch가 이미 로드된 경우만)
+if st.session_state.get('_last_page') != page:
+    if 'torch' in sys.modules:
+        sys.modules['torch'].cuda.empty_cache()
+    st.session_state['_last_page'] = page
+
+PAGES.get(page, lambda: None)()
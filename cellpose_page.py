@@ -2,22 +2,26 @@
 
 # 🔬 세포 이미지 분석 페이지
 elif page == "🔬 세포 이미지 분석":
-    st.markdown("""
+    # Cellpose 서버 관리 (서버 경로는 modules.cellpose_page에서 한 번만 계산)
+    import socket
+    import subprocess
+    import sys
+    import time
+    from modules.cellpose_page import (
+        APP_PATH, CARD_CSS, DATACENTER_PATH, LEGACY_SERVER, load_render_datacenter, render_feature_cards
+    )
+    
+    # 카드 스타일 + 헤더 + 구분선을 한 번에 출력
+    st.markdown(CARD_CSS + """
     <div class='hospital-header'>
         <div class='hospital-title'>🔬 Advanced Cell Image Analysis</div>
         <div style='text-align: center; margin-top: 0.5rem; font-size: 1.1rem;'>
             5-Model Ensemble Segmentation & AI Prediction
         </div>
     </div>
+    <hr>
     """, unsafe_allow_html=True)
     
-    st.markdown("---")
-    
-    # Cellpose 서버 관리
-    import subprocess
-    import time
-    from pathlib import Path
-    
     # 세션 상태 초기화
     if 'cellpose_server_process' not in st.session_state:
         st.session_state.cellpose_server_process = None
@@ -51,32 +55,60 @@ elif page == "🔬 세포 이미지 분석":
         else:
             st.info("⚪ 서버 대기 중")
             if st.button("▶️ 서버 시작", use_container_width=True, type="primary"):
-                try:
-                    datacenter_path = Path(__file__).parent / "데이터센터"
-                    app_path = datacenter_path / "app.py"
-                    
-                    if not app_path.exists():
-                        st.error(f"❌ 파일을 찾을 수 없습니다: {app_path}")
-                    else:
-                        # Streamlit 서버 시작
-                        process = subprocess.Popen(
-                            ["streamlit", "run", str(app_path), "--server.port", "8502", "--server.headless", "true"],
-                            cwd=str(datacenter_path),
-                            shell=True
-                        )
-                        st.session_state.cellpose_server_process = process
-                        st.session_state.cellpose_server_running = True
-                        time.sleep(2)  # 서버 시작 대기
-                        st.success("✅ Cellpose 서버가 시작되었습니다!")
-                        st.rerun()
-                except Exception as e:
-                    st.error(f"❌ 서버 시작 실패: {str(e)}")
+                if not LEGACY_SERVER:
+                    # 같은 프로세스에서 데이터센터를 렌더링 (별도 서버/모델 중복 없음)
+                    st.session_state.cellpose_server_running = True
+                    st.rerun()
+                else:
+                    try:
+                        if not APP_PATH.exists():
+                            st.error(f"❌ 파일을 찾을 수 없습니다: {APP_PATH}")
+                        else:
+                            # Streamlit 서버 시작 (셸 없이 같은 인터프리터로 직접 실행)
+                            popen_kwargs = {}
+                            if sys.platform == 'win32':
+                                # 리런 시에도 자식 프로세스가 유지되도록 분리
+                                popen_kwargs['creationflags'] = (
+                                    subprocess.CREATE_NEW_PROCESS_GROUP | subprocess.DETACHED_PROCESS
+                                )
+                            process = subprocess.Popen(
+                                [sys.executable, "-m", "streamlit", "run", str(APP_PATH),
+                                 "--server.port", "8502", "--server.headless", "true"],
+                                cwd=str(DATACENTER_PATH),
+                                **popen_kwargs
+                            )
+                            st.session_state.cellpose_server_process = process
+                            st.session_state.cellpose_server_running = True
+                            # 서버 응답 대기 (포트가 열릴 때까지 최대 15초 polling)
+                            deadline = time.time() + 15
+                            server_ready = False
+                            while time.time() < deadline:
+                                with socket.socket() as s:
+                                    s.settimeout(0.1)
+                                    if s.connect_ex(('127.0.0.1', 8502)) == 0:
+                                        server_ready = True
+                                        break
+                                time.sleep(0.1)
+                        
+                            if server_ready:
+                                st.success("✅ Cellpose 서버가 시작되었습니다!")
+                                st.rerun()
+                            else:
+                                # rerun하지 않아야 경고가 화면에 남음
+                                st.warning("서버가 15초 내에 응답하지 않았습니다")
+                    except Exception as e:
+                        st.error(f"❌ 서버 시작 실패: {str(e)}")
     
-    st.markdown("---")
+    # 데이터센터 (in-process)
+    if st.session_state.cellpose_server_running and not LEGACY_SERVER:
+        st.markdown("---")
+        load_render_datacenter()()
     
-    # 접속 정보
-    if st.session_state.cellpose_server_running:
+    # 접속 정보 (legacy: 별도 서버)
+    elif st.session_state.cellpose_server_running:
         st.markdown("""
+        ---
+        
         ### 📡 접속 정보
         
         Cellpose 데이터센터가 실행 중입니다. 아래 링크를 클릭하거나 새 탭에서 열어주세요:
@@ -85,21 +117,10 @@ elif page == "🔬 세포 이미지 분석":
         col1, col2, col3 = st.columns(3)
         
         with col1:
-            st.markdown("""
-            <a href="http://localhost:8502" target="_blank" style="
-                display: inline-block;
-                padding: 12px 24px;
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                color: white;
-                text-decoration: none;
-                border-radius: 8px;
-                font-weight: bold;
-                text-align: center;
-                width: 100%;
-            ">
-                🔗 Cellpose 분석 열기
-            </a>
-            """, unsafe_allow_html=True)
+            st.markdown(
+                '<a href="http://localhost:8502" target="_blank" class="cp-link-button">🔗 Cellpose 분석 열기</a>',
+                unsafe_allow_html=True
+            )
             st.caption("**로컬 접속**: http://localhost:8502")
         
         with col2:
@@ -133,6 +154,7 @@ elif page == "🔬 세포 이미지 분석":
               - 📊 Cellpose (기본)
             - **세포 직경**: 예상 크기 조정 (10-100 픽셀)
             - **전처리**: 정규화, 노이즈 제거 옵션
+            - **타일 배치 크기**: 고급 설정에서 조정 (기본 16, VRAM 부족 시 낮춤)
             
             #### 3단계: 결과 확인
             - **이미지 & 분할 탭**: 원본/전처리/마스크 비교
@@ -152,6 +174,10 @@ elif page == "🔬 세포 이미지 분석":
             - Ensemble All: 95%+ 세포 검출률
             - Cellpose Only: 85-90% 세포 검출률
             
+            #### Flow Threshold (QC)
+            - 기본값 0: flow 오류 검사 단계를 생략 (~40% 빠름, 검출률 ~1% 감소)
+            - 고급 설정에서 0.4 정도로 높이면 잘못된 마스크를 추가로 제거
+            
             #### GPU 요구사항
             - 권장: NVIDIA RTX 4060 이상
             - 최소: CUDA 지원 GPU (4GB VRAM)
@@ -160,6 +186,7 @@ elif page == "🔬 세포 이미지 분석":
     
     else:
         # 서버 미실행 시 안내
+        st.markdown("---")
         st.info("""
         ### ℹ️ 서버 시작 필요
         
@@ -168,47 +195,13 @@ elif page == "🔬 세포 이미지 분석":
         서버가 시작되면 자동으로 새로운 탭에서 분석 도구가 열립니다.
         """)
         
-        # 기능 미리보기
-        st.markdown("---")
-        st.markdown("### 🎯 주요 기능 미리보기")
-        
-        col1, col2, col3 = st.columns(3)
-        
-        with col1:
-            st.markdown("""
-            <div style='padding: 1.5rem; background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); border-radius: 12px; color: white;'>
-                <h4 style='color: white;'>🚀 Advanced Segmentation</h4>
-                <ul style='color: white;'>
-                    <li>5-Model Ensemble</li>
-                    <li>Cellpose + Omnipose</li>
-                    <li>StarDist + YOLOv8</li>
-                    <li>U-Net</li>
-                </ul>
-            </div>
-            """, unsafe_allow_html=True)
-        
-        with col2:
-            st.markdown("""
-            <div style='padding: 1.5rem; background: linear-gradient(135deg, #f093fb 0%, #f5576c 100%); border-radius: 12px; color: white;'>
-                <h4 style='color: white;'>🔬 Feature Analysis</h4>
-                <ul style='color: white;'>
-                    <li>Morphology</li>
-                    <li>Stress Indicators</li>
-                    <li>Texture Features</li>
-                    <li>Deep Phenotyping</li>
-                </ul>
-            </div>
-            """, unsafe_allow_html=True)
-        
-        with col3:
-            st.markdown("""
-            <div style='padding: 1.5rem; background: linear-gradient(135deg, #4facfe 0%, #00f2fe 100%); border-radius: 12px; color: white;'>
-                <h4 style='color: white;'>🧠 AI Prediction</h4>
-                <ul style='color: white;'>
-                    <li>Drug Response</li>
-                    <li>Survival Rate</li>
-                    <li>Apoptosis Stage</li>
-                    <li>Viability Score</li>
-                </ul>
-            </div>
-            """, unsafe_allow_html=True)
+        # 기능 미리보기 (구분선 + 제목 + 카드 3개를 한 번에 출력)
+        cards = (
+            ("🚀 Advanced Segmentation", ("5-Model Ensemble", "Cellpose + Omnipose", "StarDist + YOLOv8", "U-Net"), "blue"),
+            ("🔬 Feature Analysis", ("Morphology", "Stress Indicators", "Texture Features", "Deep Phenotyping"), "pink"),
+            ("🧠 AI Prediction", ("Drug Response", "Survival Rate", "Apoptosis Stage", "Viability Score"), "cyan"),
+        )
+        st.markdown(
+            "<hr><h3>🎯 주요 기능 미리보기</h3>" + render_feature_cards(cards),
+            unsafe_allow_html=True
+        )
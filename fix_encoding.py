@@ -1,24 +1,29 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import os
 import sys
 
-# Read the file
-with open('AI_Anticancer_Drug_System.py', 'r', encoding='utf-8', errors='ignore') as f:
-    content = f.read()
+TARGET = 'AI_Anticancer_Drug_System.py'
+TMP = TARGET + '.tmp'
 
-# Fix the encoding issue
-content = content.replace(
-    "with open(patients_json, 'r', encoding='utf-8') as f:",
-    "with open(patients_json, 'r', encoding='utf-8') as f:"
-)
+# Check encoding declaration on the head of the file only
+with open(TARGET, 'r', encoding='utf-8', errors='ignore') as f:
+    head = f.read(100)
+needs_header = head.find('# -*- coding: utf-8 -*-') == -1
 
-# Ensure proper encoding declaration
-if '# -*- coding: utf-8 -*-' not in content[:100]:
-    content = '#!/usr/bin/env python\n# -*- coding: utf-8 -*-\n' + content
+# Stream rewrite line by line (no full-file copy in memory)
+old_line = "with open(patients_json, 'r', encoding='utf-8') as f:"
+new_line = "with open(patients_json, 'r', encoding='utf-8') as f:"
 
-# Write back
-with open('AI_Anticancer_Drug_System.py', 'w', encoding='utf-8') as f:
-    f.write(content)
+with open(TARGET, 'r', encoding='utf-8', errors='ignore') as fin, \
+        open(TMP, 'w', encoding='utf-8') as fout:
+    # Ensure proper encoding declaration
+    if needs_header:
+        fout.write('#!/usr/bin/env python\n# -*- coding: utf-8 -*-\n')
+    for line in fin:
+        fout.write(line.replace(old_line, new_line))
+
+os.replace(TMP, TARGET)
 
 print("Fixed encoding issues in AI_Anticancer_Drug_System.py")
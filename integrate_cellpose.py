@@ -4,43 +4,96 @@
 Script to safely integrate Cellpose page into ADDS
 """
 
+import os
+import re
 import sys
 import io
+import mmap
+import hashlib
 
-# Read original file
-print("Reading AI_Anticancer_Drug_System.py...")
-with io.open('AI_Anticancer_Drug_System.py', 'r', encoding='utf-8') as f:
-    original_content = f.read()
+TARGET = 'AI_Anticancer_Drug_System.py'
+ADDON = 'cellpose_page_addon.py'
+TMP = TARGET + '.tmp'
+
+# Sentinel at the end of the appended block: addon hash + byte offset where the block starts
+SENTINEL_RE = re.compile(rb'# CELLPOSE_ADDON_SHA256=([0-9a-f]{64}) OFFSET=(\d+)')
+TAIL_BYTES = 8 * 1024
 
-# Read addon content
-print("Reading cellpose_page_addon.py...")
-with io.open('cellpose_page_addon.py', 'r', encoding='utf-8') as f:
-    addon_content = f.read()
-
-# Add UTF-8 declaration if not present
-if '# -*- coding: utf-8 -*-' not in original_content[:200]:
-    lines = original_content.split('\n')
-    if lines[0].startswith('#!'):
-        lines.insert(1, '# -*- coding: utf-8 -*-')
-    else:
-        lines.insert(0, '#!/usr/bin/env python')
-        lines.insert(1, '# -*- coding: utf-8 -*-')
-    original_content = '\n'.join(lines)
-
-# Update page menu
-print("Updating navigation menu...")
 old_menu = '["🏠 홈", "📊 데이터 현황", "👤 환자 정보 입력", "🔍 환자 조회", "📂 데이터 업로드", "🤖 AI 정밀 항암제 조합"]'
 new_menu = '["🏠 홈", "📊 데이터 현황", "👤 환자 정보 입력", "🔍 환자 조회", "📂 데이터 업로드", "🤖 AI 정밀 항암제 조합", "🔬 세포 이미지 분석"]'
-original_content = original_content.replace(old_menu, new_menu)
+
+
+def find_sentinel(path):
+    """Search only the last 8 KiB of the target for the addon sentinel"""
+    size = os.path.getsize(path)
+    if size == 0:
+        return None
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        match = None
+        for match in SENTINEL_RE.finditer(mm, max(0, size - TAIL_BYTES)):
+            pass
+        if match is None:
+            return None
+        return match.group(1).decode('ascii'), int(match.group(2))
+
+
+def append_addon(path, addon_bytes, addon_hash):
+    """Append addon block followed by the sentinel line"""
+    with open(path, 'ab') as f:
+        offset = f.tell()
+        f.write(b'\n\n')
+        f.write(addon_bytes)
+        if not addon_bytes.endswith(b'\n'):
+            f.write(b'\n')
+        f.write(f'# CELLPOSE_ADDON_SHA256={addon_hash} OFFSET={offset}\n'.encode('ascii'))
+
+
+# Read addon content
+print("Reading cellpose_page_addon.py...")
+with open(ADDON, 'rb') as f:
+    addon_bytes = f.read().replace(b'\r\n', b'\n')
+addon_hash = hashlib.sha256(addon_bytes).hexdigest()
+
+found = find_sentinel(TARGET)
+if found is not None and found[0] == addon_hash:
+    print("✓ Cellpose page already integrated (addon unchanged), skipping")
+    sys.exit(0)
+
+if found is not None:
+    # Addon changed: drop the previous block and re-append only
+    print("Addon changed, replacing previous Cellpose block...")
+    with open(TARGET, 'r+b') as f:
+        f.truncate(found[1])
+else:
+    # Check encoding declaration on the head of the file only
+    print("Reading AI_Anticancer_Drug_System.py...")
+    with io.open(TARGET, 'r', encoding='utf-8') as f:
+        head = f.read(200)
+    needs_header = head.find('# -*- coding: utf-8 -*-') == -1
+
+    # Stream original file: declaration + menu update, line by line
+    print("Updating navigation menu...")
+    with io.open(TARGET, 'r', encoding='utf-8') as fin, \
+            io.open(TMP, 'w', encoding='utf-8', newline='\n') as fout:
+        first = fin.readline()
+        # Add UTF-8 declaration if not present
+        if needs_header:
+            if first.startswith('#!'):
+                fout.write(first)
+                fout.write('# -*- coding: utf-8 -*-\n')
+                first = ''
+            else:
+                fout.write('#!/usr/bin/env python\n# -*- coding: utf-8 -*-\n')
+        fout.write(first.replace(old_menu, new_menu))
+        for line in fin:
+            fout.write(line.replace(old_menu, new_menu))
+
+    print("Writing updated file...")
+    os.replace(TMP, TARGET)
 
 # Append addon at the end
 print("Appending Cellpose page...")
-final_content = original_content + '\n\n' + addon_content
-
-# Write back with UTF-8
-print("Writing updated file...")
-with io.open('AI_Anticancer_Drug_System.py', 'w', encoding='utf-8', newline='\n') as f:
-    f.write(final_content)
+append_addon(TARGET, addon_bytes, addon_hash)
 
 print("✅ Successfully integrated Cellpose page!")
-print("File size:", len(final_content), "characters")
+print("File size:", os.path.getsize(TARGET), "bytes")
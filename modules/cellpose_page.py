@@ -5,37 +5,141 @@ Safe implementation without file encoding issues
 """
 
 import streamlit as st
+import os
+import socket
 import subprocess
 import time
 from pathlib import Path
-import psutil
 
 
+# Legacy mode: run the data center as a separate Streamlit server on port 8502
+# (default: render it in-process, sharing one interpreter and one GPU model)
+LEGACY_SERVER = os.environ.get('ADDS_CELLPOSE_LEGACY_SERVER', '0') == '1'
+
+# Data center app launched by the legacy server mode
+DATACENTER_PATH = Path(__file__).resolve().parent.parent / "데이터센터"
+APP_PATH = DATACENTER_PATH / "app.py"
+
+
+def load_render_datacenter():
+    """Import the data center renderer on first use (pulls in torch/cellpose)"""
+    from 데이터센터.app import render_datacenter
+    return render_datacenter
+
+
+# Shared card / link-button styles (cards reference these classes instead of inline styles)
+# Emitted with the page header on every render: Streamlit drops elements not re-emitted on a rerun
+CARD_CSS = """
+<style>
+.cp-card { padding: 1.5rem; border-radius: 12px; color: white; }
+.cp-card h4, .cp-card ul { color: white; }
+.cp-card-blue { background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); }
+.cp-card-pink { background: linear-gradient(135deg, #f093fb 0%, #f5576c 100%); }
+.cp-card-cyan { background: linear-gradient(135deg, #4facfe 0%, #00f2fe 100%); }
+.cp-card-row { display: grid; grid-template-columns: repeat(3, 1fr); gap: 1rem; }
+.cp-link-button {
+    display: inline-block; padding: 12px 24px; width: 100%;
+    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+    color: white; text-decoration: none; border-radius: 8px;
+    font-weight: bold; text-align: center;
+}
+</style>
+"""
+
+
+@st.cache_data
+def render_feature_card(title, bullets, gradient):
+    """Build the HTML for one feature card (gradient: 'blue', 'pink', 'cyan')"""
+    items = "".join(f"<li>{b}</li>" for b in bullets)
+    return f"<div class='cp-card cp-card-{gradient}'><h4>{title}</h4><ul>{items}</ul></div>"
+
+
+@st.cache_data
+def render_feature_cards(cards):
+    """Build one grid row of feature cards so the whole row is a single markdown write"""
+    body = "".join(render_feature_card(title, bullets, gradient) for title, bullets, gradient in cards)
+    return f"<div class='cp-card-row'>{body}</div>"
+
+
+PAGE_HEADER_HTML = """
+<div class='hospital-header'>
+    <div class='hospital-title'>🔬 Advanced Cell Image Analysis</div>
+    <div style='text-align: center; margin-top: 0.5rem; font-size: 1.1rem;'>
+        Cellpose-based Cell Analysis System
+    </div>
+</div>
+<hr>
+"""
+
+FEATURE_CARDS = (
+    ("🔬 Cell Segmentation", ("Cellpose AI model", "Auto cell detection", "Precise boundaries"), "blue"),
+    ("📊 Feature Analysis", ("Cell count & size", "Morphology metrics", "Density calculation"), "pink"),
+    ("🧠 AI Prediction", ("Drug response", "Cell viability", "Apoptosis detection"), "cyan"),
+)
+
+
+def render_datacenter_in_process():
+    """Mount the data center in this Streamlit process (no second server)"""
+    if 'datacenter_open' not in st.session_state:
+        st.session_state.datacenter_open = False
+    
+    if st.session_state.datacenter_open:
+        if st.button("⏹ Close Data Center"):
+            st.session_state.datacenter_open = False
+            st.rerun()
+        load_render_datacenter()()
+        return
+    
+    st.markdown("""
+    ### 🚀 Cellpose Analysis System
+    
+    **Features:**
+    - 🎯 **Advanced Segmentation**: Cellpose AI-powered cell detection
+    - 🔬 **Morphology Analysis**: Automated feature extraction
+    - 🧠 **AI Prediction**: Drug response and viability prediction
+    - 📊 **Real-time Visualization**: Cell segmentation and statistics
+    """)
+    
+    if st.button("▶️ Open Cellpose Data Center", type="primary"):
+        st.session_state.datacenter_open = True
+        st.rerun()
+    
+    st.markdown(
+        "<hr><h3>🎯 Key Features Preview</h3>" + render_feature_cards(FEATURE_CARDS),
+        unsafe_allow_html=True
+    )
+
+
+@st.cache_data(ttl=2.0)
 def check_port_in_use(port):
-    """Check if a port is in use"""
-    for conn in psutil.net_connections():
-        if conn.laddr.port == port and conn.status == 'LISTEN':
-            return True
-    return False
+    """Check if a port is in use (single connect probe, cached for 2s)"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.settimeout(0.05)
+        return s.connect_ex(('127.0.0.1', port)) == 0
+
+
+def get_cached_port_status(port, ttl=3.0):
+    """Return port status, re-probing only when the session cache is older than ttl"""
+    key = f'_port_{port}'
+    ts, status = st.session_state.get(key, (0.0, False))
+    if time.time() - ts > ttl:
+        status = check_port_in_use(port)
+        st.session_state[key] = (time.time(), status)
+    return status
 
 
 def render_cellpose_page():
     """Render the Cellpose analysis page"""
     
-    st.markdown("""
-    <div class='hospital-header'>
-        <div class='hospital-title'>🔬 Advanced Cell Image Analysis</div>
-        <div style='text-align: center; margin-top: 0.5rem; font-size: 1.1rem;'>
-            Cellpose-based Cell Analysis System
-        </div>
-    </div>
-    """, unsafe_allow_html=True)
+    # Stylesheet + header + divider in one write
+    st.markdown(CARD_CSS + PAGE_HEADER_HTML, unsafe_allow_html=True)
     
-    st.markdown("---")
+    if not LEGACY_SERVER:
+        render_datacenter_in_process()
+        return
     
-    # Session state
-    if 'cellpose_port_status' not in st.session_state:
-        st.session_state.cellpose_port_status = check_port_in_use(8502)
+    # Server status (session cache, TTL 3s)
+    port_status = get_cached_port_status(8502)
     
     col1, col2 = st.columns([2, 1])
     
@@ -52,7 +156,7 @@ def render_cellpose_page():
         **Current Status:**
         """)
         
-        if st.session_state.cellpose_port_status:
+        if port_status:
             st.success("✅ Cellpose server is running on port 8502")
         else:
             st.info("ℹ️ Cellpose server is not running")
@@ -60,31 +164,20 @@ def render_cellpose_page():
     with col2:
         st.markdown("### 🎮 Server Control")
         
-        if st.session_state.cellpose_port_status:
+        if port_status:
             st.success("🟢 Active")
-            st.markdown("""
-            <a href="http://localhost:8502" target="_blank" style="
-                display: inline-block;
-                padding: 12px 24px;
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                color: white;
-                text-decoration: none;
-                border-radius: 8px;
-                font-weight: bold;
-                text-align: center;
-                width: 100%;
-            ">
-                🔗 Open Cellpose
-            </a>
-            """, unsafe_allow_html=True)
+            st.markdown(
+                '<a href="http://localhost:8502" target="_blank" class="cp-link-button">🔗 Open Cellpose</a>',
+                unsafe_allow_html=True
+            )
         else:
             st.warning("⚪ Not Running")
     
-    st.markdown("---")
-    
     # Instructions
-    if st.session_state.cellpose_port_status:
+    if port_status:
         st.markdown("""
+        ---
+        
         ### 📡 Access Information
         
         The Cellpose analysis system is running. Click the button above or visit:
@@ -114,6 +207,8 @@ def render_cellpose_page():
     
     else:
         st.markdown("""
+        ---
+        
         ### 🚀 How to Start Cellpose Server
         
         The Cellpose analysis system runs on a separate port (8502). 
@@ -132,34 +227,12 @@ def render_cellpose_page():
         """)
         
         if st.button("🔄 Refresh Status"):
-            st.session_state.cellpose_port_status = check_port_in_use(8502)
+            # Bypass both caches on manual refresh
+            check_port_in_use.clear()
+            st.session_state['_port_8502'] = (0.0, port_status)
             st.rerun()
         
-        st.markdown("---")
-        st.markdown("### 🎯 Key Features Preview")
-        
-        col1, col2, col3 = st.columns(3)
-        
-        with col1:
-            st.markdown("""
-            **🔬 Cell Segmentation**
-            - Cellpose AI model
-            - Auto cell detection
-            - Precise boundaries
-            """)
-        
-        with col2:
-            st.markdown("""
-            **📊 Feature Analysis**  
-            - Cell count & size
-            - Morphology metrics
-            - Density calculation
-            """)
-        
-        with col3:
-            st.markdown("""
-            **🧠 AI Prediction**
-            - Drug response
-            - Cell viability
-            - Apoptosis detection
-            """)
+        st.markdown(
+            "<hr><h3>🎯 Key Features Preview</h3>" + render_feature_cards(FEATURE_CARDS),
+            unsafe_allow_html=True
+        )
@@ -5,6 +5,7 @@ Safe integration script for adding Cellpose page to ADDS
 Uses minimal file modification to avoid encoding issues
 """
 
+import os
 import sys
 import io
 
@@ -12,41 +13,13 @@ print("=" * 60)
 print("ADDS + Cellpose Integration Script")
 print("=" * 60)
 
-# Step 1: Read original file with UTF-8
-print("\n[1/5] Reading AI_Anticancer_Drug_System.py...")
-with io.open('AI_Anticancer_Drug_System.py', 'r', encoding='utf-8', errors='ignore') as f:
-    content = f.read()
-
-# Step 2: Check if already integrated
-if 'from modules.cellpose_page import render_cellpose_page' in content:
-    print("   ✓ Already integrated!")
-    sys.exit(0)
+TARGET = 'AI_Anticancer_Drug_System.py'
+TMP = TARGET + '.tmp'
+MARKER = 'from modules.cellpose_page import render_cellpose_page'
 
-# Step 3: Add UTF-8 declaration if missing
-print("[2/5] Checking encoding declaration...")
-if '# -*- coding: utf-8 -*-' not in content[:200]:
-    lines = content.split('\n', 2)
-    if lines[0].startswith('"""'):
-        # After docstring
-        lines.insert(1, '# -*- coding: utf-8 -*-')
-    else:
-        lines.insert(0, '# -*- coding: utf-8 -*-')
-    content = '\n'.join(lines)
-    print("   ✓ Added UTF-8 declaration")
-
-# Step 4: Add menu item (safe string replacement)
-print("[3/5] Adding menu item...")
 old_menu = '["🏠 홈", "📊 데이터 현황", "👤 환자 정보 입력", "🔍 환자 조회", "📂 데이터 업로드", "🤖 AI 정밀 항암제 조합"]'
 new_menu = '["🏠 홈", "📊 데이터 현황", "👤 환자 정보 입력", "🔍 환자 조회", "📂 데이터 업로드", "🤖 AI 정밀 항암제 조합", "🔬 세포 이미지 분석"]'
 
-if old_menu in content:
-    content = content.replace(old_menu, new_menu)
-    print("   ✓ Menu updated")
-else:
-    print("   ⚠ Menu pattern not found, skipping")
-
-# Step 5: Add integration code at the end
-print("[4/5] Adding Cellpose page integration...")
 integration_code = """
 
 # ============ Cellpose Integration ============
@@ -61,18 +34,64 @@ except Exception as e:
         st.info("Please ensure the modules folder exists with cellpose_page.py")
 """
 
-content += integration_code
-print("   ✓ Integration code added")
+# Step 1: Scan original file line by line (UTF-8)
+print("\n[1/5] Reading AI_Anticancer_Drug_System.py...")
+with io.open(TARGET, 'r', encoding='utf-8', errors='ignore') as f:
+    head = f.read(200)
+    f.seek(0)
+    has_menu = False
+    for line in f:
+        # Step 2: Check if already integrated
+        if MARKER in line:
+            print("   ✓ Already integrated!")
+            sys.exit(0)
+        if old_menu in line:
+            has_menu = True
+
+# Step 3: Check UTF-8 declaration (head only)
+print("[2/5] Checking encoding declaration...")
+needs_header = head.find('# -*- coding: utf-8 -*-') == -1
+
+print("[3/5] Adding menu item...")
+if not has_menu:
+    print("   ⚠ Menu pattern not found, skipping")
+
+print("[4/5] Adding Cellpose page integration...")
+if not needs_header and not has_menu:
+    # Step 4: Nothing to rewrite - append only, no re-read of the original content
+    with io.open(TARGET, 'a', encoding='utf-8', newline='\n') as f:
+        f.write(integration_code)
+    print("   ✓ Integration code added")
+else:
+    # Step 4: Stream rewrite (declaration + menu) and append integration code
+    with io.open(TARGET, 'r', encoding='utf-8', errors='ignore') as fin, \
+            io.open(TMP, 'w', encoding='utf-8', newline='\n') as fout:
+        first = fin.readline()
+        if needs_header:
+            if first.startswith('"""'):
+                # After docstring
+                fout.write(first)
+                fout.write('# -*- coding: utf-8 -*-\n')
+                first = ''
+            else:
+                fout.write('# -*- coding: utf-8 -*-\n')
+            print("   ✓ Added UTF-8 declaration")
+        fout.write(first.replace(old_menu, new_menu))
+        for line in fin:
+            fout.write(line.replace(old_menu, new_menu))
+        fout.write(integration_code)
+    if has_menu:
+        print("   ✓ Menu updated")
+    print("   ✓ Integration code added")
 
-# Step 6: Write with UTF-8
-print("[5/5] Writing updated file...")
-with io.open('AI_Anticancer_Drug_System.py', 'w', encoding='utf-8', newline='\n') as f:
-    f.write(content)
+    # Step 5: Replace original with UTF-8 output
+    print("[5/5] Writing updated file...")
+    os.replace(TMP, TARGET)
 
 print("\n" + "=" * 60)
 print("✅ Integration Complete!")
 print("=" * 60)
-print("\nFile size:", len(content), "characters")
+print("\nFile size:", os.path.getsize(TARGET), "bytes")
 print("\nNext steps:")
 print("1. Stop current ADDS server (Ctrl+C)")
 print("2. Run: streamlit run AI_Anticancer_Drug_System.py")
@@ -3,15 +3,34 @@
 AI 기반 암세포 이미지 분석 및 최적 항암제 칵테일 프로그램 - 소스 모듈
 """
 
+import importlib
+
 __version__ = "1.0.0"
 __author__ = "Anticancer Cocktail Team"
 
 from .utils import Logger, ensure_dir, save_json, load_json, load_excel
-from .cellpose_analyzer import CellposeAnalyzer
-from .data_processor import DataProcessor
-from .ml_models import EfficacyPredictor, SynergyCalculator, FeatureExtractor
-from .session_manager import SessionManager
-from .file_validator import FileValidator
+
+# 무거운 의존성(torch, cellpose, sklearn 등)을 가진 클래스는 처음 접근할 때 import
+_LAZY = {
+    'CellposeAnalyzer': '.cellpose_analyzer',
+    'DataProcessor': '.data_processor',
+    'EfficacyPredictor': '.ml_models',
+    'SynergyCalculator': '.ml_models',
+    'FeatureExtractor': '.ml_models',
+    'SessionManager': '.session_manager',
+    'FileValidator': '.file_validator',
+}
+
+
+def __getattr__(name):
+    """지연 import (PEP 562)"""
+    if name in _LAZY:
+        module = importlib.import_module(_LAZY[name], __name__)
+        value = getattr(module, name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 __all__ = [
     'Logger', 'ensure_dir', 'save_json', 'load_json', 'load_excel',
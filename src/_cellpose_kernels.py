@@ -0,0 +1,126 @@
+"""
+Cellpose 마스크 후처리 커널 (Numba JIT, 없으면 scipy.ndimage)
+레이블별 면적/좌표 합을 마스크 1회 순회로 계산
+"""
+
+import numpy as np
+
+# Numba (선택적 의존성) - 없으면 scipy.ndimage 레이블 집계 사용
+try:
+    import numba as nb
+    from numba import prange
+    HAS_NUMBA = True
+except ImportError:
+    from scipy import ndimage as ndi
+    HAS_NUMBA = False
+
+# AOT 컴파일된 커널 (build_kernels.py로 생성, 없으면 JIT 커널 사용)
+try:
+    from ._cellpose_aot import label_stats_u2, label_stats_i4
+    HAS_AOT = True
+except ImportError:
+    try:
+        # 스크립트로 직접 실행하는 경우
+        from _cellpose_aot import label_stats_u2, label_stats_i4
+        HAS_AOT = True
+    except ImportError:
+        HAS_AOT = False
+
+
+def label_stats_serial(masks, nlabels):
+    """
+    label_stats의 단일 스레드 버전 (AOT export 대상)
+
+    Args:
+        masks: 레이블 마스크 (H, W), 0은 배경
+        nlabels: masks.max() + 1
+
+    Returns:
+        (area, sx, sy) 각 (nlabels,) int64
+    """
+    H, W = masks.shape
+    area = np.zeros(nlabels, np.int64)
+    sx = np.zeros(nlabels, np.int64)
+    sy = np.zeros(nlabels, np.int64)
+    for i in range(H):
+        for j in range(W):
+            l = masks[i, j]
+            if l > 0:
+                area[l] += 1
+                sx[l] += j
+                sy[l] += i
+    return area, sx, sy
+
+
+if HAS_NUMBA:
+    @nb.njit(parallel=True, cache=True, nogil=True)
+    def _label_stats_jit(masks, nlabels):
+        """label_stats 병렬 JIT 버전 (행 블록 단위 분할)"""
+        H, W = masks.shape
+        # 행 블록마다 별도 누적 배열 사용 (스레드 간 경합 방지)
+        nblocks = min(nb.get_num_threads(), H) if H > 0 else 1
+        rows_per_block = (H + nblocks - 1) // nblocks
+        area_p = np.zeros((nblocks, nlabels), np.int64)
+        sx_p = np.zeros((nblocks, nlabels), np.int64)
+        sy_p = np.zeros((nblocks, nlabels), np.int64)
+
+        for b in prange(nblocks):
+            for i in range(b * rows_per_block, min((b + 1) * rows_per_block, H)):
+                for j in range(W):
+                    l = masks[i, j]
+                    if l > 0:
+                        area_p[b, l] += 1
+                        sx_p[b, l] += j
+                        sy_p[b, l] += i
+
+        area = np.zeros(nlabels, np.int64)
+        sx = np.zeros(nlabels, np.int64)
+        sy = np.zeros(nlabels, np.int64)
+        for b in range(nblocks):
+            area += area_p[b]
+            sx += sx_p[b]
+            sy += sy_p[b]
+        return area, sx, sy
+
+
+def _label_stats_ndi(masks, nlabels):
+    """label_stats의 scipy.ndimage 버전 (Numba 미설치 환경, 컴파일된 C 루프로 집계)"""
+    area = np.zeros(nlabels, np.int64)
+    sx = np.zeros(nlabels, np.int64)
+    sy = np.zeros(nlabels, np.int64)
+    labels = np.arange(1, nlabels)
+    if labels.size == 0:
+        return area, sx, sy
+
+    ones = np.ones(masks.shape, np.int32)
+    area[1:] = ndi.sum_labels(ones, masks, labels)
+    # 빈 레이블의 무게중심은 NaN (0/0) -> 0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        com = np.nan_to_num(np.asarray(ndi.center_of_mass(ones, masks, labels), dtype=np.float64))
+    sy[1:] = np.rint(com[:, 0] * area[1:])
+    sx[1:] = np.rint(com[:, 1] * area[1:])
+    return area, sx, sy
+
+
+def label_stats(masks, nlabels):
+    """
+    레이블별 면적, x 좌표 합, y 좌표 합
+
+    AOT 모듈이 있고 마스크가 uint16/int32 C-order면 AOT 커널(JIT 컴파일 없음),
+    그 외에는 병렬 JIT 커널, Numba가 없으면 scipy.ndimage 사용
+
+    Args:
+        masks: 레이블 마스크 (H, W), 0은 배경
+        nlabels: masks.max() + 1
+
+    Returns:
+        (area, sx, sy) 각 (nlabels,) int64
+    """
+    if HAS_AOT and masks.flags.c_contiguous:
+        if masks.dtype == np.uint16:
+            return label_stats_u2(masks, nlabels)
+        if masks.dtype == np.int32:
+            return label_stats_i4(masks, nlabels)
+    if HAS_NUMBA:
+        return _label_stats_jit(masks, nlabels)
+    return _label_stats_ndi(masks, nlabels)
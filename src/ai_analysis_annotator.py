@@ -5,15 +5,37 @@ Cellpose 결과를 분석하여 의미 있는 주석 생성
 
 from typing import Dict, List
 from datetime import datetime
+from functools import lru_cache
 import json
 
 
 class AIAnalysisAnnotator:
     """AI 분석 주석 생성 클래스"""
     
+    # Markdown 주석 보고서 템플릿 (generate_annotation_report에서 한 번에 format)
+    _REPORT_TEMPLATE = (
+        "# AI 세포 이미지 분석 주석\n\n"
+        "**생성 시각**: {timestamp}\n\n"
+        "---\n\n"
+        "## 전체 평가\n\n"
+        "{overall_assessment}\n\n"
+        "## 세포 특성 분석\n\n"
+        "- **세포 크기**: {cell_size}\n"
+        "- **크기 변이**: {size_variation}\n"
+        "{morphology_md}"
+        "## 임상적 통찰\n\n"
+        "{insights_md}\n"
+        "## 이미지 품질\n\n"
+        "{image_quality}\n\n"
+        "## 권장사항\n\n"
+        "{recommendations_md}\n"
+        "## 분석 신뢰도: {confidence_score:.2f}\n"
+    )
+    
     def __init__(self):
         """초기화"""
-        pass
+        # 같은 통계/환자 정보에 대한 통계 기반 분석 재사용 (Streamlit 리런, 보고서+JSON 중복 생성)
+        self._cached_stats_analysis = lru_cache(maxsize=64)(self._stats_analysis)
     
     def generate_cellpose_analysis(
         self,
@@ -32,22 +54,54 @@ class AIAnalysisAnnotator:
         Returns:
             AI 분석 주석
         """
+        patient_key = (patient_info.get('cancer_type', ''), patient_info.get('cancer_stage', ''))
+        try:
+            cached = self._cached_stats_analysis(tuple(sorted(cellpose_stats.items())), *patient_key)
+        except TypeError:
+            # 해시 불가능한 값이 포함된 통계는 캐시 없이 계산
+            cached = self._stats_analysis(tuple(cellpose_stats.items()), *patient_key)
+        
         analysis = {
             "timestamp": datetime.now().isoformat(),
-            "overall_assessment": self._assess_overall_quality(cellpose_stats),
-            "cell_characteristics": self._analyze_cell_characteristics(cellpose_stats),
-            "clinical_insights": self._generate_clinical_insights(cellpose_stats, patient_info),
+            "overall_assessment": cached["overall_assessment"],
+            "cell_characteristics": dict(cached["cell_characteristics"]),
+            "clinical_insights": list(cached["clinical_insights"]),
             "image_quality": self._assess_image_quality(cellpose_results),
-            "recommendations": self._generate_recommendations(cellpose_stats),
-            "confidence_score": self._calculate_confidence(cellpose_stats)
+            "recommendations": list(cached["recommendations"]),
+            "confidence_score": cached["confidence_score"]
         }
         
         return analysis
     
-    def _assess_overall_quality(self, stats: Dict) -> str:
+    def _stats_analysis(self, stats_items: tuple, cancer_type: str, cancer_stage: str) -> Dict:
+        """통계/환자 정보에만 의존하는 분석 항목 계산 (캐시 대상, 반환값은 수정하지 않음)"""
+        stats = dict(stats_items)
+        derived = self._derive(stats)
+        patient_info = {'cancer_type': cancer_type, 'cancer_stage': cancer_stage}
+        return {
+            "overall_assessment": self._assess_overall_quality(derived),
+            "cell_characteristics": self._analyze_cell_characteristics(stats, derived),
+            "clinical_insights": self._generate_clinical_insights(derived, patient_info),
+            "recommendations": self._generate_recommendations(derived),
+            "confidence_score": self._calculate_confidence(derived)
+        }
+    
+    def _derive(self, stats: Dict) -> Dict:
+        """헬퍼 공통 통계값 (변동계수 포함) 1회 계산"""
+        avg_area = stats.get('avg_cell_area', 0) or 0
+        std_area = stats.get('std_cell_area', 0) or 0
+        return {
+            'total': stats.get('total_cells', 0) or 0,
+            'avg_cells': stats.get('avg_cells_per_image', 0) or 0,
+            'avg_area': avg_area,
+            'std_area': std_area,
+            'cv': (std_area / avg_area) * 100 if avg_area > 0 else 0.0  # 변동계수
+        }
+    
+    def _assess_overall_quality(self, derived: Dict) -> str:
         """전체 품질 평가"""
-        total_cells = stats.get('total_cells', 0)
-        avg_cells = stats.get('avg_cells_per_image', 0)
+        total_cells = derived['total']
+        avg_cells = derived['avg_cells']
         
         if total_cells == 0:
             return "세포가 검출되지 않았습니다. 이미지 품질이나 염색 상태를 확인하세요."
@@ -64,11 +118,9 @@ class AIAnalysisAnnotator:
         
         return f"분석 품질: {quality}. {comment}"
     
-    def _analyze_cell_characteristics(self, stats: Dict) -> Dict:
+    def _analyze_cell_characteristics(self, stats: Dict, derived: Dict) -> Dict:
         """세포 특성 분석"""
-        avg_area = stats.get('avg_cell_area', 0)
-        std_area = stats.get('std_cell_area', 0)
-        min_area = stats.get('min_cell_area', 0)
+        avg_area = derived['avg_area']
         max_area = stats.get('max_cell_area', 0)
         
         characteristics = {
@@ -86,13 +138,12 @@ class AIAnalysisAnnotator:
             characteristics["morphology_note"] = "세포가 평균보다 큽니다. 암세포의 특징일 수 있습니다."
         
         # 크기 변이 평가
-        if std_area > 0:
-            cv = (std_area / avg_area) * 100  # 변동계수
-            if cv > 50:
-                characteristics["size_variation"] = "불균일"
-                characteristics["morphology_note"] += " 세포 크기가 매우 불균일합니다. 이종성(heterogeneity)이 높은 종양일 수 있습니다."
-            elif cv > 30:
-                characteristics["size_variation"] = "중간"
+        cv = derived['cv']
+        if cv > 50:
+            characteristics["size_variation"] = "불균일"
+            characteristics["morphology_note"] += " 세포 크기가 매우 불균일합니다. 이종성(heterogeneity)이 높은 종양일 수 있습니다."
+        elif cv > 30:
+            characteristics["size_variation"] = "중간"
         
         # 극단값 분석
         if max_area > avg_area * 3:
@@ -100,12 +151,12 @@ class AIAnalysisAnnotator:
         
         return characteristics
     
-    def _generate_clinical_insights(self, stats: Dict, patient_info: Dict) -> List[str]:
+    def _generate_clinical_insights(self, derived: Dict, patient_info: Dict) -> List[str]:
         """임상적 통찰 생성"""
         insights = []
         
-        total_cells = stats.get('total_cells', 0)
-        avg_area = stats.get('avg_cell_area', 0)
+        total_cells = derived['total']
+        avg_area = derived['avg_area']
         cancer_type = patient_info.get('cancer_type', '')
         cancer_stage = patient_info.get('cancer_stage', '')
         
@@ -130,11 +181,8 @@ class AIAnalysisAnnotator:
                 insights.append(f"병기 {cancer_stage} 환자로, 진행된 암의 세포 특성을 보일 수 있습니다.")
         
         # 치료 반응 예측
-        std_area = stats.get('std_cell_area', 0)
-        if std_area > 0:
-            cv = (std_area / avg_area) * 100
-            if cv > 50:
-                insights.append("높은 세포 이질성은 치료 저항성과 관련될 수 있습니다. 다제병용요법을 고려할 필요가 있습니다.")
+        if derived['cv'] > 50:
+            insights.append("높은 세포 이질성은 치료 저항성과 관련될 수 있습니다. 다제병용요법을 고려할 필요가 있습니다.")
         
         return insights
     
@@ -158,14 +206,12 @@ class AIAnalysisAnnotator:
         else:
             return f"{total_images}개 이미지 중 {images_with_cells}개에서만 세포가 검출되었습니다 ({success_rate:.1f}%). 이미지 품질 개선이 필요합니다."
     
-    def _generate_recommendations(self, stats: Dict) -> List[str]:
+    def _generate_recommendations(self, derived: Dict) -> List[str]:
         """권장사항 생성"""
         recommendations = []
         
-        total_cells = stats.get('total_cells', 0)
-        avg_cells = stats.get('avg_cells_per_image', 0)
-        avg_area = stats.get('avg_cell_area', 0)
-        std_area = stats.get('std_cell_area', 0)
+        total_cells = derived['total']
+        avg_cells = derived['avg_cells']
         
         # 샘플 크기 권장사항
         if total_cells < 500:
@@ -176,10 +222,8 @@ class AIAnalysisAnnotator:
             recommendations.append("세포 밀도가 낮습니다. 샘플 농축 또는 더 많은 시야 촬영을 고려하세요.")
         
         # 분석 파라미터 권장사항
-        if std_area > 0:
-            cv = (std_area / avg_area) * 100
-            if cv > 50:
-                recommendations.append("세포 크기 변이가 큽니다. 수동 검증을 통해 Cellpose 검출의 정확도를 확인하세요.")
+        if derived['cv'] > 50:
+            recommendations.append("세포 크기 변이가 큽니다. 수동 검증을 통해 Cellpose 검출의 정확도를 확인하세요.")
         
         # 추가 분석 권장사항
         recommendations.append("세포 형태학적 특징을 바탕으로 AI 약물 추천 정확도가 향상될 수 있습니다.")
@@ -187,10 +231,10 @@ class AIAnalysisAnnotator:
         
         return recommendations
     
-    def _calculate_confidence(self, stats: Dict) -> float:
+    def _calculate_confidence(self, derived: Dict) -> float:
         """분석 신뢰도 계산"""
-        total_cells = stats.get('total_cells', 0)
-        avg_cells = stats.get('avg_cells_per_image', 0)
+        total_cells = derived['total']
+        avg_cells = derived['avg_cells']
         
         # 기본 점수
         confidence = 0.5
@@ -225,37 +269,22 @@ class AIAnalysisAnnotator:
         """
         analysis = self.generate_cellpose_analysis(cellpose_results, cellpose_stats, patient_info)
         
-        report = []
-        report.append("# AI 세포 이미지 분석 주석\n")
-        report.append(f"**생성 시각**: {analysis['timestamp']}\n")
-        report.append("---\n")
-        
-        report.append("## 전체 평가\n")
-        report.append(f"{analysis['overall_assessment']}\n")
-        
-        report.append("## 세포 특성 분석\n")
         char = analysis['cell_characteristics']
-        report.append(f"- **세포 크기**: {char['cell_size']}")
-        report.append(f"- **크기 변이**: {char['size_variation']}")
-        if char['morphology_note']:
-            report.append(f"- **형태학적 소견**: {char['morphology_note']}\n")
-        
-        report.append("## 임상적 통찰\n")
-        for insight in analysis['clinical_insights']:
-            report.append(f"- {insight}")
-        report.append("")
-        
-        report.append("## 이미지 품질\n")
-        report.append(f"{analysis['image_quality']}\n")
-        
-        report.append("## 권장사항\n")
-        for rec in analysis['recommendations']:
-            report.append(f"- {rec}")
-        report.append("")
-        
-        report.append(f"## 분석 신뢰도: {analysis['confidence_score']:.2f}\n")
-        
-        return "\n".join(report)
+        morphology_md = (
+            f"- **형태학적 소견**: {char['morphology_note']}\n\n" if char['morphology_note'] else ""
+        )
+        
+        return self._REPORT_TEMPLATE.format(
+            timestamp=analysis['timestamp'],
+            overall_assessment=analysis['overall_assessment'],
+            cell_size=char['cell_size'],
+            size_variation=char['size_variation'],
+            morphology_md=morphology_md,
+            insights_md="".join(f"- {x}\n" for x in analysis['clinical_insights']),
+            image_quality=analysis['image_quality'],
+            recommendations_md="".join(f"- {x}\n" for x in analysis['recommendations']),
+            confidence_score=analysis['confidence_score']
+        )
 
 
 # 사용 예제
@@ -0,0 +1,26 @@
+"""
+Cellpose 마스크 후처리 커널 AOT 빌드 스크립트
+numba.pycc로 label_stats를 미리 컴파일해 src/_cellpose_aot 확장 모듈 생성
+(Streamlit 재실행/모듈 리로드 시 JIT 컴파일 지연 제거)
+
+사용법:
+    python src/build_kernels.py
+"""
+
+from pathlib import Path
+
+from numba.pycc import CC
+
+from _cellpose_kernels import label_stats_serial
+
+cc = CC('_cellpose_aot')
+cc.output_dir = str(Path(__file__).parent)
+
+# AOT는 시그니처별로 export 이름이 필요 (uint16: 기본 마스크, int32: Cellpose 원본 dtype)
+cc.export('label_stats_u2', 'UniTuple(i8[:], 3)(u2[:, ::1], i8)')(label_stats_serial)
+cc.export('label_stats_i4', 'UniTuple(i8[:], 3)(i4[:, ::1], i8)')(label_stats_serial)
+
+
+if __name__ == "__main__":
+    cc.compile()
+    print(f"AOT 커널 빌드 완료: {cc.output_dir}")
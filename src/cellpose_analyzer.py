@@ -4,7 +4,12 @@ RTX 4060 GPU 가속 지원
 """
 
 import os
+import re
 import sys
+import threading
+from importlib.metadata import PackageNotFoundError, version as _package_version
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 import cv2
 from pathlib import Path
@@ -21,19 +26,101 @@ if sys.platform == 'win32':
         pass
 
 # Cellpose imports
-from cellpose import models, core
+from cellpose import models, core, dynamics
+from cellpose import utils as cellpose_utils
 from cellpose.io import imread
 
+try:
+    from .flow_ops import follow_flows, warmup as _warmup_flow_ops, HAS_NUMBA
+    from ._cellpose_kernels import label_stats
+except ImportError:
+    # 스크립트로 직접 실행하는 경우
+    from flow_ops import follow_flows, warmup as _warmup_flow_ops, HAS_NUMBA
+    from _cellpose_kernels import label_stats
+
+# TensorRT (선택적 의존성)
+try:
+    import tensorrt as trt
+    HAS_TENSORRT = True
+except ImportError:
+    HAS_TENSORRT = False
+
+# CuPy (선택적 의존성) - 대형 이미지 mask 재구성 GPU 처리
+try:
+    import cupy as cp
+    from cupyx.scipy import ndimage as cp_ndimage
+    HAS_CUPY = True
+except ImportError:
+    HAS_CUPY = False
+
+# GPU mask 재구성을 사용할 최소 이미지 크기 (픽셀 수)
+GPU_MASK_MIN_PIXELS = 1024 ** 2
+
+if HAS_CUPY:
+    # 픽셀별 flow Euler 적분 (bilinear 보간)
+    _advect_kernel = cp.ElementwiseKernel(
+        'float32 y0, float32 x0, raw float32 dP, int32 Ly, int32 Lx, int32 niter',
+        'float32 y, float32 x',
+        """
+        const int plane = Ly * Lx;
+        float yy = y0, xx = x0;
+        for (int t = 0; t < niter; t++) {
+            int iy = (int)yy, ix = (int)xx;
+            int iy1 = min(iy + 1, Ly - 1), ix1 = min(ix + 1, Lx - 1);
+            float wy = yy - iy, wx = xx - ix;
+            float w00 = (1.f - wy) * (1.f - wx), w01 = (1.f - wy) * wx;
+            float w10 = wy * (1.f - wx), w11 = wy * wx;
+            float dy = w00 * dP[iy * Lx + ix] + w01 * dP[iy * Lx + ix1]
+                     + w10 * dP[iy1 * Lx + ix] + w11 * dP[iy1 * Lx + ix1];
+            float dx = w00 * dP[plane + iy * Lx + ix] + w01 * dP[plane + iy * Lx + ix1]
+                     + w10 * dP[plane + iy1 * Lx + ix] + w11 * dP[plane + iy1 * Lx + ix1];
+            yy = fminf(fmaxf(yy + dy, 0.f), Ly - 1.f);
+            xx = fminf(fmaxf(xx + dx, 0.f), Lx - 1.f);
+        }
+        y = yy;
+        x = xx;
+        """,
+        'cellpose_advect'
+    )
+
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+def _cellpose_version() -> Tuple[int, int]:
+    """설치된 cellpose의 (major, minor) 버전"""
+    try:
+        parts = re.findall(r'\d+', _package_version('cellpose'))[:2]
+    except PackageNotFoundError:
+        return (0, 0)
+    return tuple(int(x) for x in parts) if len(parts) == 2 else (0, 0)
+
+
+# cellpose 3.0.x의 compute_masks만 p=에 (2, Ly, Lx) 최종 좌표 배열을 받음
+# (3.1 이상은 cp_mask 픽셀별 좌표 형식이므로 Numba flow 적분 결과를 넘길 수 없음)
+CELLPOSE_DENSE_P = (3, 0) <= _cellpose_version() < (3, 1)
+
+
+def _compute_masks(dP: np.ndarray, cellprob: np.ndarray, **kwargs) -> np.ndarray:
+    """dynamics.compute_masks 래퍼 (버전에 따라 (masks, p) 튜플 반환)"""
+    out = dynamics.compute_masks(dP, cellprob, **kwargs)
+    return out[0] if isinstance(out, tuple) else out
+
+
+def cell_records(cell_properties: Dict[str, np.ndarray]) -> List[Dict]:
+    """속성별 배열 형식의 cell_properties를 세포별 dict 목록으로 변환"""
+    keys = list(cell_properties)
+    columns = [cell_properties[k].tolist() for k in keys]
+    return [dict(zip(keys, values)) for values in zip(*columns)]
+
+
 class CellposeAnalyzer:
     """Cellpose를 사용한 세포 이미지 분석 클래스"""
     
-    def __init__(self, model_type='cyto3', use_gpu=True, diameter=None):
+    def __init__(self, model_type='cyto3', use_gpu=True, diameter=None, use_cuda_graph=False, use_amp=True,
+                 gpu_mask_reconstruction=False):
         """
         초기화
         
@@ -41,10 +128,16 @@ class CellposeAnalyzer:
             model_type (str): 모델 타입 ('cyto', 'cyto2', 'cyto3', 'nuclei')
             use_gpu (bool): GPU 사용 여부
             diameter (float/None): 세포 직경 (None이면 자동 추정)
+            use_cuda_graph (bool): 네트워크 forward를 CUDA graph로 캡처해 재사용
+            use_amp (bool): GPU에서 mixed precision (bf16/fp16) 추론
+            gpu_mask_reconstruction (bool): 대형 이미지 mask 재구성을 CuPy로 처리
+                (cellpose get_masks의 근사 구현이므로 결과가 약간 다를 수 있음)
         """
         self.model_type = model_type
         self.use_gpu = use_gpu and torch.cuda.is_available()
         self.diameter = diameter
+        self.gpu_mask_reconstruction = gpu_mask_reconstruction
+        self._clahe = None  # CLAHE 객체 (첫 사용 시 생성 후 재사용)
         
         logger.info(f"Initializing Cellpose Analyzer...")
         logger.info(f"  Model type: {model_type}")
@@ -57,15 +150,53 @@ class CellposeAnalyzer:
         # 모델 로드
         self.model = models.CellposeModel(gpu=self.use_gpu, model_type=model_type)
         logger.info("  Model loaded successfully")
+        
+        # 원본 네트워크 (TensorRT export 등 래퍼 없이 필요한 경우)
+        self.base_net = self.model.net
+        
+        # 분석기는 Streamlit 세션 간에 공유되므로 model.eval(래핑된 net의 graph/버퍼 포함)은 한 번에 하나만 실행
+        self._eval_lock = threading.Lock()
+        
+        # Mixed precision: bf16 지원 시 bf16, 아니면 fp16
+        if use_amp and self.use_gpu:
+            amp_dtype = torch.bfloat16 if torch.cuda.is_bf16_supported() else torch.float16
+            self.model.net = _AutocastNet(self.model.net, amp_dtype)
+            logger.info(f"  Mixed precision enabled: {amp_dtype}")
+        
+        # CUDA graph: 타일 형태별로 한 번 캡처 후 replay
+        if use_cuda_graph and self.use_gpu:
+            self.model.net = _CUDAGraphNet(self.model.net)
+            logger.info("  CUDA graph capture enabled")
+        
+        if not self.use_gpu and CELLPOSE_DENSE_P:
+            # Numba JIT 캐시 준비 (첫 분석기 생성 시 1회, 첫 분석 시 컴파일 지연 방지)
+            _warmup_flow_ops()
+        
+        if self.use_gpu:
+            # 고정 타일 형태에 맞춘 cuDNN 알고리즘 선택 + TF32 허용
+            torch.backends.cudnn.benchmark = True
+            torch.set_float32_matmul_precision('high')
+            self._warmup()
+    
+    def _warmup(self, batch_size: int = 16, tile_size: int = 224, iters: int = 3):
+        """추론 시와 동일한 (B, C, tile, tile) 형태로 forward 실행 (cuDNN autotune)"""
+        nchan = getattr(self.model, 'nchan', 2)
+        x = torch.zeros((batch_size, nchan, tile_size, tile_size), device=self.model.device)
+        with torch.no_grad():
+            for _ in range(iters):
+                self.model.net(x)
+        torch.cuda.synchronize()
     
     def analyze_image(
         self,
         image_path: str,
         diameter: Optional[float] = None,
-        flow_threshold: float = 0.4,
+        flow_threshold: float = 0.0,
         cellprob_threshold: float = 0.0,
         upscale_factor: float = 1.0,
-        enhance_contrast: bool = False
+        enhance_contrast: bool = False,
+        batch_size: int = 16,
+        return_flows: bool = False
     ) -> Dict:
         """
         단일 이미지 분석
@@ -73,31 +204,50 @@ class CellposeAnalyzer:
         Args:
             image_path: 이미지 파일 경로
             diameter: 세포 직경 (None이면 클래스 기본값 사용)
-            flow_threshold: Flow threshold
+            flow_threshold: Flow threshold (0이면 flow 오류 QC 단계 생략, 기본값)
             cellprob_threshold: Cell probability threshold
+            batch_size: 한 번의 forward에 묶어 처리할 타일 수 (VRAM에 맞게 조정)
+            return_flows: 결과에 flows/styles 포함 여부 (기본 제외, 메모리 절약)
             
         Returns:
             분석 결과 딕셔너리
         """
         logger.info(f"Analyzing image: {image_path}")
         
+        img, original_shape = self._load_and_preprocess(image_path, enhance_contrast, upscale_factor)
+        return self._segment(
+            img, original_shape, image_path,
+            diameter=diameter,
+            flow_threshold=flow_threshold,
+            cellprob_threshold=cellprob_threshold,
+            upscale_factor=upscale_factor,
+            batch_size=batch_size,
+            return_flows=return_flows
+        )
+    
+    def _load_and_preprocess(
+        self,
+        image_path: str,
+        enhance_contrast: bool = False,
+        upscale_factor: float = 1.0
+    ) -> Tuple[np.ndarray, Tuple[int, int]]:
+        """이미지 로드 + CLAHE/확대 전처리 (전처리된 이미지, 원본 크기) 반환"""
         # 이미지 로드
         img = imread(image_path)
         
         # Preprocessing: CLAHE (Contrast Limited Adaptive Histogram Equalization)
         if enhance_contrast:
             logger.info("  Applying CLAHE preprocessing...")
+            if self._clahe is None:
+                self._clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
             if img.ndim == 2: # Grayscale
-                clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
-                img = clahe.apply(img)
+                img = self._clahe.apply(img)
             elif img.ndim == 3: # RGB
-                # Convert to LAB, apply to L channel
-                lab = cv2.cvtColor(img, cv2.COLOR_RGB2LAB)
-                l, a, b = cv2.split(lab)
-                clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
-                cl = clahe.apply(l)
-                limg = cv2.merge((cl,a,b))
-                img = cv2.cvtColor(limg, cv2.COLOR_LAB2RGB)
+                # Convert to YCrCb, apply to Y channel (LAB보다 변환 비용이 낮음)
+                ycc = cv2.cvtColor(img, cv2.COLOR_RGB2YCrCb)
+                y, cr, cb = cv2.split(ycc)
+                cy = self._clahe.apply(y)
+                img = cv2.cvtColor(cv2.merge((cy, cr, cb)), cv2.COLOR_YCrCb2RGB)
 
         # Upscaling
         original_shape = img.shape[:2]
@@ -106,69 +256,254 @@ class CellposeAnalyzer:
             new_width = int(img.shape[1] * upscale_factor)
             new_height = int(img.shape[0] * upscale_factor)
             img = cv2.resize(img, (new_width, new_height), interpolation=cv2.INTER_CUBIC)
-
         
+        return img, original_shape
+    
+    def _segment(
+        self,
+        img: np.ndarray,
+        original_shape: Tuple[int, int],
+        image_path: str,
+        diameter: Optional[float] = None,
+        flow_threshold: float = 0.0,
+        cellprob_threshold: float = 0.0,
+        upscale_factor: float = 1.0,
+        batch_size: int = 16,
+        return_flows: bool = False
+    ) -> Dict:
+        """전처리된 이미지 분할 및 세포 속성 계산"""
         # 직경 설정
         diam = diameter if diameter is not None else self.diameter
         
-        # 세포 분할 실행
-        # 세포 분할 실행
-        masks, flows, styles = self.model.eval(
-            img,
-            diameter=diam,
-            flow_threshold=flow_threshold,
-            cellprob_threshold=cellprob_threshold
+        masks, flows, styles = self._eval_masks(
+            [img], diam, flow_threshold, cellprob_threshold, batch_size
+        )[0]
+        return self._build_result(
+            image_path, img, original_shape, masks, flows, styles, diam, upscale_factor,
+            return_flows=return_flows
         )
+    
+    def _flow_niter(self, diam: Optional[float]) -> int:
+        """cellpose eval과 동일한 flow 적분 스텝 수 (200 × 직경 / 모델 기준 직경)"""
+        diam_mean = float(getattr(self.model, 'diam_mean', 30.0))
+        if not diam:
+            diam = float(getattr(self.model, 'diam_labels', diam_mean))
+        return max(1, int(200 * diam / diam_mean))
+    
+    def _eval_masks(
+        self,
+        imgs: List[np.ndarray],
+        diam: Optional[float],
+        flow_threshold: float,
+        cellprob_threshold: float,
+        batch_size: int
+    ) -> List[Tuple[np.ndarray, list, np.ndarray]]:
+        """
+        이미지 리스트를 한 번의 model.eval로 분할
+        (타일을 batch_size개씩 묶어 추론, 이미지별 (masks, flows, styles) 반환)
+        """
+        use_gpu_masks = [
+            self.use_gpu and self.gpu_mask_reconstruction and HAS_CUPY and im.shape[0] * im.shape[1] > GPU_MASK_MIN_PIXELS
+            for im in imgs
+        ]
+        with self._eval_lock:
+            if self.use_gpu and not any(use_gpu_masks):
+                masks_list, flows_list, styles_list = self.model.eval(
+                    imgs,
+                    batch_size=batch_size,
+                    diameter=diam,
+                    flow_threshold=flow_threshold,
+                    cellprob_threshold=cellprob_threshold
+                )
+                return list(zip(masks_list, flows_list, styles_list))
+            
+            # 네트워크 출력만 받고 mask 재구성은 이미지별로 처리
+            _, flows_list, styles_list = self.model.eval(
+                imgs,
+                batch_size=batch_size,
+                diameter=diam,
+                compute_masks=False
+            )
+        
+        niter = self._flow_niter(diam)
+        outputs = []
+        for flows, styles, gpu_masks in zip(flows_list, styles_list, use_gpu_masks):
+            dP, cellprob = flows[1], flows[2]
+            if gpu_masks:
+                # 대형 이미지: CuPy로 재구성
+                masks = self.mask_reconstruction_gpu(
+                    dP, cellprob,
+                    niter=niter,
+                    flow_threshold=flow_threshold,
+                    cellprob_threshold=cellprob_threshold
+                )
+            elif self.use_gpu or not (HAS_NUMBA and CELLPOSE_DENSE_P):
+                # (Numba 미설치 또는 cellpose 3.1 이상 CPU 환경은 cellpose 내장 flow 적분 사용)
+                masks = _compute_masks(
+                    dP, cellprob,
+                    niter=niter,
+                    flow_threshold=flow_threshold,
+                    cellprob_threshold=cellprob_threshold,
+                    device=self.model.device
+                )
+            else:
+                # CPU (cellpose 3.0.x): flow 적분은 Numba 커널로 처리
+                p = follow_flows(dP, cellprob > cellprob_threshold, niter=niter)
+                masks = _compute_masks(
+                    dP, cellprob,
+                    p=p,
+                    niter=niter,
+                    flow_threshold=flow_threshold,
+                    cellprob_threshold=cellprob_threshold
+                )
+            outputs.append((masks, flows, styles))
+        return outputs
+    
+    def _build_result(
+        self,
+        image_path: str,
+        img: np.ndarray,
+        original_shape: Tuple[int, int],
+        masks: np.ndarray,
+        flows: list,
+        styles: np.ndarray,
+        diam: Optional[float],
+        upscale_factor: float = 1.0,
+        return_flows: bool = False
+    ) -> Dict:
+        """마스크로부터 세포 속성/결과 딕셔너리 생성"""
+        # 레이블 수가 uint16 범위면 uint16 C-order로 변환 (이후 축소/집계/저장 대역폭 절반)
+        max_label = int(masks.max()) if masks.size else 0
+        if max_label < 65535:
+            masks = np.ascontiguousarray(masks, dtype=np.uint16)
         
         # Downscale masks if upscaled
         if upscale_factor > 1.0:
             logger.info("  Downscaling masks to original size...")
-            masks = cv2.resize(masks, (original_shape[1], original_shape[0]), interpolation=cv2.INTER_NEAREST)
+            k = int(upscale_factor)
+            if k == upscale_factor and masks.shape[:2] == (original_shape[0] * k, original_shape[1] * k):
+                # 정수 배율: 레이블 이미지이므로 k 간격 샘플링 = nearest 축소
+                masks = np.ascontiguousarray(masks[::k, ::k])
+            else:
+                masks = cv2.resize(masks, (original_shape[1], original_shape[0]), interpolation=cv2.INTER_NEAREST)
             # Resize flows and styles if needed (omitted for now as they are complex structures)
         
-        # 결과 분석
-        cell_ids = np.unique(masks)[1:]  # 0은 배경
-        num_cells = len(cell_ids)
+        # 결과 분석: 레이블별 면적/좌표 합을 마스크 1회 순회로 계산 (0은 배경)
+        # (축소는 레이블을 없앨 수만 있으므로 원래 최대값 기준 크기로 충분)
+        nlabels = max_label + 1
+        area, sx, sy = label_stats(masks, nlabels)
         
-        # 각 세포의 속성 계산
-        cell_properties = []
-        for cell_id in cell_ids:
-            cell_mask = masks == cell_id
-            area = np.sum(cell_mask)
-            
-            # 세포 위치 (중심)
-            coords = np.where(cell_mask)
-            center_y = int(np.mean(coords[0]))
-            center_x = int(np.mean(coords[1]))
-            
-            cell_properties.append({
-                'cell_id': int(cell_id),
-                'area': int(area),
-                'center_x': center_x,
-                'center_y': center_y
-            })
+        # 레이블이 1..K로 연속이므로 면적이 0이 아닌 레이블만 세포로 집계
+        cell_ids = np.flatnonzero(area[1:]) + 1
+        num_cells = int(cell_ids.size)
+        
+        # 각 세포의 속성 (세포별 dict 대신 속성별 배열, dict 목록은 cell_records로 변환)
+        cell_areas = area[cell_ids]
+        cell_properties = {
+            'cell_id': cell_ids.astype(np.int32),
+            'area': cell_areas,
+            'center_x': sx[cell_ids] // cell_areas,
+            'center_y': sy[cell_ids] // cell_areas
+        }
         
         result = {
             'image_path': image_path,
             'image_shape': img.shape,
             'num_cells': num_cells,
             'masks': masks,
-            'flows': flows,
-            'styles': styles,
             'cell_properties': cell_properties,
             'diameter_used': diam
         }
+        # flows (dP/cellprob, 이미지당 수십 MB)는 요청 시에만 보관
+        if return_flows:
+            result['flows'] = flows
+            result['styles'] = styles
         
         logger.info(f"  Detected {num_cells} cells")
         
         return result
     
+    def mask_reconstruction_gpu(
+        self,
+        dP: np.ndarray,
+        cellprob: np.ndarray,
+        flow_threshold: float = 0.0,
+        cellprob_threshold: float = 0.0,
+        niter: int = 200,
+        min_size: int = 15,
+        max_size_fraction: float = 0.4
+    ) -> np.ndarray:
+        """
+        flow → mask 재구성 (CuPy GPU)
+        
+        Args:
+            dP: flow 필드 (2, Ly, Lx)
+            cellprob: 세포 확률 (Ly, Lx)
+            flow_threshold: Flow threshold (0이면 flow 오류 필터 생략)
+            cellprob_threshold: Cell probability threshold
+            niter: Euler 적분 스텝 수 (cellpose와 같이 직경에 비례하도록 전달)
+            min_size: 최소 세포 크기 (픽셀)
+            max_size_fraction: 이미지 대비 이 비율보다 큰 마스크는 제거
+            
+        Returns:
+            레이블 마스크 (Ly, Lx)
+        """
+        Ly, Lx = cellprob.shape
+        cp_mask = cp.asarray(cellprob) > cellprob_threshold
+        if not bool(cp_mask.any()):
+            return np.zeros((Ly, Lx), dtype=np.int32)
+        
+        # 1. Euler 적분 (cellpose와 동일한 dP * mask / 5 스케일링)
+        dP_gpu = cp.ascontiguousarray(cp.asarray(dP, dtype=cp.float32) * cp_mask / 5.)
+        inds_y, inds_x = cp.nonzero(cp_mask)
+        y, x = _advect_kernel(
+            inds_y.astype(cp.float32), inds_x.astype(cp.float32),
+            dP_gpu, np.int32(Ly), np.int32(Lx), np.int32(niter)
+        )
+        
+        # 2. 수렴점 히스토그램의 국소 최대값을 seed로 레이블링 (cellpose get_masks와 동일 기준)
+        end = cp.rint(y).astype(cp.int64) * Lx + cp.rint(x).astype(cp.int64)
+        hist = cp.bincount(end, minlength=Ly * Lx).reshape(Ly, Lx)
+        peaks = (hist > 10) & (hist == cp_ndimage.maximum_filter(hist, size=5))
+        labels, _ = cp_ndimage.label(peaks, structure=cp.ones((3, 3), dtype=bool))
+        
+        # seed를 수렴점 밀도가 있는 영역(hist > 2)으로 5회 확장
+        grow_mask = hist > 2
+        for _ in range(5):
+            grown = cp_ndimage.grey_dilation(labels, size=(3, 3))
+            labels = cp.where((labels == 0) & grow_mask, grown, labels)
+        
+        # 3. 각 픽셀에 수렴점의 레이블 할당
+        masks = cp.zeros((Ly, Lx), dtype=cp.int32)
+        masks[inds_y, inds_x] = labels.ravel()[end]
+        masks = masks.get()
+        
+        # 4. 비정상적으로 큰 마스크 제거
+        counts = np.bincount(masks.ravel())
+        big = np.flatnonzero(counts > max_size_fraction * Ly * Lx)
+        big = big[big > 0]
+        if big.size:
+            masks[np.isin(masks, big)] = 0
+        
+        # 5. flow 오류 필터, 구멍 채우기 및 작은 마스크 제거
+        if masks.max() > 0 and flow_threshold is not None and flow_threshold > 0:
+            masks = dynamics.remove_bad_flow_masks(masks, dP, threshold=flow_threshold)
+        masks = cellpose_utils.fill_holes_and_remove_small_masks(masks, min_size=min_size)
+        
+        return masks
+    
     def analyze_batch(
         self,
         image_paths: List[str],
         diameter: Optional[float] = None,
-        flow_threshold: float = 0.4,
-        cellprob_threshold: float = 0.0
+        flow_threshold: float = 0.0,
+        cellprob_threshold: float = 0.0,
+        batch_size: int = 16,
+        upscale_factor: float = 1.0,
+        enhance_contrast: bool = False,
+        prefetch: int = 2,
+        eval_group: int = 8,
+        return_flows: bool = False
     ) -> List[Dict]:
         """
         여러 이미지 일괄 분석
@@ -178,6 +513,12 @@ class CellposeAnalyzer:
             diameter: 세포 직경
             flow_threshold: Flow threshold
             cellprob_threshold: Cell probability threshold
+            batch_size: 한 번의 forward에 묶어 처리할 타일 수
+            upscale_factor: 이미지 확대 비율
+            enhance_contrast: CLAHE 전처리 여부
+            prefetch: 미리 로드해 둘 이미지 수 (현재 이미지 분할 중 다음 이미지 로드/전처리)
+            eval_group: 한 번의 model.eval에 함께 넘길 이미지 수
+            return_flows: 결과에 flows/styles 포함 여부
             
         Returns:
             분석 결과 리스트
@@ -185,15 +526,41 @@ class CellposeAnalyzer:
         logger.info(f"Analyzing {len(image_paths)} images...")
         
         results = []
-        for i, path in enumerate(image_paths, 1):
-            logger.info(f"Progress: {i}/{len(image_paths)}")
-            result = self.analyze_image(
-                path,
-                diameter=diameter,
-                flow_threshold=flow_threshold,
-                cellprob_threshold=cellprob_threshold
+        prefetch = max(1, prefetch)
+        eval_group = max(1, eval_group)
+        diam = diameter if diameter is not None else self.diameter
+        group = []
+        # 로드 스레드 1개 (CLAHE 객체 공유), 최대 prefetch개 이미지를 앞서 준비
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            pending = deque(
+                executor.submit(self._load_and_preprocess, path, enhance_contrast, upscale_factor)
+                for path in image_paths[:prefetch]
             )
-            results.append(result)
+            for i, path in enumerate(image_paths, 1):
+                img, original_shape = pending.popleft().result()
+                
+                next_idx = i - 1 + prefetch
+                if next_idx < len(image_paths):
+                    pending.append(executor.submit(
+                        self._load_and_preprocess, image_paths[next_idx], enhance_contrast, upscale_factor
+                    ))
+                
+                group.append((path, img, original_shape))
+                if len(group) < eval_group and i < len(image_paths):
+                    continue
+                
+                # eval_group개 이미지를 한 번의 model.eval로 분할
+                logger.info(f"Progress: {i}/{len(image_paths)}")
+                outputs = self._eval_masks(
+                    [g[1] for g in group], diam,
+                    flow_threshold, cellprob_threshold, batch_size
+                )
+                for (g_path, g_img, g_shape), (masks, flows, styles) in zip(group, outputs):
+                    results.append(self._build_result(
+                        g_path, g_img, g_shape, masks, flows, styles, diam, upscale_factor,
+                        return_flows=return_flows
+                    ))
+                group = []
         
         logger.info("Batch analysis complete")
         return results
@@ -208,27 +575,288 @@ class CellposeAnalyzer:
         Returns:
             통계 딕셔너리
         """
-        total_cells = sum(r['num_cells'] for r in results)
-        all_areas = []
+        # 이미지별 세포 수 배열 (합/평균은 numpy 리덕션)
+        cell_counts = np.fromiter((r['num_cells'] for r in results), dtype=np.int64, count=len(results))
+        total_cells = int(cell_counts.sum())
         
-        for result in results:
-            for cell in result['cell_properties']:
-                all_areas.append(cell['area'])
+        # 결과별 면적 배열을 한 번에 연결 (dict 목록 형식의 이전 결과도 허용)
+        arrs = [
+            r['cell_properties']['area'] if isinstance(r['cell_properties'], dict)
+            else np.array([c['area'] for c in r['cell_properties']], dtype=np.int64)
+            for r in results
+        ]
+        arrs = [a for a in arrs if a.size]
+        all_areas = np.concatenate(arrs) if arrs else np.empty(0)
+        has_cells = all_areas.size > 0
         
         stats = {
             'total_images': len(results),
             'total_cells': total_cells,
-            'avg_cells_per_image': total_cells / len(results) if results else 0,
-            'avg_cell_area': np.mean(all_areas) if all_areas else 0,
-            'median_cell_area': np.median(all_areas) if all_areas else 0,
-            'std_cell_area': np.std(all_areas) if all_areas else 0,
-            'min_cell_area': np.min(all_areas) if all_areas else 0,
-            'max_cell_area': np.max(all_areas) if all_areas else 0
+            'avg_cells_per_image': float(cell_counts.mean()) if results else 0,
+            'avg_cell_area': all_areas.mean() if has_cells else 0,
+            'median_cell_area': np.median(all_areas) if has_cells else 0,
+            'std_cell_area': all_areas.std() if has_cells else 0,
+            'min_cell_area': all_areas.min() if has_cells else 0,
+            'max_cell_area': all_areas.max() if has_cells else 0
         }
         
         return stats
 
 
+class _AutocastNet(torch.nn.Module):
+    """Cellpose net의 forward를 autocast로 실행하고 출력을 FP32로 되돌리는 모듈"""
+    
+    def __init__(self, base_net: torch.nn.Module, dtype: torch.dtype = torch.float16):
+        super().__init__()
+        self.base_net = base_net
+        self.dtype = dtype
+    
+    def __getattr__(self, name):
+        # device, mkldnn 등 Cellpose가 참조하는 속성은 원래 net에서 가져옴
+        try:
+            return super().__getattr__(name)
+        except AttributeError:
+            return getattr(self._modules['base_net'], name)
+    
+    def forward(self, x):
+        with torch.autocast(device_type='cuda', dtype=self.dtype), torch.inference_mode():
+            out = self.base_net(x)[:2]
+        # 후처리(CPU, Numba)는 FP32 기준
+        out = tuple(o.float() for o in out)
+        # FP16 overflow로 flow에 NaN/Inf가 생기면 해당 배치만 FP32로 재계산
+        # (CUDA graph 캡처 중에는 동기화가 불가능하므로 검사 생략)
+        if (self.dtype == torch.float16 and not torch.cuda.is_current_stream_capturing()
+                and not torch.isfinite(out[0]).all()):
+            logger.warning("  Non-finite FP16 flow output, recomputing batch in FP32")
+            with torch.inference_mode():
+                out = tuple(o.float() for o in self.base_net(x)[:2])
+        return out
+
+
+class _CUDAGraphNet(torch.nn.Module):
+    """Cellpose net의 forward를 입력 형태별 CUDA graph로 캡처해 replay하는 모듈"""
+    
+    def __init__(self, base_net: torch.nn.Module, warmup_iters: int = 3):
+        super().__init__()
+        self.base_net = base_net
+        self.warmup_iters = warmup_iters
+        # {입력 shape/dtype: (graph, static_in, static_out)}
+        self._graphs = {}
+        # 캡처 실패한 형태는 eager로 실행
+        self._eager_keys = set()
+    
+    def __getattr__(self, name):
+        # device, mkldnn 등 Cellpose가 참조하는 속성은 원래 net에서 가져옴
+        try:
+            return super().__getattr__(name)
+        except AttributeError:
+            return getattr(self._modules['base_net'], name)
+    
+    def _capture(self, x):
+        """입력 x 형태의 graph 캡처"""
+        static_in = torch.empty_like(x)
+        static_in.copy_(x)
+        
+        # 캡처 전 별도 stream에서 warmup (cuDNN 알고리즘 선택, allocator 안정화)
+        s = torch.cuda.Stream()
+        s.wait_stream(torch.cuda.current_stream())
+        with torch.cuda.stream(s), torch.no_grad():
+            for _ in range(self.warmup_iters):
+                self.base_net(static_in)
+        torch.cuda.current_stream().wait_stream(s)
+        
+        g = torch.cuda.CUDAGraph()
+        with torch.cuda.graph(g), torch.no_grad():
+            static_out = self.base_net(static_in)[:2]
+        return g, static_in, static_out
+    
+    def forward(self, x):
+        key = (tuple(x.shape), x.dtype)
+        if not x.is_cuda or key in self._eager_keys:
+            return self.base_net(x)[:2]
+        
+        if key not in self._graphs:
+            try:
+                self._graphs[key] = self._capture(x)
+            except Exception as e:
+                logger.warning(f"  CUDA graph capture failed for {key[0]} ({e}), using eager mode")
+                self._eager_keys.add(key)
+                return self.base_net(x)[:2]
+        
+        g, static_in, static_out = self._graphs[key]
+        static_in.copy_(x, non_blocking=True)
+        g.replay()
+        # 다음 replay에서 덮어쓰이므로 복사본 반환
+        return tuple(out.clone() for out in static_out)
+
+
+def build_trt_engine(
+    net: torch.nn.Module,
+    plan_path: Path,
+    n_channels: int = 2,
+    tile_size: int = 224,
+    max_batch: int = 4,
+    precision: str = 'fp16'
+) -> Path:
+    """
+    Cellpose net을 ONNX로 export한 뒤 TensorRT 엔진(.plan) 빌드
+    
+    Args:
+        net: Cellpose 네트워크 (CellposeModel.net)
+        plan_path: 저장할 엔진 경로
+        n_channels: 입력 채널 수
+        tile_size: 타일 크기 (정적 H, W)
+        max_batch: 배치 크기 (정적)
+        precision: 'fp32', 'fp16', 'bf16'
+        
+    Returns:
+        생성된 엔진 경로
+    """
+    plan_path = Path(plan_path)
+    plan_path.parent.mkdir(parents=True, exist_ok=True)
+    onnx_path = plan_path.with_suffix('.onnx')
+    
+    # 1. ONNX export (정적 형태)
+    logger.info(f"  Exporting ONNX: {onnx_path}")
+    dummy = torch.zeros((max_batch, n_channels, tile_size, tile_size), device=next(net.parameters()).device)
+    net.eval()
+    with torch.no_grad():
+        torch.onnx.export(
+            net, dummy, str(onnx_path),
+            input_names=['input'],
+            output_names=['flows', 'style'],
+            opset_version=17
+        )
+    
+    # 2. TensorRT 빌드
+    logger.info(f"  Building TensorRT engine ({precision}): {plan_path}")
+    trt_logger = trt.Logger(trt.Logger.WARNING)
+    builder = trt.Builder(trt_logger)
+    network = builder.create_network(1 << int(trt.NetworkDefinitionCreationFlag.EXPLICIT_BATCH))
+    parser = trt.OnnxParser(network, trt_logger)
+    if not parser.parse(onnx_path.read_bytes()):
+        errors = [str(parser.get_error(i)) for i in range(parser.num_errors)]
+        raise RuntimeError(f"ONNX parse failed: {errors}")
+    
+    config = builder.create_builder_config()
+    config.set_memory_pool_limit(trt.MemoryPoolType.WORKSPACE, 1 << 30)
+    if precision == 'fp16':
+        config.set_flag(trt.BuilderFlag.FP16)
+    elif precision == 'bf16' and hasattr(trt.BuilderFlag, 'BF16'):
+        config.set_flag(trt.BuilderFlag.BF16)
+    
+    serialized = builder.build_serialized_network(network, config)
+    if serialized is None:
+        raise RuntimeError("TensorRT engine build failed")
+    plan_path.write_bytes(serialized)
+    
+    return plan_path
+
+
+class _TRTNet(torch.nn.Module):
+    """TensorRT 엔진을 Cellpose net 인터페이스 (flows, style)로 감싼 모듈"""
+    
+    def __init__(self, plan_path: Path, base_net: torch.nn.Module):
+        super().__init__()
+        # 엔진과 다른 입력 형태는 원래 net으로 처리
+        self.base_net = base_net
+        
+        runtime = trt.Runtime(trt.Logger(trt.Logger.WARNING))
+        self.engine = runtime.deserialize_cuda_engine(Path(plan_path).read_bytes())
+        self.context = self.engine.create_execution_context()
+        
+        # 정적 형태 엔진: 부족한 배치는 추론 시 padding
+        max_shape = tuple(self.engine.get_tensor_shape('input'))
+        self.max_batch = max_shape[0]
+        self.tile_shape = max_shape[1:]
+        
+        # 입력/출력 버퍼 (정적 배치 크기로 미리 할당)
+        self._input = torch.zeros(max_shape, device='cuda', dtype=torch.float32)
+        self._flows = torch.empty(tuple(self.context.get_tensor_shape('flows')), device='cuda', dtype=torch.float32)
+        self._style = torch.empty(tuple(self.context.get_tensor_shape('style')), device='cuda', dtype=torch.float32)
+    
+    def __getattr__(self, name):
+        # device, mkldnn 등 Cellpose가 참조하는 속성은 원래 net에서 가져옴
+        try:
+            return super().__getattr__(name)
+        except AttributeError:
+            return getattr(self._modules['base_net'], name)
+    
+    def forward(self, x):
+        if tuple(x.shape[1:]) != self.tile_shape or not x.is_cuda:
+            return self.base_net(x)[:2]
+        
+        stream = torch.cuda.current_stream().cuda_stream
+        flows, styles = [], []
+        for start in range(0, x.shape[0], self.max_batch):
+            chunk = x[start:start + self.max_batch]
+            n = chunk.shape[0]
+            # 마지막 배치는 정적 형태에 맞춰 padding
+            self._input[:n].copy_(chunk)
+            if n < self.max_batch:
+                self._input[n:].zero_()
+            self.context.set_tensor_address('input', self._input.data_ptr())
+            self.context.set_tensor_address('flows', self._flows.data_ptr())
+            self.context.set_tensor_address('style', self._style.data_ptr())
+            self.context.execute_async_v3(stream)
+            flows.append(self._flows[:n].clone())
+            styles.append(self._style[:n].clone())
+        
+        return torch.cat(flows), torch.cat(styles)
+
+
+class CellposeAnalyzerTRT(CellposeAnalyzer):
+    """TensorRT 엔진으로 네트워크 추론을 수행하는 CellposeAnalyzer (GPU 전용)"""
+    
+    def __init__(
+        self,
+        model_type='cyto3',
+        use_gpu=True,
+        diameter=None,
+        engine_dir='builds',
+        precision='fp16',
+        max_batch=4,
+        tile_size=224
+    ):
+        """
+        초기화
+        
+        Args:
+            model_type (str): 모델 타입
+            use_gpu (bool): GPU 사용 여부 (TensorRT는 GPU에서만 동작)
+            diameter (float/None): 세포 직경
+            engine_dir (str): TensorRT 엔진 저장 디렉토리
+            precision (str): 'fp32', 'fp16', 'bf16'
+            max_batch (int): 엔진 최대 배치 크기
+            tile_size (int): Cellpose 타일 크기 (bsize)
+        """
+        super().__init__(model_type=model_type, use_gpu=use_gpu, diameter=diameter)
+        self.engine_path = None
+        
+        if not (self.use_gpu and HAS_TENSORRT):
+            logger.info("  TensorRT not available, using PyTorch inference")
+            return
+        
+        try:
+            # 엔진은 GPU 아키텍처(SM)별로 한 번만 빌드
+            major, minor = torch.cuda.get_device_capability(0)
+            plan_path = Path(engine_dir) / f"cellpose_{model_type}_sm{major}{minor}_b{max_batch}_{precision}.plan"
+            if not plan_path.exists():
+                build_trt_engine(
+                    self.base_net,
+                    plan_path,
+                    n_channels=getattr(self.model, 'nchan', 2),
+                    tile_size=tile_size,
+                    max_batch=max_batch,
+                    precision=precision
+                )
+            self.model.net = _TRTNet(plan_path, self.model.net)
+            self.engine_path = plan_path
+            logger.info(f"  TensorRT engine loaded: {plan_path}")
+        except Exception as e:
+            logger.warning(f"  TensorRT setup failed ({e}), using PyTorch inference")
+
+
 def test_analyzer():
     """테스트 함수"""
     print("="*80)
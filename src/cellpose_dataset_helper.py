@@ -3,17 +3,15 @@ Cellpose 분석 결과 자동 저장 헬퍼 함수
 AI_Anticancer_Drug_System.py에서 사용
 """
 
-from datetime import datetime
-from pathlib import Path
-import sys
 
-# src 경로 추가
-src_path = Path(__file__).parent
-if str(src_path) not in sys.path:
-    sys.path.insert(0, str(src_path))
-
-from inference_dataset_manager import InferenceDatasetManager
-from report_generator import ReportGenerator
+def _dataset_manager():
+    """InferenceDatasetManager 생성 (pandas 등 의존성은 첫 호출 시 로드)"""
+    try:
+        from .inference_dataset_manager import InferenceDatasetManager
+    except ImportError:
+        # 스크립트로 직접 실행하는 경우
+        from inference_dataset_manager import InferenceDatasetManager
+    return InferenceDatasetManager()
 
 
 def save_cellpose_inference(
@@ -38,7 +36,7 @@ def save_cellpose_inference(
     Returns:
         저장된 파일 경로
     """
-    manager = InferenceDatasetManager()
+    manager = _dataset_manager()
     
     # Cellpose 분석 데이터 구성
     cellpose_analysis = {
@@ -80,7 +78,12 @@ def generate_and_save_report(patient_id: str) -> str:
     Returns:
         보고서 파일 경로
     """
-    manager = InferenceDatasetManager()
+    try:
+        from .report_generator import ReportGenerator
+    except ImportError:
+        from report_generator import ReportGenerator
+    
+    manager = _dataset_manager()
     generator = ReportGenerator(manager)
     
     report_path = generator.save_patient_report(patient_id)
@@ -95,7 +98,7 @@ def get_dataset_stats() -> dict:
     Returns:
         통계 딕셔너리
     """
-    manager = InferenceDatasetManager()
+    manager = _dataset_manager()
     return manager.get_summary_statistics()
 
 
@@ -4,10 +4,26 @@ JSON 데이터를 프로그램에서 사용할 수 있도록 로드
 """
 
 import json
+from collections import Counter
+from functools import lru_cache
 from pathlib import Path
 from typing import Dict, List, Optional
 import pandas as pd
 
+# PyArrow (선택적 의존성) - to_dataframe의 Arrow 타입 열
+try:
+    import pyarrow as pa
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+# orjson (선택적 의존성) - 없으면 표준 json 사용
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
 class ColorectalCancerDataset:
     """대장암 항암제 및 시그널 패스웨이 데이터셋"""
     
@@ -17,10 +33,14 @@ class ColorectalCancerDataset:
         
         self.dataset_path = Path(dataset_path)
         self.data = self.load_dataset()
+        self.build_indices()
     
     def load_dataset(self) -> Dict:
         """데이터셋 로드"""
         try:
+            if HAS_ORJSON:
+                with open(self.dataset_path, 'rb') as f:
+                    return orjson.loads(f.read())
             with open(self.dataset_path, 'r', encoding='utf-8') as f:
                 return json.load(f)
         except FileNotFoundError:
@@ -37,13 +57,47 @@ class ColorectalCancerDataset:
             "biomarkers": []
         }
     
+    def build_indices(self):
+        """
+        이름(대소문자 무시) → 항목 조회 인덱스 생성
+        self.data를 수정한 경우 다시 호출해야 함
+        """
+        def index(items, *keys):
+            idx = {}
+            for item in items:
+                for key in keys:
+                    value = item.get(key, '')
+                    if value:
+                        # 같은 이름이 여러 개면 목록 앞쪽 항목 우선 (기존 선형 탐색과 동일)
+                        idx.setdefault(value.casefold(), item)
+            return idx
+        
+        self._drug_idx = index(self.data.get('drugs', []), 'name', 'abbreviation')
+        self._pathway_idx = index(self.data.get('signaling_pathways', []), 'name')
+        self._combination_idx = index(self.data.get('drug_combinations', []), 'name')
+        self._biomarker_idx = index(self.data.get('biomarkers', []), 'name')
+        
+        # 같은 이름 반복 조회 캐시 (인스턴스별, build_indices 재호출 시 새로 생성되어 무효화)
+        self._cached_lookup = lru_cache(maxsize=1024)(self._lookup)
+        
+        # 바이오마커별 (영향 설명, 약물) 목록을 미리 해석, 상태별 검색 결과는 첫 조회 시 캐시
+        self._biomarker_impacts = {}
+        for key, marker in self._biomarker_idx.items():
+            impacts = []
+            for drug_name, impact in marker.get('therapeutics_impact', {}).items():
+                drug = self.get_drug(drug_name)
+                if drug:
+                    impacts.append((impact.lower(), drug))
+            self._biomarker_impacts[key] = impacts
+        self._biomarker_search_cache = {}
+    
+    def _lookup(self, index_name: str, name: str) -> Optional[Dict]:
+        """인덱스에서 대소문자 무시 이름 조회"""
+        return getattr(self, index_name).get(name.casefold())
+    
     def get_drug(self, drug_name: str) -> Optional[Dict]:
-        """약물 정보 조회"""
-        for drug in self.data.get('drugs', []):
-            if drug['name'].lower() == drug_name.lower() or \
-               drug.get('abbreviation', '').lower() == drug_name.lower():
-                return drug
-        return None
+        """약물 정보 조회 (이름 또는 약어)"""
+        return self._cached_lookup('_drug_idx', drug_name)
     
     def get_drugs_by_pathway(self, pathway_name: str) -> List[Dict]:
         """특정 경로를 표적하는 약물 조회"""
@@ -51,29 +105,20 @@ class ColorectalCancerDataset:
         if not pathway:
             return []
         
-        targeted_drugs = pathway.get('targeted_drugs', [])
-        return [self.get_drug(name) for name in targeted_drugs if self.get_drug(name)]
+        drugs = (self.get_drug(name) for name in pathway.get('targeted_drugs', []))
+        return [drug for drug in drugs if drug]
     
     def get_pathway(self, pathway_name: str) -> Optional[Dict]:
         """시그널 패스웨이 정보 조회"""
-        for pathway in self.data.get('signaling_pathways', []):
-            if pathway['name'].lower() == pathway_name.lower():
-                return pathway
-        return None
+        return self._cached_lookup('_pathway_idx', pathway_name)
     
     def get_combination(self, combo_name: str) -> Optional[Dict]:
         """약물 조합 정보 조회"""
-        for combo in self.data.get('drug_combinations', []):
-            if combo['name'].lower() == combo_name.lower():
-                return combo
-        return None
+        return self._cached_lookup('_combination_idx', combo_name)
     
     def get_biomarker(self, biomarker_name: str) -> Optional[Dict]:
         """바이오마커 정보 조회"""
-        for marker in self.data.get('biomarkers', []):
-            if marker['name'].lower() == biomarker_name.lower():
-                return marker
-        return None
+        return self._cached_lookup('_biomarker_idx', biomarker_name)
     
     def get_all_drugs(self) -> List[Dict]:
         """모든 약물 정보"""
@@ -98,20 +143,17 @@ class ColorectalCancerDataset:
         Returns:
             추천 약물 리스트
         """
-        marker_info = self.get_biomarker(biomarker)
-        if not marker_info:
-            return []
-        
-        therapeutics_impact = marker_info.get('therapeutics_impact', {})
-        recommended_drugs = []
-        
-        for drug_name, impact in therapeutics_impact.items():
-            if status.lower() in impact.lower():
-                drug = self.get_drug(drug_name)
-                if drug:
-                    recommended_drugs.append(drug)
+        key = (biomarker.casefold(), status.lower())
+        recommended_drugs = self._biomarker_search_cache.get(key)
+        if recommended_drugs is None:
+            status_lower = key[1]
+            recommended_drugs = [
+                drug for impact, drug in self._biomarker_impacts.get(key[0], [])
+                if status_lower in impact
+            ]
+            self._biomarker_search_cache[key] = recommended_drugs
         
-        return recommended_drugs
+        return list(recommended_drugs)
     
     def to_dataframe(self, data_type: str) -> pd.DataFrame:
         """
@@ -121,16 +163,31 @@ class ColorectalCancerDataset:
             data_type: 'drugs', 'pathways', 'combinations', 'biomarkers'
         """
         if data_type == 'drugs':
-            return pd.DataFrame(self.get_all_drugs())
+            return self._records_to_dataframe(self.get_all_drugs())
         elif data_type == 'pathways':
-            return pd.DataFrame(self.get_all_pathways())
+            return self._records_to_dataframe(self.get_all_pathways())
         elif data_type == 'combinations':
-            return pd.DataFrame(self.get_all_combinations())
+            return self._records_to_dataframe(self.get_all_combinations())
         elif data_type == 'biomarkers':
-            return pd.DataFrame(self.data.get('biomarkers', []))
+            return self._records_to_dataframe(self.data.get('biomarkers', []))
         else:
             raise ValueError(f"Unknown data type: {data_type}")
     
+    def _records_to_dataframe(self, records: List[Dict]) -> pd.DataFrame:
+        """
+        JSON 레코드 목록 → DataFrame
+        PyArrow가 있으면 중첩 리스트/딕셔너리 열도 Arrow 타입으로 보관 (object 열 대신)
+        """
+        if not (HAS_PYARROW and records):
+            return pd.DataFrame(records)
+        try:
+            # pa.array는 전체 레코드에서 키를 모아 struct 타입 추론
+            batch = pa.RecordBatch.from_struct_array(pa.array(records))
+            return batch.to_pandas(types_mapper=pd.ArrowDtype)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # 같은 필드에 서로 다른 타입이 섞인 경우
+            return pd.DataFrame(records)
+    
     def get_statistics(self) -> Dict:
         """데이터셋 통계"""
         return {
@@ -144,20 +201,14 @@ class ColorectalCancerDataset:
     
     def _count_drug_categories(self) -> Dict[str, int]:
         """약물 카테고리별 개수"""
-        categories = {}
-        for drug in self.get_all_drugs():
-            category = drug.get('category', 'Unknown')
-            categories[category] = categories.get(category, 0) + 1
-        return categories
+        return dict(Counter(drug.get('category', 'Unknown') for drug in self.get_all_drugs()))
     
     def _count_pathway_alterations(self) -> Dict[str, int]:
         """패스웨이 변이 빈도"""
-        alterations = {}
-        for pathway in self.get_all_pathways():
-            name = pathway['name']
-            freq = pathway.get('alterations', {}).get('frequency', 0)
-            alterations[name] = freq
-        return alterations
+        return {
+            pathway['name']: pathway.get('alterations', {}).get('frequency', 0)
+            for pathway in self.get_all_pathways()
+        }
 
 
 def example_usage():
@@ -3,6 +3,7 @@
 엑셀 파일 처리, 약물 데이터 관리
 """
 
+import importlib.util
 import sys
 import pandas as pd
 import numpy as np
@@ -15,10 +16,83 @@ if sys.platform == 'win32':
     sys.stdout.reconfigure(encoding='utf-8')
     sys.stderr.reconfigure(encoding='utf-8')
 
+# PyArrow (선택적 의존성) - 엑셀 로드 결과 Parquet 캐시
+# pandas가 to_parquet/read_parquet에서 직접 불러오므로 설치 여부만 확인
+HAS_PYARROW = importlib.util.find_spec('pyarrow') is not None
+
+# openpyxl - .xlsx 파일을 read-only 모드로 직접 읽기 (없으면 pd.read_excel 사용)
+try:
+    import openpyxl
+    HAS_OPENPYXL = True
+except ImportError:
+    HAS_OPENPYXL = False
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+def _read_excel_fast(excel_path: Path) -> pd.DataFrame:
+    """
+    openpyxl read-only 모드로 첫 시트를 값만 읽어 DataFrame 생성
+    (셀 객체/스타일을 만들지 않아 pd.read_excel보다 빠르고 메모리 사용이 적음)
+    """
+    wb = openpyxl.load_workbook(excel_path, read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return pd.DataFrame()
+        data = list(rows)
+    finally:
+        wb.close()
+    
+    # pd.read_excel과 동일하게 끝부분의 빈 행 제거, 빈 헤더는 'Unnamed: i'로 표기
+    while data and all(v is None for v in data[-1]):
+        data.pop()
+    columns = [
+        f"Unnamed: {i}" if name is None else name
+        for i, name in enumerate(header)
+    ]
+    return pd.DataFrame(data, columns=columns)
+
+
+def _read_excel(excel_path) -> pd.DataFrame:
+    """.xlsx는 openpyxl read-only 로더, 그 외(.xls, 파일 객체)는 pd.read_excel 사용"""
+    if (HAS_OPENPYXL and isinstance(excel_path, (str, Path))
+            and Path(excel_path).suffix.lower() in ('.xlsx', '.xlsm')):
+        return _read_excel_fast(Path(excel_path))
+    return pd.read_excel(excel_path)
+
+
+def read_excel_cached(excel_path, use_cache: bool = True) -> pd.DataFrame:
+    """
+    엑셀 파일 로드 (옆에 저장한 .parquet 캐시가 엑셀보다 최신이면 캐시 사용)
+    
+    Args:
+        excel_path: 엑셀 파일 경로 (경로가 아닌 파일 객체는 캐시 없이 로드)
+        use_cache: Parquet 캐시 사용 여부
+        
+    Returns:
+        DataFrame
+    """
+    if not (use_cache and HAS_PYARROW and isinstance(excel_path, (str, Path))):
+        return _read_excel(excel_path)
+    
+    excel_path = Path(excel_path)
+    cache = excel_path.with_suffix('.parquet')
+    if cache.exists() and cache.stat().st_mtime >= excel_path.stat().st_mtime:
+        logger.info(f"  Using parquet cache: {cache.name}")
+        return pd.read_parquet(cache, engine='pyarrow')
+    
+    df = _read_excel(excel_path)
+    try:
+        df.to_parquet(cache, engine='pyarrow', compression='zstd')
+    except Exception as e:
+        # 혼합 타입 열 등 Parquet로 저장할 수 없는 경우 캐시 없이 진행
+        logger.warning(f"  Failed to write parquet cache: {e}")
+    return df
+
+
 class DataProcessor:
     """데이터 처리 클래스"""
     
@@ -28,12 +102,13 @@ class DataProcessor:
         self.cell_data = None
         self.analysis_results = {}
     
-    def load_drug_data(self, excel_path: str) -> pd.DataFrame:
+    def load_drug_data(self, excel_path: str, use_cache: bool = True) -> pd.DataFrame:
         """
         약물 데이터 로드
         
         Args:
             excel_path: 엑셀 파일 경로
+            use_cache: Parquet 캐시 사용 여부
             
         Returns:
             DataFrame
@@ -41,7 +116,7 @@ class DataProcessor:
         logger.info(f"Loading drug data from: {excel_path}")
         
         try:
-            df = pd.read_excel(excel_path)
+            df = read_excel_cached(excel_path, use_cache)
             self.drug_data = df
             logger.info(f"  Loaded {len(df)} rows")
             logger.info(f"  Columns: {list(df.columns)}")
@@ -50,12 +125,13 @@ class DataProcessor:
             logger.error(f"Failed to load drug data: {e}")
             raise
     
-    def load_cell_line_data(self, excel_path: str) -> pd.DataFrame:
+    def load_cell_line_data(self, excel_path: str, use_cache: bool = True) -> pd.DataFrame:
         """
         세포주 데이터 로드
         
         Args:
             excel_path: 엑셀 파일 경로
+            use_cache: Parquet 캐시 사용 여부
             
         Returns:
             DataFrame
@@ -63,7 +139,7 @@ class DataProcessor:
         logger.info(f"Loading cell line data from: {excel_path}")
         
         try:
-            df = pd.read_excel(excel_path)
+            df = read_excel_cached(excel_path, use_cache)
             self.cell_data = df
             logger.info(f"  Loaded {len(df)} rows")
             return df
@@ -88,19 +164,32 @@ class DataProcessor:
         """
         logger.info("Combining image analysis and drug data...")
         
-        # Cellpose 결과를 DataFrame으로 변환
-        data_list = []
-        for result in cellpose_results:
-            image_name = Path(result['image_path']).stem
-            
-            data_list.append({
-                'image_name': image_name,
-                'image_path': result['image_path'],
-                'num_cells': result['num_cells'],
-                'avg_cell_area': np.mean([c['area'] for c in result['cell_properties']]) if result['cell_properties'] else 0
-            })
+        # Cellpose 결과를 열 단위 배열로 변환 (이미지별 dict 생성 없이, 배열 복사 없이 DataFrame 구성)
+        image_paths = [result['image_path'] for result in cellpose_results]
+        sizes = np.fromiter(
+            (result['cell_properties']['area'].size for result in cellpose_results),
+            dtype=np.int64, count=len(cellpose_results)
+        )
         
-        df_cells = pd.DataFrame(data_list)
+        # 전체 세포 면적을 하나로 연결한 뒤 이미지 구간별 합 (세포가 없는 이미지는 0)
+        avg_cell_area = np.zeros(len(cellpose_results), dtype=np.float64)
+        has_cells = sizes > 0
+        if has_cells.any():
+            areas = np.concatenate(
+                [result['cell_properties']['area'] for result in cellpose_results]
+            ).astype(np.float64)
+            offsets = np.cumsum(sizes) - sizes
+            avg_cell_area[has_cells] = np.add.reduceat(areas, offsets[has_cells]) / sizes[has_cells]
+        
+        df_cells = pd.DataFrame({
+            'image_name': [Path(path).stem for path in image_paths],
+            'image_path': image_paths,
+            'num_cells': np.fromiter(
+                (result['num_cells'] for result in cellpose_results),
+                dtype=np.int64, count=len(cellpose_results)
+            ),
+            'avg_cell_area': avg_cell_area
+        }, copy=False)
         
         # 약물 정보와 결합 (이미지 이름 기준)
         # 실제 프로젝트에서는 매칭 로직을 커스터마이즈해야 함
@@ -238,18 +327,35 @@ class DrugCombinationAnalyzer:
         Returns:
             순위 DataFrame
         """
-        results = []
+        # 조합별 점수를 배열 연산으로 일괄 계산 (score_combination과 동일한 규칙)
+        combinations = list(combinations)
+        drugs = list(dict.fromkeys(d for comb in combinations for d in comb))
+        drug_idx = {d: i for i, d in enumerate(drugs)}
+        inhibition = np.array(
+            [efficacy_data[d].get('inhibition_rate', 0) if d in efficacy_data else 0.0 for d in drugs],
+            dtype=np.float64
+        )
+        
+        sizes = np.fromiter((len(comb) for comb in combinations), dtype=np.int64, count=len(combinations))
+        flat_idx = np.fromiter(
+            (drug_idx[d] for comb in combinations for d in comb),
+            dtype=np.int64, count=int(sizes.sum())
+        )
         
-        for comb in combinations:
-            score = self.score_combination(comb, efficacy_data)
-            results.append({
-                'combination': ' + '.join(comb),
-                'drugs': comb,
-                'score': score
-            })
+        scores = np.zeros(len(combinations), dtype=np.float64)
+        nonempty = sizes > 0
+        if nonempty.any():
+            offsets = np.cumsum(sizes) - sizes
+            scores[nonempty] = np.add.reduceat(inhibition[flat_idx], offsets[nonempty])
+        # 시너지 효과 가정 (2제 이상 20% 보너스)
+        scores[sizes > 1] *= 1.2
         
-        df = pd.DataFrame(results)
-        df = df.sort_values('score', ascending=False).reset_index(drop=True)
+        order = np.argsort(-scores, kind='stable')
+        df = pd.DataFrame({
+            'combination': [' + '.join(combinations[i]) for i in order],
+            'drugs': [combinations[i] for i in order],
+            'score': scores[order]
+        })
         df['rank'] = range(1, len(df) + 1)
         
         return df
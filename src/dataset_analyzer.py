@@ -5,16 +5,117 @@ Dataset 폴더 분류 및 분석 도구
 
 import os
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
+from collections import Counter
+import itertools
 from datetime import datetime
+import heapq
 import json
+import re
 import shutil
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# orjson (선택적 의존성) - 없으면 표준 json 사용
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+# pyahocorasick (선택적 의존성) - 없으면 정규식 1회 스캔으로 대체
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+# 파일명 키워드 → 태그 (papers/reports: 문서 분류, cell: 세포 이미지, important: 중요 문서)
+KEYWORD_TAGS = {
+    'papers': ['논문', 'paper', 'article'],
+    'reports': ['보고서', 'report', '분석'],
+    'cell': ['암', 'cancer', 'cell', 'hct', 'snu'],
+    'important': [
+        '계획서', '보고서', '특허', 'patent',
+        '논문', 'paper', 'article',
+        '연구', 'research', '분석', 'analysis',
+        'comprehensive', 'report', 'final'
+    ]
+}
+
+# 확장자 → 기본 카테고리 (documents/images는 파일명 키워드로 다시 세분)
+EXT_CATEGORY = {
+    **dict.fromkeys(['.pdf', '.docx', '.doc', '.txt', '.md'], 'documents'),
+    **dict.fromkeys(['.png', '.jpg', '.jpeg', '.tif', '.tiff', '.bmp'], 'images'),
+    **dict.fromkeys(['.pptx', '.ppt'], 'presentations'),
+    **dict.fromkeys(['.csv', '.xlsx', '.xls', '.json'], 'data_files')
+}
+
+
+def _build_keyword_matcher():
+    """모든 키워드를 한 번에 찾는 매처 생성 (파일명당 1회 스캔)"""
+    keyword_tags = {}
+    for tag, keywords in KEYWORD_TAGS.items():
+        for keyword in keywords:
+            keyword_tags.setdefault(keyword, set()).add(tag)
+    
+    if AHOCORASICK_AVAILABLE:
+        automaton = ahocorasick.Automaton()
+        for keyword, tags in keyword_tags.items():
+            automaton.add_word(keyword, frozenset(tags))
+        automaton.make_automaton()
+        return lambda name: set().union(*(tags for _, tags in automaton.iter(name)))
+    
+    # lookahead로 겹치는 위치의 키워드까지 모두 검출
+    pattern = re.compile('(?=(' + '|'.join(map(re.escape, keyword_tags)) + '))')
+    return lambda name: set().union(*(keyword_tags[m] for m in pattern.findall(name)))
+
+
+_match_keywords = _build_keyword_matcher()
+
+
+def _place_file(source: Path, dest: Path, mode: str = 'copy'):
+    """
+    파일을 dest에 배치
+    
+    Args:
+        mode: 'copy' (복사), 'hardlink' (같은 파일시스템이면 하드링크),
+              'reflink' (copy_file_range, CoW 파일시스템에서는 블록 공유)
+    """
+    if mode == 'hardlink':
+        try:
+            os.link(source, dest)
+            return
+        except OSError:
+            # 다른 파일시스템/링크 미지원 시 복사
+            pass
+    elif mode == 'reflink' and hasattr(os, 'copy_file_range'):
+        try:
+            with open(source, 'rb') as fsrc, open(dest, 'wb') as fdst:
+                remaining = os.fstat(fsrc.fileno()).st_size
+                while remaining > 0:
+                    copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                    if copied == 0:
+                        break
+                    remaining -= copied
+            shutil.copystat(source, dest)
+            return
+        except OSError:
+            pass
+    shutil.copy2(source, dest)
+
 
 class DatasetAnalyzer:
     """Dataset 폴더 분석 및 분류"""
     
-    def __init__(self, dataset_path: str):
+    def __init__(self, dataset_path: str, top_k: Optional[int] = None):
+        """
+        Args:
+            dataset_path: 분석할 Dataset 폴더
+            top_k: 지정 시 목록별로 크기 상위 K개만 보관하고 나머지는 개수만 집계
+                   (대용량 폴더에서 메모리 사용량 제한, organize_by_category 사용 불가)
+        """
         self.dataset_path = Path(dataset_path)
+        self.top_k = top_k
         self.analysis_results = {
             'scan_time': datetime.now().isoformat(),
             'total_files': 0,
@@ -26,123 +127,177 @@ class DatasetAnalyzer:
             'images': [],
             'research_papers': []
         }
+        self._cell_images = []  # 세포 이미지 목록 (통계/보고서 공용)
+        self._counts = Counter()  # 목록별 전체 항목 수 (top_k 모드에서도 정확)
+        self._heaps = {}  # top_k 모드: 목록별 (size_mb, 순번, file_info) 최소 힙
+        self._seq = itertools.count()
     
     def scan_directory(self) -> Dict:
         """디렉토리 전체 스캔"""
         print(f"📂 스캔 시작: {self.dataset_path}")
         
-        for root, dirs, files in os.walk(self.dataset_path):
-            self.analysis_results['total_directories'] += len(dirs)
-            
-            for file in files:
-                file_path = Path(root) / file
-                self._analyze_file(file_path)
-                self.analysis_results['total_files'] += 1
+        self._scan(str(self.dataset_path), '')
         
         self._generate_statistics()
         return self.analysis_results
     
-    def _analyze_file(self, file_path: Path):
+    def _scan(self, dir_path: str, rel_dir: str):
+        """os.scandir 재귀 순회 (DirEntry의 캐시된 타입/stat 정보 사용)"""
+        try:
+            with os.scandir(dir_path) as it:
+                entries = list(it)
+        except OSError:
+            # os.walk와 동일하게 읽을 수 없는 디렉토리는 건너뜀
+            return
+        
+        subdirs = []
+        for entry in entries:
+            rel_path = os.path.join(rel_dir, entry.name) if rel_dir else entry.name
+            if entry.is_dir():
+                self.analysis_results['total_directories'] += 1
+                # 심볼릭 링크 디렉토리는 따라가지 않음 (os.walk 기본값과 동일)
+                if not entry.is_symlink():
+                    subdirs.append((entry.path, rel_path))
+            else:
+                self._analyze_file(entry, rel_path)
+                self.analysis_results['total_files'] += 1
+        
+        for sub_path, sub_rel in subdirs:
+            self._scan(sub_path, sub_rel)
+    
+    def _analyze_file(self, entry: os.DirEntry, rel_path: str):
         """개별 파일 분석"""
         try:
+            # 파일명 키워드 검사는 분류/중요 문서 판별에 공통으로 1회만 수행
+            tags = _match_keywords(entry.name.lower())
             file_info = {
-                'name': file_path.name,
-                'path': str(file_path.relative_to(self.dataset_path)),
-                'size_mb': file_path.stat().st_size / (1024 * 1024),
-                'extension': file_path.suffix.lower(),
-                'category': self._categorize_file(file_path)
+                'name': entry.name,
+                'path': rel_path,
+                'size_mb': entry.stat().st_size / (1024 * 1024),
+                'extension': os.path.splitext(entry.name)[1].lower(),
+                'category': self._categorize_file(entry.name, tags)
             }
             
             # 카테고리별 분류
             category = file_info['category']
-            if category not in self.analysis_results['file_categories']:
-                self.analysis_results['file_categories'][category] = []
-            self.analysis_results['file_categories'][category].append(file_info)
+            self._collect(('file_categories', category), file_info)
             
             # 큰 파일 (10MB 이상)
             if file_info['size_mb'] > 10:
-                self.analysis_results['large_files'].append(file_info)
+                self._collect('large_files', file_info)
             
             # 중요 문서
-            if self._is_important_document(file_path):
-                self.analysis_results['important_documents'].append(file_info)
+            if self._is_important_document(entry.name, tags):
+                self._collect('important_documents', file_info)
             
-            # 이미지
+            # 이미지 (세포 이미지는 통계/보고서용으로 별도 수집)
             if category == 'images':
-                self.analysis_results['images'].append(file_info)
+                self._collect('images', file_info)
+            elif category == 'cell_images':
+                self._collect('cell_images', file_info)
             
             # 논문
             if category == 'papers':
-                self.analysis_results['research_papers'].append(file_info)
+                self._collect('research_papers', file_info)
                 
         except Exception as e:
-            print(f"⚠️ 파일 분석 실패: {file_path.name} - {e}")
+            print(f"⚠️ 파일 분석 실패: {entry.name} - {e}")
+    
+    def _collect(self, key, file_info: Dict):
+        """목록에 파일 추가 (top_k 모드에서는 크기 상위 K개만 힙으로 유지)"""
+        self._counts[key] += 1
+        if self.top_k is None:
+            if key == 'cell_images':
+                self._cell_images.append(file_info)
+            elif isinstance(key, tuple):
+                self.analysis_results['file_categories'].setdefault(key[1], []).append(file_info)
+            else:
+                self.analysis_results[key].append(file_info)
+            return
+        
+        heap = self._heaps.setdefault(key, [])
+        item = (file_info['size_mb'], next(self._seq), file_info)
+        if len(heap) < self.top_k:
+            heapq.heappush(heap, item)
+        elif item[0] > heap[0][0]:
+            heapq.heapreplace(heap, item)
     
-    def _categorize_file(self, file_path: Path) -> str:
+    def _flush_heaps(self):
+        """top_k 힙을 크기 내림차순 목록으로 변환하여 결과에 반영"""
+        for key, heap in self._heaps.items():
+            files = [file_info for _, _, file_info in sorted(heap, reverse=True)]
+            if key == 'cell_images':
+                self._cell_images = files
+            elif isinstance(key, tuple):
+                self.analysis_results['file_categories'][key[1]] = files
+            else:
+                self.analysis_results[key] = files
+        self._heaps = {}
+    
+    def _categorize_file(self, file_name: str, tags: set = None) -> str:
         """파일 카테고리 분류"""
-        ext = file_path.suffix.lower()
-        name = file_path.name.lower()
+        ext = os.path.splitext(file_name)[1].lower()
+        if tags is None:
+            tags = _match_keywords(file_name.lower())
+        
+        category = EXT_CATEGORY.get(ext, 'others')
         
-        # 문서
-        if ext in ['.pdf', '.docx', '.doc', '.txt', '.md']:
-            if any(keyword in name for keyword in ['논문', 'paper', 'article']):
+        # 문서: 키워드로 논문/보고서 세분
+        if category == 'documents':
+            if 'papers' in tags:
                 return 'papers'
-            elif any(keyword in name for keyword in ['보고서', 'report', '분석']):
+            elif 'reports' in tags:
                 return 'reports'
-            else:
-                return 'documents'
-        
-        # 이미지
-        elif ext in ['.png', '.jpg', '.jpeg', '.tif', '.tiff', '.bmp']:
-            if any(keyword in name for keyword in ['암', 'cancer', 'cell', 'hct', 'snu']):
-                return 'cell_images'
-            return 'images'
+            return 'documents'
         
-        # 프레젠테이션
-        elif ext in ['.pptx', '.ppt']:
-            return 'presentations'
+        # 이미지: 키워드로 세포 이미지 세분
+        if category == 'images' and 'cell' in tags:
+            return 'cell_images'
         
-        # 데이터
-        elif ext in ['.csv', '.xlsx', '.xls', '.json']:
-            return 'data_files'
-        
-        else:
-            return 'others'
+        return category
     
-    def _is_important_document(self, file_path: Path) -> bool:
+    def _is_important_document(self, file_name: str, tags: set = None) -> bool:
         """중요 문서 판별"""
-        name = file_path.name.lower()
-        keywords = [
-            '계획서', '보고서', '특허', 'patent',
-            '논문', 'paper', 'article',
-            '연구', 'research', '분석', 'analysis',
-            'comprehensive', 'report', 'final'
-        ]
-        return any(keyword in name for keyword in keywords)
+        if tags is None:
+            tags = _match_keywords(file_name.lower())
+        return 'important' in tags
     
     def _generate_statistics(self):
         """통계 생성"""
-        # 카테고리별 파일 개수
+        if self.top_k is not None:
+            self._flush_heaps()
+        
+        # 카테고리별 파일 개수 (스캔 중 집계한 개수만 사용, 파일 목록 재순회 없음)
         category_counts = {
-            cat: len(files) 
-            for cat, files in self.analysis_results['file_categories'].items()
+            key[1]: n
+            for key, n in self._counts.items()
+            if isinstance(key, tuple)
         }
         self.analysis_results['category_statistics'] = category_counts
+        self.analysis_results['important_documents_total'] = self._counts['important_documents']
         
         # 이미지 통계
-        total_images = len(self.analysis_results['images'])
-        cell_images = len([
-            f for f in self.analysis_results['images'] 
-            if 'cell' in f['category']
-        ])
+        other_images = self._counts['images']
+        cell_images = self._counts['cell_images']
         self.analysis_results['image_statistics'] = {
-            'total': total_images,
+            'total': cell_images + other_images,
             'cell_images': cell_images,
-            'other_images': total_images - cell_images
+            'other_images': other_images
         }
     
-    def organize_by_category(self, output_dir: str = None):
-        """카테고리별로 파일 정리 (복사)"""
+    def organize_by_category(self, output_dir: str = None, mode: str = 'copy'):
+        """
+        카테고리별로 파일 정리
+        
+        Args:
+            output_dir: 정리 폴더 (기본: dataset_organized)
+            mode: 'copy' | 'hardlink' | 'reflink' (링크 불가 시 복사로 대체)
+        """
+        if mode not in ('copy', 'hardlink', 'reflink'):
+            raise ValueError(f"Unknown mode: {mode}")
+        if self.top_k is not None:
+            raise ValueError("top_k 모드에서는 전체 파일 목록이 없어 정리할 수 없습니다")
+        
         if output_dir is None:
             output_dir = self.dataset_path.parent / 'dataset_organized'
         
@@ -151,29 +306,41 @@ class DatasetAnalyzer:
         
         print(f"\n📁 파일 정리 시작: {output_dir}")
         
-        organized_count = 0
+        # 복사 대상 목록을 먼저 확정 (폴더 생성/중복 파일명 처리는 순차로 미리 수행)
+        copy_jobs = []
         for category, files in self.analysis_results['file_categories'].items():
             category_dir = output_dir / category
             category_dir.mkdir(exist_ok=True)
+            taken = set(os.listdir(category_dir))
             
             for file_info in files:
                 source = self.dataset_path / file_info['path']
-                dest = category_dir / file_info['name']
+                name = file_info['name']
                 
+                # 중복 파일명 처리
+                if name in taken:
+                    base, ext = os.path.splitext(name)
+                    counter = 1
+                    while f"{base}_{counter}{ext}" in taken:
+                        counter += 1
+                    name = f"{base}_{counter}{ext}"
+                taken.add(name)
+                copy_jobs.append((source, category_dir / name, file_info['name']))
+        
+        # I/O 대기 중 GIL이 해제되므로 스레드로 여러 파일을 동시에 복사
+        organized_count = 0
+        max_workers = min(32, (os.cpu_count() or 1) * 4)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(_place_file, source, dest, mode): name
+                for source, dest, name in copy_jobs
+            }
+            for future in as_completed(futures):
                 try:
-                    # 중복 파일명 처리
-                    if dest.exists():
-                        base = dest.stem
-                        ext = dest.suffix
-                        counter = 1
-                        while dest.exists():
-                            dest = category_dir / f"{base}_{counter}{ext}"
-                            counter += 1
-                    
-                    shutil.copy2(source, dest)
+                    future.result()
                     organized_count += 1
                 except Exception as e:
-                    print(f"⚠️ 복사 실패: {file_info['name']} - {e}")
+                    print(f"⚠️ 복사 실패: {futures[future]} - {e}")
         
         print(f"✅ {organized_count}개 파일 정리 완료!")
         return output_dir
@@ -195,7 +362,7 @@ class DatasetAnalyzer:
         """마크다운 보고서 생성"""
         results = self.analysis_results
         
-        report = f"""# Dataset 폴더 분석 보고서
+        parts = [f"""# Dataset 폴더 분석 보고서
 
 ## 📊 기본 정보
 
@@ -208,7 +375,7 @@ class DatasetAnalyzer:
 
 ## 📁 카테고리별 파일 분류
 
-"""
+"""]
         
         # 카테고리 통계
         for category, count in sorted(results.get('category_statistics', {}).items(), key=lambda x: x[1], reverse=True):
@@ -223,20 +390,20 @@ class DatasetAnalyzer:
                 'others': '📦 기타'
             }
             name = category_names.get(category, category)
-            report += f"- **{name}**: {count}개\n"
+            parts.append(f"- **{name}**: {count}개\n")
         
-        report += "\n---\n\n## 🔍 중요 문서\n\n"
+        parts.append("\n---\n\n## 🔍 중요 문서\n\n")
         
         for doc in results['important_documents'][:20]:  # 상위 20개
-            report += f"- **{doc['name']}**\n"
-            report += f"  - 경로: `{doc['path']}`\n"
-            report += f"  - 크기: {doc['size_mb']:.2f} MB\n\n"
+            parts.append(f"- **{doc['name']}**\n")
+            parts.append(f"  - 경로: `{doc['path']}`\n")
+            parts.append(f"  - 크기: {doc['size_mb']:.2f} MB\n\n")
         
-        report += f"\n전체 {len(results['important_documents'])}개\n\n"
-        report += "---\n\n## 🔬 세포 이미지\n\n"
+        parts.append(f"\n전체 {results.get('important_documents_total', len(results['important_documents']))}개\n\n")
+        parts.append("---\n\n## 🔬 세포 이미지\n\n")
         
-        cell_images = [f for f in results['images'] if f['category'] == 'cell_images']
-        report += f"**총 {len(cell_images)}개의 세포 이미지 발견**\n\n"
+        cell_images = self._cell_images
+        parts.append(f"**총 {results['image_statistics']['cell_images']}개의 세포 이미지 발견**\n\n")
         
         # 디렉토리별 그룹화
         image_dirs = {}
@@ -247,43 +414,50 @@ class DatasetAnalyzer:
             image_dirs[dir_name].append(img)
         
         for dir_name, images in sorted(image_dirs.items()):
-            report += f"### {dir_name}\n\n"
-            report += f"- 이미지 수: {len(images)}개\n"
-            report += f"- 총 크기: {sum(img['size_mb'] for img in images):.2f} MB\n\n"
+            parts.append(f"### {dir_name}\n\n")
+            parts.append(f"- 이미지 수: {len(images)}개\n")
+            parts.append(f"- 총 크기: {sum(img['size_mb'] for img in images):.2f} MB\n\n")
         
-        report += "\n---\n\n## 📚 연구 논문\n\n"
+        parts.append("\n---\n\n## 📚 연구 논문\n\n")
         
         for paper in results['research_papers'][:15]:
-            report += f"- **{paper['name']}**\n"
-            report += f"  - 경로: `{paper['path']}`\n"
-            report += f"  - 크기: {paper['size_mb']:.2f} MB\n\n"
+            parts.append(f"- **{paper['name']}**\n")
+            parts.append(f"  - 경로: `{paper['path']}`\n")
+            parts.append(f"  - 크기: {paper['size_mb']:.2f} MB\n\n")
         
-        report += "\n---\n\n## 💾 대용량 파일 (10MB 이상)\n\n"
+        parts.append("\n---\n\n## 💾 대용량 파일 (10MB 이상)\n\n")
         
         large_files = sorted(results['large_files'], key=lambda x: x['size_mb'], reverse=True)
         for file in large_files[:10]:
-            report += f"- **{file['name']}** ({file['size_mb']:.1f} MB)\n"
-            report += f"  - 경로: `{file['path']}`\n\n"
+            parts.append(f"- **{file['name']}** ({file['size_mb']:.1f} MB)\n")
+            parts.append(f"  - 경로: `{file['path']}`\n\n")
         
-        report += "\n---\n\n## 📈 분류 제안\n\n"
-        report += "### 정리 우선순위\n\n"
-        report += "1. **논문 및 보고서** → `논문` 폴더로 통합\n"
-        report += "2. **세포 이미지** → `세포이미지` 폴더로 정리\n"
-        report += "3. **프레젠테이션** → `발표자료` 폴더로 이동\n"
-        report += "4. **데이터 파일** → `data` 폴더로 통합\n\n"
+        parts.append("\n---\n\n## 📈 분류 제안\n\n")
+        parts.append("### 정리 우선순위\n\n")
+        parts.append("1. **논문 및 보고서** → `논문` 폴더로 통합\n")
+        parts.append("2. **세포 이미지** → `세포이미지` 폴더로 정리\n")
+        parts.append("3. **프레젠테이션** → `발표자료` 폴더로 이동\n")
+        parts.append("4. **데이터 파일** → `data` 폴더로 통합\n\n")
         
-        report += "---\n\n"
-        report += f"*보고서 생성 시간: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}*\n"
+        parts.append("---\n\n")
+        parts.append(f"*보고서 생성 시간: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}*\n")
         
-        return report
+        return "".join(parts)
     
     def save_json(self, output_file: str = None):
         """JSON으로 분석 결과 저장"""
         if output_file is None:
             output_file = self.dataset_path.parent / 'dataset_analysis.json'
         
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(self.analysis_results, f, indent=2, ensure_ascii=False)
+        if HAS_ORJSON:
+            # orjson은 항상 UTF-8 (ensure_ascii=False와 동일)
+            Path(output_file).write_bytes(orjson.dumps(
+                self.analysis_results,
+                option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
+            ))
+        else:
+            with open(output_file, 'w', encoding='utf-8') as f:
+                json.dump(self.analysis_results, f, indent=2, ensure_ascii=False)
         
         print(f"💾 JSON 저장: {output_file}")
         return str(output_file)
@@ -4,22 +4,207 @@ AI 추론 데이터셋 일일 백업 스크립트
 """
 
 import json
+import os
 import shutil
+import struct
+import tempfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 import zipfile
+import zlib
+
+# orjson (선택적 의존성) - 없으면 표준 json 사용
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+# 이미 압축된 형식 - deflate해도 크기가 줄지 않으므로 무압축(ZIP_STORED)으로 저장
+STORED_SUFFIXES = {'.png', '.jpg', '.jpeg', '.zip', '.gz', '.xz', '.bz2'}
+
+# 파일 읽기/복사 단위 (1 MiB)
+COPY_BUFFER_SIZE = 1 << 20
+
+# 압축 결과를 메모리에 둘 최대 크기 - 넘으면 임시 파일로 넘김 (8 MiB)
+SPOOL_MAX_BYTES = 8 << 20
+
+# 증분 백업 비교 기준 (마지막 백업 시점의 파일별 수정 시각/크기)
+MANIFEST_FILENAME = "manifest.json"
+
+
+def _make_zinfo(file_path: Path, arcname: str) -> zipfile.ZipInfo:
+    """파일의 ZIP 항목 정보 생성 (이미 압축된 형식은 ZIP_STORED)"""
+    zinfo = zipfile.ZipInfo.from_file(file_path, arcname)
+    stored = file_path.suffix.lower() in STORED_SUFFIXES
+    zinfo.compress_type = zipfile.ZIP_STORED if stored else zipfile.ZIP_DEFLATED
+    return zinfo
+
+
+def _compress_file(file_path: Path, arcname: str, compresslevel: int):
+    """
+    파일을 1 MiB 단위로 읽으며 CRC 계산 및 raw deflate 압축 (작업 스레드에서 실행, zlib은 GIL 해제)
+    압축 결과는 SpooledTemporaryFile에 기록 (SPOOL_MAX_BYTES 초과 시 디스크로 넘어가 메모리 사용 제한)
+    """
+    zinfo = _make_zinfo(file_path, arcname)
+    compressor = None
+    if zinfo.compress_type == zipfile.ZIP_DEFLATED:
+        compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, -15)
+    
+    out = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    crc = 0
+    size = 0
+    with open(file_path, 'rb') as f:
+        while chunk := f.read(COPY_BUFFER_SIZE):
+            crc = zlib.crc32(chunk, crc)
+            size += len(chunk)
+            out.write(chunk if compressor is None else compressor.compress(chunk))
+    if compressor is not None:
+        out.write(compressor.flush())
+    
+    zinfo.file_size = size
+    zinfo.CRC = crc
+    zinfo.compress_size = out.tell()
+    out.seek(0)
+    return zinfo, out
+
+
+class _ZipWriter:
+    """
+    작업 스레드가 미리 압축한 항목을 순서대로 기록하는 ZIP 작성기 (단일 스레드에서 사용)
+    로컬 헤더는 ZipInfo.FileHeader, 중앙 디렉토리/종료 레코드는 ZIP 규격(ZIP64 포함)대로 직접 기록
+    """
+    
+    def __init__(self, path: Path):
+        self.fp = open(path, 'wb')
+        self.entries = []
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.fp.close()
+    
+    def add(self, zinfo: zipfile.ZipInfo, data):
+        """압축된 항목 1개 기록 (data: 압축 데이터 파일 객체, 기록 후 닫음)"""
+        with data:
+            zinfo.header_offset = self.fp.tell()
+            self.fp.write(zinfo.FileHeader())
+            shutil.copyfileobj(data, self.fp, COPY_BUFFER_SIZE)
+        self.entries.append(zinfo)
+    
+    def close(self):
+        """중앙 디렉토리 및 종료 레코드 기록"""
+        limit = zipfile.ZIP64_LIMIT
+        start_dir = self.fp.tell()
+        for zinfo in self.entries:
+            self.fp.write(self._central_dir_record(zinfo, limit))
+        end_dir = self.fp.tell()
+        count = len(self.entries)
+        size_dir = end_dir - start_dir
+        
+        if count >= 0xFFFF or start_dir > limit or size_dir > limit:
+            # ZIP64 종료 레코드 + 위치 레코드
+            self.fp.write(struct.pack(
+                '<4sQ2H2L4Q', b'PK\x06\x06', 44, 45, 45, 0, 0, count, count, size_dir, start_dir
+            ))
+            self.fp.write(struct.pack('<4sLQL', b'PK\x06\x07', 0, end_dir, 1))
+            count = min(count, 0xFFFF)
+            size_dir = min(size_dir, 0xFFFFFFFF)
+            start_dir = min(start_dir, 0xFFFFFFFF)
+        
+        self.fp.write(struct.pack('<4s4H2LH', b'PK\x05\x06', 0, 0, count, count, size_dir, start_dir, 0))
+        self.fp.close()
+    
+    @staticmethod
+    def _central_dir_record(zinfo: zipfile.ZipInfo, limit: int) -> bytes:
+        """중앙 디렉토리 항목 (ZipFile._write_end_record와 같은 필드 구성)"""
+        file_size, compress_size, header_offset = zinfo.file_size, zinfo.compress_size, zinfo.header_offset
+        zip64 = []
+        if file_size > limit or compress_size > limit:
+            zip64 += [file_size, compress_size]
+            file_size = compress_size = 0xFFFFFFFF
+        if header_offset > limit:
+            zip64.append(header_offset)
+            header_offset = 0xFFFFFFFF
+        
+        extra = zinfo.extra
+        version = zinfo.extract_version
+        if zip64:
+            extra = struct.pack(f'<HH{len(zip64)}Q', 1, 8 * len(zip64), *zip64) + extra
+            version = max(version, 45)
+        
+        # 파일명: ASCII가 아니면 UTF-8 + 플래그 0x800 (로컬 헤더와 동일)
+        flag_bits = zinfo.flag_bits
+        try:
+            filename = zinfo.filename.encode('ascii')
+        except UnicodeEncodeError:
+            filename = zinfo.filename.encode('utf-8')
+            flag_bits |= 0x800
+        
+        dt = zinfo.date_time
+        dosdate = (dt[0] - 1980) << 9 | dt[1] << 5 | dt[2]
+        dostime = dt[3] << 11 | dt[4] << 5 | (dt[5] // 2)
+        header = struct.pack(
+            '<4s4B4HL2L5H2L', b'PK\x01\x02',
+            max(version, zinfo.create_version), zinfo.create_system, version, zinfo.reserved,
+            flag_bits, zinfo.compress_type, dostime, dosdate, zinfo.CRC,
+            compress_size, file_size, len(filename), len(extra), len(zinfo.comment),
+            0, zinfo.internal_attr, zinfo.external_attr, header_offset
+        )
+        return header + filename + extra + zinfo.comment
+
+
+def _write_json(path: Path, data: dict, indent: bool = True):
+    """JSON 파일 저장 (orjson 사용 가능 시 C 구현으로 직렬화)"""
+    if HAS_ORJSON:
+        path.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2 if indent else None))
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2 if indent else None)
+
+
+def _read_json(path: Path) -> dict:
+    """JSON 파일 로드 (orjson 사용 가능 시 C 구현으로 파싱)"""
+    if HAS_ORJSON:
+        return orjson.loads(path.read_bytes())
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _is_delta(backup_name: str) -> bool:
+    """증분 백업 파일 여부"""
+    return backup_name.endswith("_delta.zip")
+
+
+def _extract_member(zipf: zipfile.ZipFile, zinfo: zipfile.ZipInfo, restore_dir: Path):
+    """ZIP 항목 1개 압축 해제 (작업 스레드에서 실행, zlib은 GIL 해제)"""
+    try:
+        zipf.extract(zinfo, restore_dir)
+    except FileExistsError:
+        # 다른 스레드가 같은 상위 폴더를 동시에 생성한 경우 - 폴더가 생겼으므로 재시도
+        zipf.extract(zinfo, restore_dir)
 
 
 class DatasetBackupManager:
     """데이터셋 백업 관리 클래스"""
     
-    def __init__(self, data_dir: str = None, backup_dir: str = None):
+    def __init__(self, data_dir: str = None, backup_dir: str = None, compresslevel: int = 1,
+                 max_workers: int = None, full_backup_interval_days: int = 7):
         """
         초기화
         
         Args:
             data_dir: 데이터 디렉토리 (기본: ./data)
             backup_dir: 백업 디렉토리 (기본: ./data/backups)
+            compresslevel: deflate 압축 레벨 (기본: 1, 로컬 백업이므로 속도 우선)
+            max_workers: 압축 스레드 수 (기본: CPU 코어 수)
+            full_backup_interval_days: 전체 백업 주기 (기본: 7일, 그 사이에는 증분 백업)
         """
         if data_dir is None:
             self.data_dir = Path.cwd() / "data"
@@ -32,53 +217,132 @@ class DatasetBackupManager:
             self.backup_dir = Path(backup_dir)
         
         self.backup_dir.mkdir(parents=True, exist_ok=True)
+        self.compresslevel = compresslevel
+        self.max_workers = max_workers
+        self.full_backup_interval_days = full_backup_interval_days
+    
+    def _scan_backups(self) -> list:
+        """백업 ZIP 목록을 (DirEntry, stat) 쌍으로 조회 (디렉토리 1회 순회, 파일당 stat 1회)"""
+        with os.scandir(self.backup_dir) as it:
+            return [
+                (entry, entry.stat())
+                for entry in it
+                if entry.name.startswith("dataset_backup_") and entry.name.endswith(".zip")
+            ]
     
-    def create_daily_backup(self) -> str:
+    def _scan_data_files(self) -> dict:
+        """백업 대상(inference_results, reports) 파일을 {arcname: (경로, stat)}으로 조회 (os.scandir 순회)"""
+        files = {}
+        for sub_dir in ("inference_results", "reports"):
+            stack = [(str(self.data_dir / sub_dir), sub_dir)]
+            while stack:
+                dir_path, rel_dir = stack.pop()
+                try:
+                    with os.scandir(dir_path) as it:
+                        for entry in it:
+                            arcname = f"{rel_dir}/{entry.name}"
+                            if entry.is_dir(follow_symlinks=False):
+                                stack.append((entry.path, arcname))
+                            elif entry.is_file():
+                                files[arcname] = (Path(entry.path), entry.stat())
+                except OSError:
+                    continue
+        return files
+    
+    def _load_manifest(self) -> dict:
+        """이전 백업 시점의 파일 목록 {arcname: [mtime_ns, size]} 로드"""
+        manifest_path = self.backup_dir / MANIFEST_FILENAME
+        if not manifest_path.exists():
+            return {}
+        return _read_json(manifest_path)
+    
+    def _metadata_path(self, backup_name: str) -> Path:
+        """백업 ZIP에 대응하는 메타데이터 파일 경로"""
+        return self.backup_dir / backup_name.replace("dataset_backup_", "metadata_").replace(".zip", ".json")
+    
+    def create_daily_backup(self, full: bool = None) -> str:
         """
         일일 백업 생성
         
+        마지막 전체 백업 후 full_backup_interval_days가 지나지 않았으면 manifest.json과
+        비교하여 직전 백업 이후 변경/추가된 파일만 담은 증분 백업(dataset_backup_<시각>_delta.zip) 생성.
+        복원 시 전체 백업 → 이후의 모든 증분 백업을 생성 순서대로 restore_backup 호출
+        
+        Args:
+            full: True면 전체 백업, False면 증분 백업 강제 (기본: 주기에 따라 자동 선택)
+        
         Returns:
-            백업 파일 경로
+            백업 파일 경로 (증분 백업할 변경 사항이 없으면 None)
         """
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        date_str = datetime.now().strftime("%Y%m%d")
+        now = datetime.now()
+        timestamp = now.strftime("%Y%m%d_%H%M%S")
+        date_str = now.strftime("%Y%m%d")
         
-        # 백업 파일명
-        backup_filename = f"dataset_backup_{date_str}.zip"
+        manifest = self._load_manifest()
+        last_full = manifest.get("full_backup_date")
+        if full is None:
+            full = (
+                last_full is None
+                or (now - datetime.fromisoformat(last_full)).days >= self.full_backup_interval_days
+            )
+        
+        # 백업 대상 파일 조회 (수정 시각/크기가 manifest와 같은 파일은 증분 백업에서 제외)
+        current = self._scan_data_files()
+        previous = manifest.get("files", {})
+        if full:
+            changed = sorted(current)
+        else:
+            changed = sorted(
+                arcname for arcname, (_, st) in current.items()
+                if previous.get(arcname) != [st.st_mtime_ns, st.st_size]
+            )
+            if not changed and previous.keys() == current.keys():
+                return None
+        
+        # 백업 파일명 (증분 백업은 하루에 여러 번 만들 수 있으므로 시각 포함)
+        backup_id = date_str if full else f"{timestamp}_delta"
+        backup_filename = f"dataset_backup_{backup_id}.zip"
         backup_path = self.backup_dir / backup_filename
         
         # 같은 날짜의 백업이 있으면 삭제 (최신 것만 유지)
         if backup_path.exists():
             backup_path.unlink()
         
-        # ZIP 압축
-        with zipfile.ZipFile(backup_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            # inference_results 디렉토리
-            inference_dir = self.data_dir / "inference_results"
-            if inference_dir.exists():
-                for file_path in inference_dir.rglob("*"):
-                    if file_path.is_file():
-                        arcname = file_path.relative_to(self.data_dir)
-                        zipf.write(file_path, arcname)
-            
-            # reports 디렉토리
-            reports_dir = self.data_dir / "reports"
-            if reports_dir.exists():
-                for file_path in reports_dir.rglob("*"):
-                    if file_path.is_file():
-                        arcname = file_path.relative_to(self.data_dir)
-                        zipf.write(file_path, arcname)
+        # ZIP 압축 (작업 스레드가 파일별로 CRC 계산/압축, 메인 스레드가 순서대로 기록)
+        # 대기 중인 압축 결과는 max_workers * 2개로 제한 (각각 최대 SPOOL_MAX_BYTES만 메모리 사용)
+        max_workers = self.max_workers or os.cpu_count() or 1
+        with _ZipWriter(backup_path) as writer, \
+                ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = deque()
+            for arcname in changed:
+                pending.append(executor.submit(_compress_file, current[arcname][0], arcname, self.compresslevel))
+                if len(pending) >= max_workers * 2:
+                    writer.add(*pending.popleft().result())
+            while pending:
+                writer.add(*pending.popleft().result())
         
         # 백업 메타데이터 저장
         metadata = {
-            "backup_date": datetime.now().isoformat(),
+            "backup_date": now.isoformat(),
             "backup_file": backup_filename,
+            "backup_type": "full" if full else "delta",
+            "num_files": len(changed),
+            "deleted_files": [] if full else sorted(previous.keys() - current.keys()),
             "file_size_mb": backup_path.stat().st_size / (1024 * 1024)
         }
         
-        metadata_path = self.backup_dir / f"metadata_{date_str}.json"
-        with open(metadata_path, 'w', encoding='utf-8') as f:
-            json.dump(metadata, f, ensure_ascii=False, indent=2)
+        metadata_path = self.backup_dir / f"metadata_{backup_id}.json"
+        _write_json(metadata_path, metadata)
+        
+        # 백업이 끝난 뒤 manifest 갱신 (다음 증분 백업의 비교 기준)
+        manifest = {
+            "full_backup_date": now.isoformat() if full else last_full,
+            "files": {
+                arcname: [st.st_mtime_ns, st.st_size]
+                for arcname, (_, st) in current.items()
+            }
+        }
+        _write_json(self.backup_dir / MANIFEST_FILENAME, manifest, indent=False)
         
         return str(backup_path)
     
@@ -86,23 +350,35 @@ class DatasetBackupManager:
         """
         오래된 백업 정리
         
+        보관 기간 안의 증분 백업이 복원에 필요로 하는 전체 백업과 그 이후 증분 백업은
+        기간이 지나도 삭제하지 않음
+        
         Args:
             keep_days: 보관 일수 (기본: 365일, 1년)
         """
         cutoff_date = datetime.now().timestamp() - (keep_days * 24 * 60 * 60)
         
-        for backup_file in self.backup_dir.glob("dataset_backup_*.zip"):
-            if backup_file.stat().st_mtime < cutoff_date:
-                backup_file.unlink()
-                
-                # 메타데이터도 삭제
-                metadata_file = self.backup_dir / backup_file.name.replace("dataset_backup_", "metadata_").replace(".zip", ".json")
-                if metadata_file.exists():
-                    metadata_file.unlink()
+        backups = sorted(self._scan_backups(), key=lambda b: b[1].st_mtime)
+        expired = [b for b in backups if b[1].st_mtime < cutoff_date]
+        kept = backups[len(expired):]
+        
+        # 보관할 첫 백업이 증분이면 직전 전체 백업부터의 체인 유지
+        if kept and _is_delta(kept[0][0].name):
+            bases = [i for i, (entry, _) in enumerate(expired) if not _is_delta(entry.name)]
+            if bases:
+                expired = expired[:bases[-1]]
+        
+        for entry, _ in expired:
+            os.unlink(entry.path)
+            
+            # 메타데이터도 삭제
+            metadata_file = self._metadata_path(entry.name)
+            if metadata_file.exists():
+                metadata_file.unlink()
     
     def get_backup_info(self) -> dict:
         """백업 정보 조회"""
-        backups = list(self.backup_dir.glob("dataset_backup_*.zip"))
+        backups = self._scan_backups()
         
         if not backups:
             return {
@@ -112,15 +388,15 @@ class DatasetBackupManager:
             }
         
         # 최신 백업
-        latest_backup = max(backups, key=lambda p: p.stat().st_mtime)
+        latest_backup, latest_stat = max(backups, key=lambda b: b[1].st_mtime)
         
         # 총 크기
-        total_size = sum(b.stat().st_size for b in backups)
+        total_size = sum(st.st_size for _, st in backups)
         
         return {
             "total_backups": len(backups),
             "latest_backup": latest_backup.name,
-            "latest_backup_date": datetime.fromtimestamp(latest_backup.stat().st_mtime).isoformat(),
+            "latest_backup_date": datetime.fromtimestamp(latest_stat.st_mtime).isoformat(),
             "total_size_mb": total_size / (1024 * 1024)
         }
     
@@ -128,6 +404,8 @@ class DatasetBackupManager:
         """
         백업 복원
         
+        증분 백업이면 해당 백업 시점에 삭제된 파일(메타데이터의 deleted_files)도 복원 디렉토리에서 제거
+        
         Args:
             backup_file: 백업 파일명
             restore_dir: 복원 디렉토리 (기본: 원래 data 디렉토리)
@@ -144,9 +422,22 @@ class DatasetBackupManager:
         
         restore_dir.mkdir(parents=True, exist_ok=True)
         
-        # ZIP 압축 해제
-        with zipfile.ZipFile(backup_path, 'r') as zipf:
-            zipf.extractall(restore_dir)
+        # ZIP 압축 해제 (항목별로 여러 스레드에서 동시에 해제, ZipFile 읽기는 스레드 안전)
+        max_workers = self.max_workers or os.cpu_count() or 1
+        with zipfile.ZipFile(backup_path, 'r') as zipf, \
+                ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(_extract_member, zipf, zinfo, restore_dir)
+                for zinfo in zipf.infolist()
+            ]
+            for future in futures:
+                future.result()
+        
+        # 증분 백업: 직전 백업 이후 삭제된 파일 반영
+        metadata_path = self._metadata_path(backup_path.name)
+        if metadata_path.exists():
+            for arcname in _read_json(metadata_path).get("deleted_files", []):
+                (restore_dir / arcname).unlink(missing_ok=True)
 
 
 def run_daily_backup():
@@ -161,7 +452,10 @@ def run_daily_backup():
     # 백업 생성
     print("[1/3] 백업 생성 중...")
     backup_path = manager.create_daily_backup()
-    print(f"  ✓ 백업 완료: {backup_path}")
+    if backup_path:
+        print(f"  ✓ 백업 완료: {backup_path}")
+    else:
+        print("  ✓ 변경된 파일 없음 (백업 생략)")
     print()
     
     # 오래된 백업 정리
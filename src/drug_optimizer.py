@@ -7,7 +7,10 @@ import numpy as np
 import pandas as pd
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
+from functools import lru_cache
 from itertools import combinations
+from math import comb
+import heapq
 import json
 
 from utils import Logger
@@ -27,12 +30,45 @@ class DrugCombinationOptimizer:
         self.logger = Logger(__name__)
         self.drug_db = drug_database
         self.combinations_db = combinations_database or {'combinations': []}
+        
+        # 약물 ID 집합 → 알려진 조합 (같은 집합이 여러 개면 목록 앞쪽 우선, 기존 선형 탐색과 동일)
+        self._known_by_set = {}
+        for combo in self.combinations_db.get('combinations', []):
+            self._known_by_set.setdefault(frozenset(combo['drugs']), combo)
         self.synergy_calc = SynergyCalculator()
         
         # 약물 리스트 생성
         self.drugs = drug_database.get('drugs', [])
         self.drug_dict = {drug['id']: drug for drug in self.drugs}
         
+        # 조합 일괄 점수 계산용 약물 속성 배열 (self.drugs 순서, id → 위치)
+        self._drug_pos = {drug['id']: i for i, drug in enumerate(self.drugs)}
+        self._toxicity = np.array(
+            [drug.get('toxicity_score', np.nan) for drug in self.drugs], dtype=np.float64
+        )
+        self._ic50_mid = np.array(
+            [np.mean(drug.get('typical_ic50_range', [1.0, 10.0])) for drug in self.drugs],
+            dtype=np.float64
+        )
+        # 약물별 단일 효능 = 1 / (1 + IC50 중간값), 조합 효능은 정렬된 약물 위치 튜플별로 캐시
+        self._efficacy = 1.0 / (1.0 + self._ic50_mid)
+        self._cached_efficacy = lru_cache(maxsize=4096)(self._combined_efficacy)
+        category_codes = {}
+        self._category_id = np.array(
+            [category_codes.setdefault(drug.get('category'), len(category_codes)) for drug in self.drugs],
+            dtype=np.int32
+        )
+        
+        # 암종 → 해당 암종에 효과적인 약물 위치 배열 (self.drugs 순서)
+        by_cancer = {}
+        for i, drug in enumerate(self.drugs):
+            for cancer in dict.fromkeys(drug.get('target_cancers', [])):
+                by_cancer.setdefault(cancer, []).append(i)
+        self._by_cancer = {
+            cancer: np.array(positions, dtype=np.int32)
+            for cancer, positions in by_cancer.items()
+        }
+        
         self.logger.info(f"{len(self.drugs)}개 약물 로드 완료")
     
     def get_drugs_by_cancer(self, cancer_type: str) -> List[Dict]:
@@ -45,10 +81,7 @@ class DrugCombinationOptimizer:
         Returns:
             해당 암종에 효과적인 약물 리스트
         """
-        filtered_drugs = [
-            drug for drug in self.drugs
-            if cancer_type in drug.get('target_cancers', [])
-        ]
+        filtered_drugs = [self.drugs[i] for i in self._by_cancer.get(cancer_type, [])]
         
         self.logger.info(f"{cancer_type}에 효과적인 약물: {len(filtered_drugs)}개")
         return filtered_drugs
@@ -80,15 +113,16 @@ class DrugCombinationOptimizer:
             n_drugs = len(candidate_drugs)
         
         # 조합 생성
-        all_combinations = list(combinations(candidate_drugs, n_drugs))
-        
-        # 최대 개수 제한
-        if len(all_combinations) > max_combinations:
-            # 독성 스코어가 낮은 조합 우선
-            all_combinations = sorted(
-                all_combinations,
+        if comb(len(candidate_drugs), n_drugs) <= max_combinations:
+            all_combinations = list(combinations(candidate_drugs, n_drugs))
+        else:
+            # 최대 개수 제한: 독성 스코어가 낮은 조합 우선
+            # (전체 조합 목록/정렬 없이 상위 max_combinations개만 힙으로 선택, 동점은 생성 순서 유지)
+            all_combinations = heapq.nsmallest(
+                max_combinations,
+                combinations(candidate_drugs, n_drugs),
                 key=lambda combo: sum(drug['toxicity_score'] for drug in combo)
-            )[:max_combinations]
+            )
         
         self.logger.info(f"{len(all_combinations)}개 조합 생성")
         return all_combinations
@@ -150,13 +184,7 @@ class DrugCombinationOptimizer:
     
     def _find_known_combination(self, drug_ids: List[str]) -> Optional[Dict]:
         """알려진 조합 찾기"""
-        drug_ids_set = set(drug_ids)
-        
-        for combo in self.combinations_db.get('combinations', []):
-            if set(combo['drugs']) == drug_ids_set:
-                return combo
-        
-        return None
+        return self._known_by_set.get(frozenset(drug_ids))
     
     def _predict_synergy(self, combination: Tuple[Dict, ...]) -> float:
         """
@@ -172,10 +200,10 @@ class DrugCombinationOptimizer:
             return 1.0
         elif unique_categories == len(combination):
             # 모두 다른 카테고리 - 높은 시너지 가능성
-            return 1.2 + np.random.uniform(-0.1, 0.2)
+            return 1.2
         else:
             # 일부 같은 카테고리
-            return 1.0 + np.random.uniform(-0.1, 0.1)
+            return 1.0
     
     def _estimate_efficacy(
         self,
@@ -186,18 +214,26 @@ class DrugCombinationOptimizer:
         효능 추정
         실제로는 ML 모델로 예측
         """
-        # IC50 범위의 중간값 사용 (낮을수록 효과적)
-        ic50_values = []
-        for drug in combination:
-            ic50_range = drug.get('typical_ic50_range', [1.0, 10.0])
-            avg_ic50 = np.mean(ic50_range)
-            ic50_values.append(avg_ic50)
-        
-        # IC50을 효능으로 변환 (IC50이 낮을수록 효능 높음)
-        # 효능 = 1 / (1 + IC50)
-        efficacies = [1.0 / (1.0 + ic50) for ic50 in ic50_values]
+        # 데이터베이스 약물로만 이루어진 조합은 약물 순서와 무관하게 캐시된 값 사용
+        positions = [self._drug_pos.get(drug['id']) for drug in combination]
+        if all(pos is not None and self.drugs[pos] is drug for pos, drug in zip(positions, combination)):
+            return self._cached_efficacy(tuple(sorted(positions)))
         
-        # 조합 효능 (Bliss independence 근사)
+        # IC50 범위의 중간값을 효능으로 변환 (IC50이 낮을수록 효능 높음)
+        # 효능 = 1 / (1 + IC50)
+        efficacies = [
+            1.0 / (1.0 + np.mean(drug.get('typical_ic50_range', [1.0, 10.0])))
+            for drug in combination
+        ]
+        return self._bliss_efficacy(efficacies)
+    
+    def _combined_efficacy(self, positions: Tuple[int, ...]) -> float:
+        """데이터베이스 약물 위치 튜플의 조합 효능 (로드 시 계산한 약물별 효능 사용)"""
+        return self._bliss_efficacy(self._efficacy[list(positions)])
+    
+    @staticmethod
+    def _bliss_efficacy(efficacies) -> float:
+        """조합 효능 (Bliss independence 근사)"""
         combined_efficacy = 1.0
         for eff in efficacies:
             combined_efficacy *= (1 - eff)
@@ -205,6 +241,43 @@ class DrugCombinationOptimizer:
         
         return combined_efficacy
     
+    def _score_combinations(
+        self,
+        combos: np.ndarray,
+        known: List[Optional[Dict]]
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        조합 점수 일괄 계산 (score_combination의 벡터화 버전)
+        
+        Args:
+            combos: 조합별 약물 위치 배열 (K, n_drugs)
+            known: 조합별 알려진 조합 정보 (없으면 None)
+            
+        Returns:
+            (시너지, 효능, 평균 독성, 종합 점수) 배열
+        """
+        n_combos, n_drugs = combos.shape
+        
+        # 효능: 1 / (1 + IC50 중간값), 조합 효능은 Bliss independence 근사
+        efficacy = 1.0 - np.prod(1.0 - self._efficacy[combos], axis=1)
+        
+        # 시너지: 단일 약물 1.0, 모두 다른 카테고리 1.2, 그 외 1.0
+        synergy = np.ones(n_combos)
+        if n_drugs != 1:
+            categories = np.sort(self._category_id[combos], axis=1)
+            unique_categories = (np.diff(categories, axis=1) != 0).sum(axis=1) + (n_drugs > 0)
+            synergy[unique_categories == n_drugs] = 1.2
+        
+        # 알려진 조합은 데이터베이스의 시너지/효능 사용
+        for i, combo in enumerate(known):
+            if combo:
+                synergy[i] = combo.get('synergy_score', 1.0)
+                efficacy[i] = combo.get('clinical_efficacy', 0.5)
+        
+        toxicity = self._toxicity[combos].mean(axis=1)
+        overall = efficacy * 0.5 + synergy * 0.3 - (toxicity / 10.0) * 0.2
+        return synergy, efficacy, toxicity, overall
+    
     def recommend_combinations(
         self,
         cancer_type: str,
@@ -233,17 +306,29 @@ class DrugCombinationOptimizer:
             self.logger.warning("생성된 조합이 없습니다.")
             return []
         
-        # 각 조합 점수 계산
-        scored_combinations = []
-        for combo in combinations_list:
-            score = self.score_combination(combo, cell_features)
-            scored_combinations.append(score)
-        
-        # 점수 순 정렬
-        scored_combinations.sort(key=lambda x: x['overall_score'], reverse=True)
-        
-        # 상위 N개 반환
-        recommendations = scored_combinations[:top_n]
+        # 전체 조합 점수를 배열 연산으로 일괄 계산 (score_combination과 동일한 공식)
+        combos = np.array(
+            [[self._drug_pos[drug['id']] for drug in combo] for combo in combinations_list],
+            dtype=np.int32
+        )
+        known = [self._find_known_combination([drug['id'] for drug in combo]) for combo in combinations_list]
+        synergy, efficacy, toxicity, overall = self._score_combinations(combos, known)
+        
+        # 점수 순 정렬 (동점은 생성 순서 유지) 후 상위 N개만 결과 딕셔너리로 변환
+        order = np.argsort(-overall, kind='stable')[:top_n]
+        recommendations = [
+            {
+                'drugs': [drug['name'] for drug in combinations_list[i]],
+                'drug_ids': [drug['id'] for drug in combinations_list[i]],
+                'synergy_score': float(synergy[i]),
+                'clinical_efficacy': float(efficacy[i]),
+                'toxicity_score': float(toxicity[i]),
+                'overall_score': float(overall[i]),
+                'is_known_combo': known[i] is not None,
+                'combination_name': known[i].get('name', '') if known[i] else None
+            }
+            for i in order
+        ]
         
         self.logger.info(f"상위 {len(recommendations)}개 조합 추천 완료")
         return recommendations
@@ -273,8 +358,8 @@ class DrugCombinationOptimizer:
         # IC50 범위에서 추천 용량 계산
         ic50_range = drug.get('typical_ic50_range', [1.0, 10.0])
         
-        # 일반적으로 IC50의 2-5배 용량 사용
-        recommended_dose = np.mean(ic50_range) * 3.0
+        # 일반적으로 IC50의 2-5배 용량 사용 (중간값은 로드 시 계산한 값 사용)
+        recommended_dose = self._ic50_mid[self._drug_pos[drug_id]] * 3.0
         min_dose = ic50_range[0] * 2.0
         max_dose = ic50_range[1] * 5.0
         
@@ -3,14 +3,90 @@
 Cellpose 이미지, 마스크, 원본 파일을 체계적으로 저장
 """
 
+import os
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import json
 import numpy as np
 from PIL import Image
 
+# orjson (선택적 의존성) - 없으면 표준 json 사용
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+
+def _write_json(path: Path, data):
+    """JSON 파일 저장 (orjson 사용 가능 시 C 구현으로 직렬화, 들여쓰기 2칸)"""
+    if HAS_ORJSON:
+        Path(path).write_bytes(orjson.dumps(
+            data, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY
+        ))
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def _collect_files(root: Path, suffixes: tuple) -> List[str]:
+    """
+    root 아래를 1회 순회하며 확장자가 suffixes에 속하는 파일 경로 수집
+    (확장자별 rglob 반복 대신 단일 os.scandir 순회, 결과는 suffixes 순서대로 묶음)
+    """
+    buckets = {suffix: [] for suffix in suffixes}
+    stack = [str(root)]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file():
+                        bucket = buckets.get(os.path.splitext(entry.name)[1].lower())
+                        if bucket is not None:
+                            bucket.append(entry.path)
+        except OSError:
+            continue
+    return [path for suffix in suffixes for path in buckets[suffix]]
+
+
+def _copy_upload(file, dest_path: Path):
+    """
+    업로드 파일을 dest_path로 복사
+    실제 파일 디스크립터가 있으면(디스크로 넘어간 임시 파일 등) os.sendfile로 커널 내 복사,
+    아니면(메모리 버퍼) 1 MiB 단위 copyfileobj
+    """
+    # 메모리에 있는 SpooledTemporaryFile은 fileno() 호출 시 디스크로 넘어가므로 fileno()를 부르지 않음
+    src_fd = None
+    if getattr(file, '_rolled', True):
+        try:
+            src_fd = file.fileno()
+        except (AttributeError, OSError, ValueError):
+            # io.UnsupportedOperation (BytesIO 기반 업로드 등)
+            src_fd = None
+    
+    with open(dest_path, 'wb') as f:
+        if src_fd is not None and hasattr(os, 'sendfile'):
+            size = os.fstat(src_fd).st_size
+            offset = 0
+            try:
+                while offset < size:
+                    sent = os.sendfile(f.fileno(), src_fd, offset, size - offset)
+                    if sent == 0:
+                        break
+                    offset += sent
+                return
+            except OSError:
+                # 일반 파일 대상 sendfile을 지원하지 않는 플랫폼 - 처음부터 다시 복사
+                f.seek(0)
+                f.truncate()
+                file.seek(0)
+        shutil.copyfileobj(file, f, length=1 << 20)
+
 
 class FileStorageManager:
     """파일 저장 관리 클래스"""
@@ -32,9 +108,20 @@ class FileStorageManager:
         self.masks_dir = self.base_dir / "masks"
         self.documents_dir = self.base_dir / "documents"
         
+        # 이 인스턴스에서 이미 생성/확인한 디렉토리 (반복 mkdir 호출 생략)
+        self._dir_cache = set()
+        
         # 디렉토리 생성
         for dir_path in [self.images_dir, self.masks_dir, self.documents_dir]:
-            dir_path.mkdir(parents=True, exist_ok=True)
+            self._ensure_dir(dir_path)
+    
+    def _ensure_dir(self, dir_path: Path):
+        """디렉토리 생성 (이미 확인한 경로는 파일 시스템 조회 없이 건너뜀)"""
+        key = str(dir_path)
+        if key in self._dir_cache:
+            return
+        dir_path.mkdir(parents=True, exist_ok=True)
+        self._dir_cache.add(key)
     
     def save_cellpose_images(
         self,
@@ -64,8 +151,8 @@ class FileStorageManager:
         patient_images_dir = self.images_dir / patient_id / timestamp_str
         patient_masks_dir = self.masks_dir / patient_id / timestamp_str
         
-        patient_images_dir.mkdir(parents=True, exist_ok=True)
-        patient_masks_dir.mkdir(parents=True, exist_ok=True)
+        self._ensure_dir(patient_images_dir)
+        self._ensure_dir(patient_masks_dir)
         
         saved_paths = {
             "original_images": [],
@@ -78,40 +165,32 @@ class FileStorageManager:
             file.seek(0)
             original_path = patient_images_dir / file.name
             
-            with open(original_path, 'wb') as f:
-                f.write(file.read())
+            # 업로드 파일 전체를 메모리에 올리지 않고 복사
+            _copy_upload(file, original_path)
             
             saved_paths["original_images"].append(str(original_path))
         
-        # 마스크 이미지 저장
-        for idx, result in enumerate(cellpose_results):
-            mask = result.get('masks')
+        # 마스크 이미지 저장 (PNG 인코딩은 GIL을 해제하므로 마스크별로 여러 스레드에서 동시에 저장)
+        mask_jobs = [
+            (idx, result) for idx, result in enumerate(cellpose_results)
+            if result.get('masks') is not None
+        ]
+        masks_metadata = []
+        if mask_jobs:
+            max_workers = min(8, os.cpu_count() or 1, len(mask_jobs))
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                saved = list(executor.map(
+                    lambda job: self._save_mask(patient_masks_dir, job[0], job[1], timestamp),
+                    mask_jobs
+                ))
+            for mask_path, metadata in saved:
+                saved_paths["mask_images"].append(mask_path)
+                masks_metadata.append(metadata)
             
-            if mask is not None:
-                # 마스크를 이미지로 저장
-                mask_normalized = (mask > 0).astype(np.uint8) * 255
-                mask_img = Image.fromarray(mask_normalized)
-                
-                mask_filename = f"mask_{idx+1}.png"
-                mask_path = patient_masks_dir / mask_filename
-                mask_img.save(mask_path)
-                
-                saved_paths["mask_images"].append(str(mask_path))
-                
-                # 메타데이터 저장
-                metadata = {
-                    "image_index": idx,
-                    "original_image": result.get('image_path'),
-                    "num_cells": result.get('num_cells'),
-                    "diameter_used": result.get('diameter_used'),
-                    "timestamp": timestamp.isoformat()
-                }
-                
-                metadata_path = patient_masks_dir / f"metadata_{idx+1}.json"
-                with open(metadata_path, 'w', encoding='utf-8') as f:
-                    json.dump(metadata, f, ensure_ascii=False, indent=2)
-                
-                saved_paths["metadata"].append(str(metadata_path))
+            # 마스크 메타데이터는 실행당 1개 파일(배열)로 저장
+            metadata_path = patient_masks_dir / "metadata.json"
+            _write_json(metadata_path, masks_metadata)
+            saved_paths["metadata"].append(str(metadata_path))
         
         # 전체 요약 저장
         summary = {
@@ -119,15 +198,44 @@ class FileStorageManager:
             "timestamp": timestamp.isoformat(),
             "num_images": len(uploaded_files),
             "num_masks": len(cellpose_results),
-            "saved_paths": saved_paths
+            "saved_paths": saved_paths,
+            "masks_metadata": masks_metadata
         }
         
         summary_path = patient_images_dir / "summary.json"
-        with open(summary_path, 'w', encoding='utf-8') as f:
-            json.dump(summary, f, ensure_ascii=False, indent=2)
+        _write_json(summary_path, summary)
         
         return saved_paths
     
+    def _save_mask(
+        self,
+        patient_masks_dir: Path,
+        idx: int,
+        result: Dict,
+        timestamp: datetime
+    ) -> Tuple[str, Dict]:
+        """마스크 PNG 1건 저장 (작업 스레드에서 실행), (마스크 경로, 메타데이터) 반환"""
+        # 마스크를 이미지로 저장 (이진화 결과를 uint8 배열 1개로 바로 생성)
+        mask_normalized = np.where(result['masks'] > 0, np.uint8(255), np.uint8(0))
+        mask_img = Image.fromarray(mask_normalized)
+        
+        mask_filename = f"mask_{idx+1}.png"
+        mask_path = patient_masks_dir / mask_filename
+        # 이진 마스크는 낮은 압축 레벨로도 크기 차이가 작으므로 저장 속도 우선
+        mask_img.save(mask_path, format='PNG', compress_level=1)
+        
+        # 메타데이터 (파일 기록은 호출 측에서 일괄 처리)
+        metadata = {
+            "image_index": idx,
+            "mask_image": mask_filename,
+            "original_image": result.get('image_path'),
+            "num_cells": result.get('num_cells'),
+            "diameter_used": result.get('diameter_used'),
+            "timestamp": timestamp.isoformat()
+        }
+        
+        return str(mask_path), metadata
+    
     def save_document(
         self,
         patient_id: str,
@@ -159,7 +267,7 @@ class FileStorageManager:
         
         # 환자별 디렉토리
         patient_docs_dir = self.documents_dir / patient_id
-        patient_docs_dir.mkdir(parents=True, exist_ok=True)
+        self._ensure_dir(patient_docs_dir)
         
         doc_path = patient_docs_dir / filename
         
@@ -187,24 +295,17 @@ class FileStorageManager:
         # 이미지
         patient_images_dir = self.images_dir / patient_id
         if patient_images_dir.exists():
-            for img_file in patient_images_dir.rglob("*.png"):
-                files_info["images"].append(str(img_file))
-            for img_file in patient_images_dir.rglob("*.jpg"):
-                files_info["images"].append(str(img_file))
+            files_info["images"] = _collect_files(patient_images_dir, ('.png', '.jpg'))
         
         # 마스크
         patient_masks_dir = self.masks_dir / patient_id
         if patient_masks_dir.exists():
-            for mask_file in patient_masks_dir.rglob("*.png"):
-                files_info["masks"].append(str(mask_file))
+            files_info["masks"] = _collect_files(patient_masks_dir, ('.png',))
         
         # 문서
         patient_docs_dir = self.documents_dir / patient_id
         if patient_docs_dir.exists():
-            for doc_file in patient_docs_dir.rglob("*.md"):
-                files_info["documents"].append(str(doc_file))
-            for doc_file in patient_docs_dir.rglob("*.txt"):
-                files_info["documents"].append(str(doc_file))
+            files_info["documents"] = _collect_files(patient_docs_dir, ('.md', '.txt'))
         
         return files_info
 
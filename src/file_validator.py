@@ -59,22 +59,23 @@ class FileValidator:
                     # 파일 포인터를 처음으로 이동
                     file.seek(0)
                     
-                    # PIL로 이미지 열기 시도
-                    image = Image.open(file)
+                    # PIL로 헤더만 읽어 크기/모드 확인 (픽셀 디코딩 없음)
+                    with Image.open(file) as image:
+                        width, height = image.size
+                        mode = image.mode
+                    
+                    # 파일 포인터를 다시 처음으로
+                    file.seek(0)
                     
                     # 4. 이미지 크기 검사
-                    width, height = image.size
                     min_w, min_h = FileValidator.MIN_IMAGE_DIMENSIONS
                     
                     if width < min_w or height < min_h:
                         return False, f"이미지 크기가 너무 작습니다 ({width}x{height}). 최소 크기: {min_w}x{min_h}"
                     
                     # 5. 이미지 모드 확인
-                    if image.mode not in ['L', 'RGB', 'RGBA']:
-                        logger.warning(f"비표준 이미지 모드: {image.mode}. RGB로 변환할 수 있습니다.")
-                    
-                    # 파일 포인터를 다시 처음으로
-                    file.seek(0)
+                    if mode not in ['L', 'RGB', 'RGBA']:
+                        logger.warning(f"비표준 이미지 모드: {mode}. RGB로 변환할 수 있습니다.")
                     
                 except Exception as e:
                     return False, f"이미지 파일을 읽을 수 없습니다: {str(e)}"
@@ -195,18 +196,18 @@ class FileValidator:
         """
         try:
             file.seek(0)
-            image = Image.open(file)
-            
-            info = {
-                'filename': file.name,
-                'format': image.format,
-                'mode': image.mode,
-                'size': image.size,
-                'width': image.size[0],
-                'height': image.size[1],
-                'file_size_bytes': file.size,
-                'file_size_mb': round(file.size / (1024 * 1024), 2)
-            }
+            # 헤더 정보만 사용 (픽셀 디코딩 없음), 읽은 뒤 이미지 핸들 닫기
+            with Image.open(file) as image:
+                info = {
+                    'filename': file.name,
+                    'format': image.format,
+                    'mode': image.mode,
+                    'size': image.size,
+                    'width': image.size[0],
+                    'height': image.size[1],
+                    'file_size_bytes': file.size,
+                    'file_size_mb': round(file.size / (1024 * 1024), 2)
+                }
             
             file.seek(0)
             return info
@@ -0,0 +1,101 @@
+"""
+Cellpose flow 후처리 연산 (Numba JIT)
+CPU에서 flow → mask 변환의 Euler 적분 단계를 병렬 처리
+"""
+
+import numpy as np
+
+# Numba (선택적 의존성) - 없으면 cellpose 내장 flow 적분 사용
+try:
+    import numba as nb
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+
+if HAS_NUMBA:
+    @nb.njit(parallel=True, nogil=True, cache=True, fastmath=True)
+    def _euler_integrate(dP, ys, xs, niter, out_y, out_x):
+        """
+        각 픽셀을 flow 필드를 따라 niter 스텝 이동 (bilinear 보간)
+
+        Args:
+            dP: flow 필드 (2, Ly, Lx), float32
+            ys, xs: 시작 좌표 (N,), float32
+            niter: 적분 스텝 수
+            out_y, out_x: 최종 좌표 출력 버퍼 (N,), float32
+        """
+        Ly = dP.shape[1]
+        Lx = dP.shape[2]
+        for i in nb.prange(ys.shape[0]):
+            y = ys[i]
+            x = xs[i]
+            for _ in range(niter):
+                y0 = int(y)
+                x0 = int(x)
+                y1 = min(y0 + 1, Ly - 1)
+                x1 = min(x0 + 1, Lx - 1)
+                wy = y - y0
+                wx = x - x0
+                w00 = (1.0 - wy) * (1.0 - wx)
+                w01 = (1.0 - wy) * wx
+                w10 = wy * (1.0 - wx)
+                w11 = wy * wx
+                dy = (w00 * dP[0, y0, x0] + w01 * dP[0, y0, x1]
+                      + w10 * dP[0, y1, x0] + w11 * dP[0, y1, x1])
+                dx = (w00 * dP[1, y0, x0] + w01 * dP[1, y0, x1]
+                      + w10 * dP[1, y1, x0] + w11 * dP[1, y1, x1])
+                y = min(max(y + dy, 0.0), Ly - 1.0)
+                x = min(max(x + dx, 0.0), Lx - 1.0)
+            out_y[i] = y
+            out_x[i] = x
+
+
+def follow_flows(dP: np.ndarray, cp_mask: np.ndarray, niter: int) -> np.ndarray:
+    """
+    세포 확률 마스크 내부 픽셀을 flow를 따라 이동시킨 최종 좌표 계산
+    (cellpose.dynamics.follow_flows의 CPU 대체)
+
+    Args:
+        dP: flow 필드 (2, Ly, Lx)
+        cp_mask: 세포 확률 마스크 (Ly, Lx), bool
+        niter: 적분 스텝 수 (cellpose eval과 동일하게 200 × 직경 / 모델 기준 직경)
+
+    Returns:
+        최종 좌표 p (2, Ly, Lx), float32 - cellpose 3.0.x의 dynamics.compute_masks(p=...)에 전달
+    """
+    Ly, Lx = cp_mask.shape
+    # cellpose와 동일한 스케일링 (dP * mask / 5)
+    dP_scaled = np.ascontiguousarray(dP * cp_mask / 5., dtype=np.float32)
+
+    p = np.empty((2, Ly, Lx), dtype=np.float32)
+    p[0] = np.arange(Ly, dtype=np.float32)[:, None]
+    p[1] = np.arange(Lx, dtype=np.float32)[None, :]
+
+    inds_y, inds_x = np.nonzero(cp_mask)
+    if inds_y.size == 0:
+        return p
+
+    # 입력/출력 버퍼는 JIT 영역 밖에서 할당
+    ys = inds_y.astype(np.float32)
+    xs = inds_x.astype(np.float32)
+    out_y = np.empty_like(ys)
+    out_x = np.empty_like(xs)
+    _euler_integrate(dP_scaled, ys, xs, niter, out_y, out_x)
+
+    p[0, inds_y, inds_x] = out_y
+    p[1, inds_y, inds_x] = out_x
+    return p
+
+
+_warmed_up = False
+
+
+def warmup() -> None:
+    """JIT 컴파일 캐시 준비 (작은 입력으로 1회 실행, 이후 호출은 무시)"""
+    global _warmed_up
+    if not HAS_NUMBA or _warmed_up:
+        return
+    dP = np.zeros((2, 4, 4), dtype=np.float32)
+    follow_flows(dP, np.ones((4, 4), dtype=bool), niter=1)
+    _warmed_up = True
@@ -21,6 +21,12 @@ try:
 except ImportError:
     XGBOOST_AVAILABLE = False
 
+try:
+    from skimage.measure import regionprops_table
+    SKIMAGE_AVAILABLE = True
+except ImportError:
+    SKIMAGE_AVAILABLE = False
+
 from utils import Logger, ensure_dir
 
 class EfficacyPredictor:
@@ -375,23 +381,58 @@ class FeatureExtractor:
             masks: 세그멘테이션 마스크
             
         Returns:
-            형태학적 특징 딕셔너리
+            형태학적 특징 딕셔너리 (skimage 미설치 시 mean_circularity/eccentricity/solidity는 NaN)
         """
-        cell_ids = np.unique(masks)[1:]  # 0은 배경
+        if SKIMAGE_AVAILABLE:
+            props = self.extract_region_properties(masks)
+            areas = props['area']
+        else:
+            # 레이블별 픽셀 수 (0은 배경)
+            counts = np.bincount(masks.ravel())[1:]
+            props = None
+            areas = counts[counts > 0]
         
-        if len(cell_ids) == 0:
+        if len(areas) == 0:
             return {}
         
-        areas = []
-        for cell_id in cell_ids:
-            area = np.sum(masks == cell_id)
-            areas.append(area)
-        
         features = {
-            'cell_count': len(cell_ids),
+            'cell_count': len(areas),
             'mean_cell_area': float(np.mean(areas)),
             'std_cell_area': float(np.std(areas)),
             'total_cell_area': float(np.sum(areas))
         }
         
+        # skimage가 없으면 형태 지표는 NaN (키 구성은 환경과 무관하게 동일)
+        for key in ('circularity', 'eccentricity', 'solidity'):
+            features[f'mean_{key}'] = float(np.mean(props[key])) if props is not None else float('nan')
+        
         return features
+    
+    def extract_region_properties(
+        self,
+        masks: np.ndarray,
+        image: Optional[np.ndarray] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        세포별 형태학적 속성 (skimage regionprops_table, 세포 단위 배열)
+        
+        Args:
+            masks: 세그멘테이션 마스크
+            image: 강도 이미지 (있으면 intensity_mean 포함)
+            
+        Returns:
+            속성명 → 배열 딕셔너리 (pd.DataFrame으로 바로 변환 가능)
+        """
+        properties = ['label', 'area', 'perimeter', 'eccentricity', 'solidity']
+        if image is not None:
+            properties.append('intensity_mean')
+        
+        props = regionprops_table(masks, intensity_image=image, properties=properties)
+        
+        # 원형도 = 4π·면적 / 둘레² (둘레 0인 단일 픽셀 세포는 0)
+        perimeter = props['perimeter']
+        with np.errstate(divide='ignore', invalid='ignore'):
+            circularity = np.where(perimeter > 0, 4 * np.pi * props['area'] / perimeter ** 2, 0.0)
+        props['circularity'] = circularity
+        
+        return props
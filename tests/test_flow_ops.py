@@ -0,0 +1,41 @@
+"""
+flow_ops.follow_flows 결과로 만든 마스크가 cellpose 내장 flow 적분 결과와 같은지 확인
+"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("numba")
+pytest.importorskip("cellpose")
+
+from src.cellpose_analyzer import CELLPOSE_DENSE_P, _compute_masks
+from src.flow_ops import follow_flows
+
+
+def _synthetic_flows(size=64, radius=10, centers=((20, 20), (44, 44))):
+    """원형 세포 2개: 각 세포 중심을 향하는 flow (cellpose 출력과 같은 5배 스케일)"""
+    yy, xx = np.mgrid[:size, :size].astype(np.float32)
+    dP = np.zeros((2, size, size), dtype=np.float32)
+    cellprob = np.full((size, size), -5.0, dtype=np.float32)
+    for cy, cx in centers:
+        dy, dx = cy - yy, cx - xx
+        dist = np.hypot(dy, dx)
+        inside = dist <= radius
+        norm = np.maximum(dist, 1e-6)
+        dP[0][inside] = 5.0 * dy[inside] / norm[inside]
+        dP[1][inside] = 5.0 * dx[inside] / norm[inside]
+        cellprob[inside] = 5.0
+    return dP, cellprob
+
+
+@pytest.mark.skipif(not CELLPOSE_DENSE_P, reason="compute_masks(p=...)는 cellpose 3.0.x 형식만 지원")
+def test_follow_flows_masks_match_cellpose():
+    dP, cellprob = _synthetic_flows()
+    niter = 200
+    
+    expected = _compute_masks(dP, cellprob, niter=niter, flow_threshold=0.0, cellprob_threshold=0.0)
+    p = follow_flows(dP, cellprob > 0.0, niter=niter)
+    masks = _compute_masks(dP, cellprob, p=p, niter=niter, flow_threshold=0.0, cellprob_threshold=0.0)
+    
+    assert masks.max() == expected.max() == 2
+    np.testing.assert_array_equal(masks, expected)
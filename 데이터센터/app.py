@@ -17,22 +17,24 @@ if str(parent_dir) not in sys.path:
     sys.path.insert(0, str(parent_dir))
 
 try:
-    from src.cellpose_analyzer import CellposeAnalyzer
+    from src.cellpose_analyzer import CellposeAnalyzer, CellposeAnalyzerTRT, cell_records
 except ImportError:
     # Fallback if run from different context
     sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-    from src.cellpose_analyzer import CellposeAnalyzer
+    from src.cellpose_analyzer import CellposeAnalyzer, CellposeAnalyzerTRT, cell_records
 
-# Page Config
-st.set_page_config(
-    page_title="Cellpose Data Center",
-    page_icon="🔬",
-    layout="wide",
-    initial_sidebar_state="expanded"
-)
+# TensorRT 엔진 디렉토리 (지정 시 TensorRT 추론 사용, 엔진이 없으면 첫 실행 때 빌드)
+TRT_ENGINE_DIR = os.environ.get('ADDS_CELLPOSE_TRT_ENGINE_DIR') or None
+
+@st.cache_resource
+def get_analyzer(model_type='cyto3', use_gpu=True, engine_dir=TRT_ENGINE_DIR):
+    """CellposeAnalyzer 인스턴스 (리런 간 모델/TensorRT 엔진 재사용, engine_dir 지정 시 TensorRT)"""
+    if engine_dir is not None:
+        return CellposeAnalyzerTRT(model_type=model_type, use_gpu=use_gpu, engine_dir=engine_dir)
+    return CellposeAnalyzer(model_type=model_type, use_gpu=use_gpu)
 
 # CSS for styling (matching screenshots)
-st.markdown("""
+DATACENTER_CSS = """
 <style>
     .report-header {
         background: linear-gradient(135deg, #f5f7fa 0%, #c3cfe2 100%);
@@ -95,9 +97,12 @@ st.markdown("""
         font-size: 0.9rem;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
 
-def main():
+def render_datacenter():
+    """데이터센터 화면 렌더링 (단독 실행 및 메인 앱 내 마운트 공용)"""
+    st.markdown(DATACENTER_CSS, unsafe_allow_html=True)
+    
     # Sidebar
     with st.sidebar:
         st.title("🔬 Cellpose 설정")
@@ -115,15 +120,8 @@ def main():
             value=20
         )
         
-        flow_threshold = st.slider(
-            "Flow Threshold",
-            min_value=0.0,
-            max_value=1.0,
-            value=0.3
-        )
-        
         st.markdown("---")
-        st.info("💡 **Tip**: 세포가 잘 잡히지 않으면 Flow Threshold를 높여보세요.")
+        st.info("💡 **Tip**: 세포가 잘 잡히지 않으면 고급 설정에서 Flow Threshold를 조정해보세요.")
         
         with st.expander("⚙️ 고급 설정 (Advanced)", expanded=False):
             upscale_factor = st.slider(
@@ -140,6 +138,22 @@ def main():
                 value=False,
                 help="대비가 낮은 이미지의 선명도를 높여 검출력을 향상시킵니다."
             )
+            
+            flow_threshold = st.slider(
+                "Flow Threshold (QC)",
+                min_value=0.0,
+                max_value=0.9,
+                value=0.0,
+                help="0이면 flow 오류 검사(QC)를 생략해 빠르게 분석합니다. 잘못된 마스크를 걸러내려면 0.4 정도로 높이세요."
+            )
+            
+            batch_size = st.slider(
+                "타일 배치 크기 (Batch Size)",
+                min_value=1,
+                max_value=32,
+                value=16,
+                help="한 번에 GPU로 보내는 타일 수입니다. VRAM이 부족하면 낮추세요."
+            )
 
     # Main Content
     st.markdown("""
@@ -164,13 +178,14 @@ def main():
             with st.spinner("AI가 세포를 분석하고 있습니다..."):
                 try:
                     # 1. Run Cellpose
-                    analyzer = CellposeAnalyzer(model_type=model_type, use_gpu=True, diameter=diameter)
+                    analyzer = get_analyzer(model_type=model_type, use_gpu=True)
                     result = analyzer.analyze_image(
                         str(temp_path), 
                         diameter=diameter,
                         flow_threshold=flow_threshold,
                         upscale_factor=upscale_factor,
-                        enhance_contrast=enhance_contrast
+                        enhance_contrast=enhance_contrast,
+                        batch_size=batch_size
                     )
                     
                     # 2. Process Results & Classify States
@@ -192,7 +207,7 @@ def main():
 
 def process_cell_data(result):
     """Analyze cell properties and classify states"""
-    cells = result['cell_properties']
+    cells = cell_records(result['cell_properties'])
     masks = result['masks']
     img = result.get('original_image') # Assuming analyzer adds this or we load it
     if img is None:
@@ -543,5 +558,16 @@ def create_state_mask(masks, df):
     
     return colored
 
+def main():
+    """단독 실행 (streamlit run 데이터센터/app.py)"""
+    # Page Config
+    st.set_page_config(
+        page_title="Cellpose Data Center",
+        page_icon="🔬",
+        layout="wide",
+        initial_sidebar_state="expanded"
+    )
+    render_datacenter()
+
 if __name__ == "__main__":
     main()